@@ -0,0 +1,75 @@
+"""Time the set-based bulk pantry upsert and count its SQL round trips.
+
+Each size runs twice against a scratch SQLite file: once into an empty
+pantry (all inserts) and once more with the same items (all merges).
+
+Run with ``python -m backend.benchmarks.bench_bulk``.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from ..database import Base
+from ..schemas import PantryItemCreate
+from ..services.pantry_merge import load_items, upsert_items
+from .data import synthetic_pantry
+
+
+def _bulk(Session, items: list[PantryItemCreate]) -> int:
+    db = Session()
+    try:
+        ids = upsert_items(db, items)
+        db.commit()
+        return len(load_items(db, ids))
+    finally:
+        db.close()
+
+
+def run(sizes: list[int]) -> list[dict]:
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            statements = [0]
+            event.listen(
+                engine, "before_cursor_execute",
+                lambda *args: statements.__setitem__(0, statements[0] + 1),
+            )
+            items = [
+                PantryItemCreate(name=name, quantity=1, unit="each")
+                for name in synthetic_pantry(size)
+            ]
+            for phase in ("insert", "merge"):
+                statements[0] = 0
+                start = time.perf_counter()
+                _bulk(Session, items)
+                elapsed = time.perf_counter() - start
+                rows.append({
+                    "items": len(items),
+                    "phase": phase,
+                    "ms": elapsed * 1000,
+                    "statements": statements[0],
+                })
+            engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'items':>7} {'phase':>7} {'ms':>9} {'statements':>11}")
+    for row in run(args.sizes):
+        print(f"{row['items']:>7} {row['phase']:>7} {row['ms']:>9.1f} {row['statements']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Recall and latency of trigram candidate pruning against brute-force matching.
+
+For each pantry size, the same queries are matched twice: once scoring every
+name (``MATCHER_PRUNE_MIN=0``) and once scoring only each query's top-K
+trigram candidates. Queries are misspelled pantry names and base ingredients,
+so every one takes the fuzzy path rather than an exact or token lookup.
+
+Reported per size:
+- index build time
+- per-query latency of both paths
+- score recall: the share of queries whose best score matches brute force
+- item agreement: the share that picked the same pantry item
+
+Run with ``python -m backend.benchmarks.bench_candidates``.
+"""
+
+import argparse
+import time
+
+from ..config import settings
+from ..services.ingredient_matcher import PantryMatcher
+from .data import BASE_INGREDIENTS, synthetic_pantry, typo_queries
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(sizes: list[int], queries: int, candidates: int) -> list[dict]:
+    saved = settings.matcher_prune_min, settings.matcher_candidates
+    rows = []
+    try:
+        settings.matcher_candidates = candidates
+        for size in sizes:
+            pantry = synthetic_pantry(size)
+            names = typo_queries(pantry + BASE_INGREDIENTS, queries, seed=size)
+            matcher = PantryMatcher.from_names(pantry)
+
+            settings.matcher_prune_min = 0
+            brute, brute_s = _timed(lambda: matcher.match_many(names))
+            settings.matcher_prune_min = 1
+            _, build_s = _timed(matcher._get_trigrams)
+            pruned, pruned_s = _timed(lambda: matcher.match_many(names))
+
+            same_score = sum(abs(a.score - b.score) < 1e-9 for a, b in zip(brute, pruned))
+            same_item = sum(a.pantry_id == b.pantry_id for a, b in zip(brute, pruned))
+            rows.append({
+                "pantry_size": size,
+                "build_ms": build_s * 1000,
+                "brute_ms_per_query": brute_s * 1000 / len(names),
+                "pruned_ms_per_query": pruned_s * 1000 / len(names),
+                "score_recall": same_score / len(names),
+                "item_agreement": same_item / len(names),
+            })
+    finally:
+        settings.matcher_prune_min, settings.matcher_candidates = saved
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000, 250000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=settings.matcher_candidates)
+    args = parser.parse_args()
+
+    print(
+        f"{'pantry':>8} {'build ms':>9} {'brute ms/q':>11} {'pruned ms/q':>12} "
+        f"{'speedup':>8} {'recall':>7} {'same item':>10}"
+    )
+    for row in run(args.sizes, args.queries, args.candidates):
+        speedup = row["brute_ms_per_query"] / row["pruned_ms_per_query"]
+        print(
+            f"{row['pantry_size']:>8} {row['build_ms']:>9.0f} {row['brute_ms_per_query']:>11.3f} "
+            f"{row['pruned_ms_per_query']:>12.3f} {speedup:>7.1f}x "
+            f"{row['score_recall']:>7.3f} {row['item_agreement']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
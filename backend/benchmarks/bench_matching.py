@@ -0,0 +1,64 @@
+"""Compare per-item matching against the batched cdist path.
+
+Run with ``python -m backend.benchmarks.bench_matching``.
+"""
+
+import argparse
+import time
+
+from ..services.ingredient_matcher import PantryMatcher
+from .data import recipe_lines, synthetic_pantry
+
+
+def _names(lines: list[str]) -> list[str]:
+    # Skip the CRF model; crude names are enough to exercise the matcher
+    return [line.split(",")[0].lower() for line in lines]
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(pantry_sizes: list[int], recipe_size: int, repeat: int) -> list[dict]:
+    names = _names(recipe_lines(recipe_size))
+    rows = []
+    for size in pantry_sizes:
+        matcher = PantryMatcher.from_names(synthetic_pantry(size))
+        per_item = [matcher.match(n) for n in names]
+        batched = matcher.match_many(names)
+        assert [r.pantry_match for r in per_item] == [r.pantry_match for r in batched]
+
+        loop_s = _time(lambda: [matcher.match(n) for n in names], repeat)
+        cdist_s = _time(lambda: matcher.match_many(names), repeat)
+        rows.append({
+            "pantry_size": size,
+            "recipe_size": recipe_size,
+            "per_item_ms": loop_s * 1000,
+            "cdist_ms": cdist_s * 1000,
+            "speedup": loop_s / cdist_s if cdist_s else float("inf"),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pantry-sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--recipe-size", type=int, default=45)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'pantry':>8} {'per-item ms':>12} {'cdist ms':>10} {'speedup':>8}")
+    for row in run(args.pantry_sizes, args.recipe_size, args.repeat):
+        print(
+            f"{row['pantry_size']:>8} {row['per_item_ms']:>12.2f} "
+            f"{row['cdist_ms']:>10.2f} {row['speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Per-request middleware overhead: BaseHTTPMiddleware vs pure ASGI vs metrics.
+
+Sends requests in-process (httpx ASGITransport, no sockets) to a one-route
+app. The route runs a trivial SQLite query, so the metrics variant pays for
+its cursor hooks too. Four variants of the middleware stack are compared:
+- bare: no middleware at all
+- http middleware: the old ``@app.middleware("http")`` API key and rate
+  limit functions
+- pure ASGI: ApiKeyMiddleware and RateLimitMiddleware
+- pure ASGI + metrics: the same plus MetricsMiddleware and the engine hooks
+
+Run with ``python -m backend.benchmarks.bench_middleware``.
+"""
+
+import argparse
+import asyncio
+import hmac
+import math
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, text
+
+from ..config import settings
+from ..middleware import ApiKeyMiddleware, MetricsMiddleware, RateLimitMiddleware
+from ..services import metrics
+from ..services.rate_limit import Limit, MemoryBuckets, RateLimiter
+
+# Never rejects during the benchmark
+_LIMITS = {name: Limit.per_minute(10**9, 10**9) for name in ("read", "write", "compute", "upload")}
+
+
+def _app(variant: str) -> FastAPI:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+
+    @app.get("/api/pantry/{item_id}")
+    async def item(item_id: int):
+        with engine.connect() as conn:
+            value = conn.execute(text("SELECT :v"), {"v": item_id}).scalar()
+        return {"id": value}
+
+    limiter = RateLimiter(_LIMITS, MemoryBuckets(20000))
+    if variant == "http middleware":
+        # The pre-ASGI functions from main.py
+
+        @app.middleware("http")
+        async def api_key_auth(request: Request, call_next):
+            if not settings.api_key:
+                return await call_next(request)
+            path = request.url.path
+            if not path.startswith("/api/") or path == "/api/health":
+                return await call_next(request)
+            if not hmac.compare_digest(request.headers.get("X-Api-Key", ""), settings.api_key):
+                return JSONResponse(status_code=401, content={"detail": "Invalid or missing API key"})
+            return await call_next(request)
+
+        @app.middleware("http")
+        async def rate_limit(request: Request, call_next):
+            client_ip = request.client.host if request.client else "unknown"
+            retry_after = limiter.check(request.method, request.url.path, client_ip)
+            if retry_after:
+                return JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too many requests."},
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+            return await call_next(request)
+
+    elif variant.startswith("pure ASGI"):
+        app.add_middleware(ApiKeyMiddleware)
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+        if variant.endswith("metrics"):
+            metrics.instrument_engines()
+            app.add_middleware(MetricsMiddleware, registry=metrics.Registry())
+    return app
+
+
+async def _measure(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(50):  # warm up
+            await client.get(f"/api/pantry/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(f"/api/pantry/{i}")
+            assert response.status_code == 200
+        return (time.perf_counter() - start) / requests
+
+
+def run(requests: int, repeat: int) -> list[dict]:
+    # Metrics last: the engine hooks, once installed, stay for the process
+    variants = ("bare", "http middleware", "pure ASGI", "pure ASGI + metrics")
+    rows = []
+    bare = None
+    for variant in variants:
+        app = _app(variant)
+        per_request = min(asyncio.run(_measure(app, requests)) for _ in range(repeat))
+        bare = bare if bare is not None else per_request
+        rows.append({
+            "variant": variant,
+            "us_per_request": per_request * 1e6,
+            "overhead_us": (per_request - bare) * 1e6,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'variant':>20} {'us/request':>11} {'overhead us':>12}")
+    for row in run(args.requests, args.repeat):
+        print(f"{row['variant']:>20} {row['us_per_request']:>11.1f} {row['overhead_us']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare serial ingredient parsing against the batched process pool.
+
+Run with ``python -m backend.benchmarks.bench_parsing``.
+"""
+
+import argparse
+import time
+
+from ..services.ingredient_parser import ParserPool, parse_many, warm_up
+from .data import recipe_lines
+
+
+def run(line_count: int, worker_counts: list[int], batch_size: int) -> list[dict]:
+    lines = recipe_lines(line_count)
+    warm_up()
+    start = time.perf_counter()
+    parse_many(lines)
+    serial_s = time.perf_counter() - start
+    rows = [{"workers": 0, "seconds": serial_s, "lines_per_s": line_count / serial_s}]
+
+    for workers in worker_counts:
+        pool = ParserPool(workers=workers, batch_size=batch_size)
+        pool.start()
+        try:
+            start = time.perf_counter()
+            pool.parse(lines)
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+        rows.append({"workers": workers, "seconds": elapsed, "lines_per_s": line_count / elapsed})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'seconds':>9} {'lines/s':>9}")
+    for row in run(args.lines, args.workers, args.batch_size):
+        label = "serial" if row["workers"] == 0 else row["workers"]
+        print(f"{label:>8} {row['seconds']:>9.2f} {row['lines_per_s']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Per-request rate limiter overhead: sliding-window lists vs token buckets.
+
+The baseline is the old middleware's algorithm: one timestamp list per IP,
+rebuilt by a list comprehension on every request, with all state wiped when
+too many IPs are tracked. It's compared against the in-memory and shared
+SQLite token buckets, over different numbers of distinct clients.
+
+Run with ``python -m backend.benchmarks.bench_rate_limit``.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from ..services.rate_limit import Limit, MemoryBuckets, SqliteBuckets
+
+_WINDOW = 60
+_LIMIT = 30
+_MAX_TRACKED_IPS = 10000
+
+
+class SlidingWindow:
+    """The pre-token-bucket limiter, as it was in main.py."""
+
+    def __init__(self):
+        self.store: dict[str, list[float]] = defaultdict(list)
+        self.clears = 0
+
+    def take(self, key: str, _limit=None) -> float:
+        now = time.monotonic()
+        self.store[key] = [t for t in self.store[key] if now - t < _WINDOW]
+        if len(self.store) > _MAX_TRACKED_IPS:
+            self.store.clear()
+            self.clears += 1
+        if len(self.store[key]) >= _LIMIT:
+            return 1.0
+        self.store[key].append(now)
+        return 0.0
+
+
+def _keys(clients: int, requests: int) -> list[str]:
+    rng = random.Random(clients)
+    return [f"read:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in (
+        rng.randrange(clients) for _ in range(requests)
+    )]
+
+
+def _time(store, keys: list[str], limit: Limit) -> tuple[float, int]:
+    take = store.take
+    start = time.perf_counter()
+    rejected = sum(1 for key in keys if take(key, limit))
+    return (time.perf_counter() - start) / len(keys), rejected
+
+
+def run(client_counts: list[int], requests: int) -> list[dict]:
+    limit = Limit.per_minute(_LIMIT, _LIMIT)
+    rows = []
+    for clients in client_counts:
+        keys = _keys(clients, requests)
+        with tempfile.TemporaryDirectory() as tmp:
+            stores = {
+                "sliding window": SlidingWindow(),
+                "memory bucket": MemoryBuckets(20000),
+                "sqlite bucket": SqliteBuckets(str(Path(tmp) / "rl.db"), 20000, limit.full_after),
+            }
+            for name, store in stores.items():
+                per_check, rejected = _time(store, keys, limit)
+                rows.append({
+                    "clients": clients,
+                    "limiter": name,
+                    "us_per_check": per_check * 1e6,
+                    "rejected": rejected,
+                    "state_wipes": getattr(store, "clears", 0),
+                })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 100, 5000, 20000])
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'limiter':>15} {'us/check':>9} {'rejected':>9} {'wipes':>6}")
+    for row in run(args.clients, args.requests):
+        print(
+            f"{row['clients']:>8} {row['limiter']:>15} {row['us_per_check']:>9.2f} "
+            f"{row['rejected']:>9} {row['state_wipes']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
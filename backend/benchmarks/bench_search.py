@@ -0,0 +1,69 @@
+"""Compare LIKE '%term%' pantry search against the FTS5 trigram index.
+
+Run with ``python -m backend.benchmarks.bench_search``.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from ..database import Base
+from ..models import PantryItem
+from ..services.pantry_search import apply_search
+from .data import synthetic_pantry
+
+TERMS = ["garlic", "smoked pap", "cheese", "organic", "saffron"]
+
+
+def _time_search(db, search: str, use_fts: bool, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if use_fts:
+            apply_search(db.query(PantryItem), db, search).all()
+        else:
+            db.query(PantryItem).filter(PantryItem.name.ilike(f"%{search}%")).order_by(
+                PantryItem.name
+            ).all()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+            Base.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(insert(PantryItem), [{"name": n} for n in synthetic_pantry(size)])
+            db = sessionmaker(bind=engine)()
+            for term in TERMS:
+                rows.append({
+                    "pantry_size": size,
+                    "term": term,
+                    "like_ms": _time_search(db, term, False, repeat) * 1000,
+                    "fts_ms": _time_search(db, term, True, repeat) * 1000,
+                })
+            db.close()
+            engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'pantry':>8} {'term':>12} {'LIKE ms':>9} {'FTS ms':>8}")
+    for row in run(args.sizes, args.repeat):
+        print(f"{row['pantry_size']:>8} {row['term']:>12} {row['like_ms']:>9.2f} {row['fts_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
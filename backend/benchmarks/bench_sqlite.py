@@ -0,0 +1,116 @@
+"""Concurrent read/write throughput: default SQLite settings vs the tuned profile.
+
+Spawns writer and reader processes (like gunicorn workers) against one
+scratch database file and counts completed operations and lock errors.
+
+Run with ``python -m backend.benchmarks.bench_sqlite``.
+"""
+
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from ..database import Base, create_sqlite_engine, is_busy_error, sqlite_pragmas
+from ..models import PantryItem
+from .data import synthetic_pantry
+
+# The pre-profile engine still waited the pysqlite default 5 s on locks
+DEFAULT_PRAGMAS = {"busy_timeout": 5000, "journal_mode": "delete"}
+
+
+def _worker(url: str, pragmas: dict, role: str, seconds: float, results) -> None:
+    engine = create_sqlite_engine(url, pragmas)
+    rng = random.Random()
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with engine.begin() as conn:
+                if role == "write":
+                    conn.execute(
+                        update(PantryItem)
+                        .where(PantryItem.id == rng.randint(1, 1000))
+                        .values(quantity=PantryItem.quantity + 1)
+                    )
+                    conn.execute(insert(PantryItem).values(name=f"item {rng.random()}"))
+                else:
+                    conn.execute(
+                        select(PantryItem).order_by(PantryItem.name).limit(100)
+                    ).all()
+                    conn.execute(select(func.count(PantryItem.id))).scalar()
+            done += 1
+        except OperationalError as exc:
+            if not is_busy_error(exc):
+                raise
+            errors += 1
+    results.put((role, done, errors))
+    engine.dispose()
+
+
+def run(writers: int, readers: int, seconds: float) -> list[dict]:
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+    for profile, pragmas, read_pragmas in (
+        ("default", DEFAULT_PRAGMAS, DEFAULT_PRAGMAS),
+        ("tuned", sqlite_pragmas(), sqlite_pragmas(read_only=True)),
+    ):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+            setup = create_sqlite_engine(url, pragmas)
+            Base.metadata.create_all(setup)
+            with setup.begin() as conn:
+                conn.execute(
+                    insert(PantryItem),
+                    [{"name": n, "quantity": 1} for n in synthetic_pantry(1000)],
+                )
+            setup.dispose()
+
+            results = ctx.Queue()
+            procs = [
+                ctx.Process(target=_worker, args=(url, pragmas, "write", seconds, results))
+                for _ in range(writers)
+            ] + [
+                ctx.Process(target=_worker, args=(url, read_pragmas, "read", seconds, results))
+                for _ in range(readers)
+            ]
+            for proc in procs:
+                proc.start()
+            totals = {"write": [0, 0], "read": [0, 0]}
+            for _ in procs:
+                role, done, errors = results.get()
+                totals[role][0] += done
+                totals[role][1] += errors
+            for proc in procs:
+                proc.join()
+            rows.append({
+                "profile": profile,
+                "writes_per_s": totals["write"][0] / seconds,
+                "reads_per_s": totals["read"][0] / seconds,
+                "lock_errors": totals["write"][1] + totals["read"][1],
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':>8} {'writes/s':>9} {'reads/s':>9} {'lock errors':>12}")
+    for row in run(args.writers, args.readers, args.seconds):
+        print(
+            f"{row['profile']:>8} {row['writes_per_s']:>9.0f} "
+            f"{row['reads_per_s']:>9.0f} {row['lock_errors']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
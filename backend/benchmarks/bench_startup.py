@@ -0,0 +1,172 @@
+"""Gunicorn start-up with and without preloading: readiness, first requests, memory.
+
+Starts the real server (``gunicorn.conf.py``) on a scratch database twice,
+once with ``GUNICORN_PRELOAD=1`` and once with ``0``. Reported for each:
+- seconds until ``/api/health`` answers
+- latency of the first and second recipe diff and photo upload. The
+  latency run uses one worker so both requests land on the same process.
+  Gemini points at a closed local port, so an upload measures the SDK's
+  first-use cost, not the network.
+- with ``--workers`` workers: the summed private (USS) and proportional
+  (PSS) memory of the worker processes. Their process pools are excluded.
+
+Run with ``python -m backend.benchmarks.bench_startup``.
+"""
+
+import argparse
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[2]
+_DIFF = {"ingredients": ["2 cups flour", "1 tsp salt", "3 eggs"]}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _photo() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), "orange").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def _start(tmp: Path, preload: bool, workers: int) -> tuple[subprocess.Popen, str, float]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp / 'pantry.db'}",
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "WEB_CONCURRENCY": str(workers),
+        "METRICS_DIR": str(tmp / "metrics"),
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_COMPUTE_PER_MINUTE": "100000",
+        "RATE_LIMIT_UPLOAD_PER_MINUTE": "100000",
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{_free_port()}",
+        "GEMINI_MAX_RETRIES": "0",
+    }
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            if httpx.get(f"{base}/api/health", timeout=1).status_code == 200:
+                break
+        except httpx.TransportError:
+            pass
+        if proc.poll() is not None or time.perf_counter() - started > 120:
+            raise RuntimeError("gunicorn did not start")
+        time.sleep(0.05)
+    return proc, base, time.perf_counter() - started
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    proc.wait(timeout=30)
+
+
+def _timed(fn) -> tuple[float, int]:
+    start = time.perf_counter()
+    response = fn()
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+
+def _memory(pid: int) -> dict[str, int]:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Pss", "Private_Clean", "Private_Dirty"):
+                fields[name] = int(rest.split()[0]) * 1024
+    return {"uss": fields["Private_Clean"] + fields["Private_Dirty"], "pss": fields["Pss"]}
+
+
+def _workers(master: int) -> list[int]:
+    children = Path(f"/proc/{master}/task/{master}/children").read_text().split()
+    return [int(pid) for pid in children]
+
+
+def run(workers: int) -> list[dict]:
+    photo = _photo()
+    rows = []
+    for preload in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, base, ready_s = _start(Path(tmp), preload, workers=1)
+            try:
+                # A fresh connection per request: a 500 closes a kept-alive one
+                upload = lambda: httpx.post(  # noqa: E731
+                    f"{base}/api/photos/upload",
+                    files={"photo": ("p.jpg", photo, "image/jpeg")},
+                    timeout=120,
+                )
+                diff = lambda: httpx.post(f"{base}/api/recipes/diff", json=_DIFF, timeout=120)  # noqa: E731
+                first_diff, diff_status = _timed(diff)
+                second_diff, _ = _timed(diff)
+                first_upload, upload_status = _timed(upload)
+                second_upload, _ = _timed(upload)
+            finally:
+                _stop(proc)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, _, _ = _start(Path(tmp), preload, workers=workers)
+            try:
+                deadline = time.perf_counter() + 60
+                while len(pids := _workers(proc.pid)) < workers and time.perf_counter() < deadline:
+                    time.sleep(0.1)
+                time.sleep(1)  # let lifespans finish
+                usage = [_memory(pid) for pid in pids]
+            finally:
+                _stop(proc)
+
+        rows.append({
+            "preload": preload,
+            "ready_s": ready_s,
+            "first_diff_ms": first_diff,
+            "second_diff_ms": second_diff,
+            "diff_status": diff_status,
+            "first_upload_ms": first_upload,
+            "second_upload_ms": second_upload,
+            "upload_status": upload_status,
+            "workers": len(usage),
+            "worker_uss_mb": sum(u["uss"] for u in usage) / 2**20,
+            "worker_pss_mb": sum(u["pss"] for u in usage) / 2**20,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(
+        f"{'preload':>8} {'ready s':>8} {'diff 1st/2nd ms':>16} {'upload 1st/2nd ms':>18} "
+        f"{'workers':>8} {'USS MB':>7} {'PSS MB':>7}"
+    )
+    for row in run(args.workers):
+        diff = f"{row['first_diff_ms']:.0f}/{row['second_diff_ms']:.0f} ({row['diff_status']})"
+        upload = f"{row['first_upload_ms']:.0f}/{row['second_upload_ms']:.0f} ({row['upload_status']})"
+        print(
+            f"{'yes' if row['preload'] else 'no':>8} {row['ready_s']:>8.2f} {diff:>16} {upload:>18} "
+            f"{row['workers']:>8} {row['worker_uss_mb']:>7.0f} {row['worker_pss_mb']:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
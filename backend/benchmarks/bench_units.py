@@ -0,0 +1,96 @@
+"""Per-ingredient cost of quantity-aware diffs.
+
+Times, per ingredient line:
+- uncached unit resolution (the table lookups behind ``resolve``)
+- cached resolution (the ``lru_cache`` hit a diff actually pays)
+- ``coverage`` against matched pantry stock (two cached resolves and the
+  comparison)
+- ``match_many`` against a pantry, for scale: the coverage work should be a
+  small fraction of it
+
+Run with ``python -m backend.benchmarks.bench_units``.
+"""
+
+import argparse
+import random
+import time
+
+from ..services.ingredient_matcher import PantryMatcher
+from ..services.units import coverage, resolve
+from .data import BASE_INGREDIENTS, QUANTITIES, UNITS, synthetic_pantry
+
+_STOCK_UNITS = ["g", "kg", "ml", "l", "cup", "oz", "lb", "each", None]
+
+
+def _lines(count: int, seed: int) -> list[tuple[str, float, str | None, float, str | None]]:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        quantity = QUANTITIES[rng.randrange(len(QUANTITIES))].split()[-1]
+        numerator, _, denominator = quantity.partition("/")
+        lines.append((
+            rng.choice(BASE_INGREDIENTS),
+            float(numerator) / float(denominator or 1),
+            rng.choice(UNITS + [None]),
+            rng.choice([None, 0.5, 1, 2, 250, 500]),
+            rng.choice(_STOCK_UNITS),
+        ))
+    return lines
+
+
+def _per_line(fn, lines, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(lines)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines)
+
+
+def run(count: int, pantry_size: int, repeat: int) -> list[dict]:
+    lines = _lines(count, seed=0)
+    matcher = PantryMatcher.from_names(synthetic_pantry(pantry_size))
+    names = [line[0] for line in lines]
+    uncached = resolve.__wrapped__
+
+    def resolve_uncached(lines):
+        for _, _, unit, _, stock_unit in lines:
+            uncached(unit)
+            uncached(stock_unit)
+
+    def resolve_cached(lines):
+        for _, _, unit, _, stock_unit in lines:
+            resolve(unit)
+            resolve(stock_unit)
+
+    def cover(lines):
+        for _, quantity, unit, stock, stock_unit in lines:
+            coverage(True, quantity, unit, stock, stock_unit)
+
+    resolve_cached(lines)  # warm the cache
+    cases = {
+        "resolve (uncached)": resolve_uncached,
+        "resolve (cached)": resolve_cached,
+        "coverage": cover,
+        f"match_many ({pantry_size} items)": lambda lines: matcher.match_many(names),
+    }
+    return [
+        {"case": case, "us_per_line": _per_line(fn, lines, repeat) * 1e6}
+        for case, fn in cases.items()
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--pantry-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':>28} {'us/line':>9}")
+    for row in run(args.lines, args.pantry_size, args.repeat):
+        print(f"{row['case']:>28} {row['us_per_line']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
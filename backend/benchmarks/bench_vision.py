@@ -0,0 +1,154 @@
+"""Payload size and latency of photo uploads with and without preprocessing.
+
+The Gemini client is replaced by a fake that "uploads" at a fixed bandwidth
+and answers after a fixed model latency, so the benchmark runs offline.
+Token estimates use Gemini's 258 tokens per 768x768 tile.
+
+Run with ``python -m backend.benchmarks.bench_vision``.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+from ..services import vision
+from ..services.image_convert import init_worker
+from ..services.image_preprocess import prepare_image
+from .data import sample_photos
+
+
+class FakeVisionClient:
+    """Stands in for ``genai.Client``'s ``aio.models`` calls.
+
+    A call "uploads" the image at ``bandwidth_mbps``, waits ``model_ms``
+    for the first token, then generates ``items`` detections at
+    ``item_ms`` each. The streaming call yields each item as it is generated.
+    """
+
+    def __init__(self, bandwidth_mbps: float, model_ms: float, items: int = 0, item_ms: float = 0.0):
+        self.bandwidth_mbps = bandwidth_mbps
+        self.model_ms = model_ms
+        self.items = items
+        self.item_ms = item_ms
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self.generate_content,
+            generate_content_stream=self.generate_content_stream,
+        ))
+
+    def _chunks(self) -> list[str]:
+        # One chunk per item, with the array brackets folded into the ends
+        chunks = [
+            ("[" if i == 0 else ",") + json.dumps({"name": f"item {i}", "quantity": 1})
+            for i in range(self.items)
+        ] or ["["]
+        chunks[-1] += "]"
+        return chunks
+
+    async def _first_token(self, contents) -> None:
+        payload = contents[0].parts[1].inline_data.data
+        upload_s = len(payload) * 8 / (self.bandwidth_mbps * 1e6)
+        await asyncio.sleep(upload_s + self.model_ms / 1000)
+
+    async def generate_content(self, model, contents, config):
+        await self._first_token(contents)
+        await asyncio.sleep(self.items * self.item_ms / 1000)
+        return SimpleNamespace(text="".join(self._chunks()))
+
+    async def generate_content_stream(self, model, contents, config):
+        await self._first_token(contents)
+
+        async def chunks():
+            for text in self._chunks():
+                await asyncio.sleep(self.item_ms / 1000)
+                yield SimpleNamespace(text=text)
+
+        return chunks()
+
+
+def _tokens(data: bytes) -> int:
+    width, height = Image.open(io.BytesIO(data)).size
+    if max(width, height) <= 384:
+        return 258
+    return math.ceil(width / 768) * math.ceil(height / 768) * 258
+
+
+def _baseline(data: bytes, mime_type: str) -> tuple[bytes, str]:
+    """The pre-preprocessing pipeline: only HEIC is touched, re-encoded at q90."""
+    if mime_type not in ("image/heic", "image/heif"):
+        return data, mime_type
+    buf = io.BytesIO()
+    Image.open(io.BytesIO(data)).convert("RGB").save(buf, format="JPEG", quality=90)
+    return buf.getvalue(), "image/jpeg"
+
+
+async def _timed_upload(prepare, data: bytes, mime_type: str) -> tuple[float, bytes]:
+    start = time.perf_counter()
+    payload, mime = prepare(data, mime_type)
+    await vision.analyze_image(payload, mime)
+    return time.perf_counter() - start, payload
+
+
+def run(bandwidth_mbps: float, model_ms: float, max_long_edge: int, max_bytes: int, heic: bool) -> list[dict]:
+    init_worker()
+    vision._client = FakeVisionClient(bandwidth_mbps, model_ms)
+    vision._client_initialized = True
+
+    def preprocessed(data, mime_type):
+        prepared = prepare_image(data, mime_type, max_long_edge, max_bytes)
+        return prepared.data, prepared.mime_type
+
+    rows = []
+    try:
+        for label, data, mime_type in sample_photos(heic=heic):
+            base_s, base_payload = asyncio.run(_timed_upload(_baseline, data, mime_type))
+            prep_start = time.perf_counter()
+            preprocessed(data, mime_type)
+            prep_s = time.perf_counter() - prep_start
+            new_s, new_payload = asyncio.run(_timed_upload(preprocessed, data, mime_type))
+            rows.append({
+                "image": label,
+                "original_kb": len(data) / 1024,
+                "baseline_kb": len(base_payload) / 1024,
+                "prepared_kb": len(new_payload) / 1024,
+                "baseline_tokens": _tokens(base_payload),
+                "prepared_tokens": _tokens(new_payload),
+                "preprocess_ms": prep_s * 1000,
+                "baseline_ms": base_s * 1000,
+                "prepared_ms": new_s * 1000,
+            })
+    finally:
+        vision._client = None
+        vision._client_initialized = False
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0, help="simulated uplink")
+    parser.add_argument("--model-ms", type=float, default=1500.0, help="simulated model latency")
+    parser.add_argument("--max-long-edge", type=int, default=1600)
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--no-heic", action="store_true", help="skip the (slow to encode) HEIC sample")
+    args = parser.parse_args()
+
+    print(
+        f"{'image':>14} {'orig KB':>8} {'base KB':>8} {'prep KB':>8} {'base tok':>9}"
+        f" {'prep tok':>9} {'proc ms':>8} {'base ms':>8} {'new ms':>9}"
+    )
+    rows = run(args.bandwidth_mbps, args.model_ms, args.max_long_edge, args.max_bytes, not args.no_heic)
+    for row in rows:
+        print(
+            f"{row['image']:>14} {row['original_kb']:>8.0f} {row['baseline_kb']:>8.0f}"
+            f" {row['prepared_kb']:>8.0f} {row['baseline_tokens']:>9} {row['prepared_tokens']:>9}"
+            f" {row['preprocess_ms']:>8.0f} {row['baseline_ms']:>8.0f} {row['prepared_ms']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time to first detected item: buffered analyze_image vs streamed stream_image.
+
+Uses the offline fake Gemini client from bench_vision, which waits for the
+upload and time-to-first-token and then generates items one at a time.
+
+Run with ``python -m backend.benchmarks.bench_vision_stream``.
+"""
+
+import argparse
+import asyncio
+import time
+
+from ..services import vision
+from .bench_vision import FakeVisionClient
+
+# A 1600px JPEG after preprocessing
+_PAYLOAD = b"\0" * 700 * 1024
+
+
+async def _buffered() -> tuple[float, float]:
+    start = time.perf_counter()
+    await vision.analyze_image(_PAYLOAD, "image/jpeg")
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def _streamed() -> tuple[float, float]:
+    start = time.perf_counter()
+    first = None
+    async for _ in vision.stream_image(_PAYLOAD, "image/jpeg"):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run(item_counts: list[int], bandwidth_mbps: float, model_ms: float, item_ms: float) -> list[dict]:
+    vision._request(b"", "image/jpeg")  # import the SDK outside the timings
+    rows = []
+    try:
+        for items in item_counts:
+            vision._client = FakeVisionClient(bandwidth_mbps, model_ms, items, item_ms)
+            vision._client_initialized = True
+            buffered_first, buffered_total = asyncio.run(_buffered())
+            streamed_first, streamed_total = asyncio.run(_streamed())
+            rows.append({
+                "items": items,
+                "buffered_first_ms": buffered_first * 1000,
+                "streamed_first_ms": streamed_first * 1000,
+                "buffered_total_ms": buffered_total * 1000,
+                "streamed_total_ms": streamed_total * 1000,
+            })
+    finally:
+        vision._client = None
+        vision._client_initialized = False
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 5, 15, 30])
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0)
+    parser.add_argument("--model-ms", type=float, default=800.0, help="time to first token")
+    parser.add_argument("--item-ms", type=float, default=120.0, help="generation time per item")
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'buf first':>10} {'str first':>10} {'buf total':>10} {'str total':>10}")
+    for row in run(args.items, args.bandwidth_mbps, args.model_ms, args.item_ms):
+        print(
+            f"{row['items']:>6} {row['buffered_first_ms']:>10.0f} {row['streamed_first_ms']:>10.0f}"
+            f" {row['buffered_total_ms']:>10.0f} {row['streamed_total_ms']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
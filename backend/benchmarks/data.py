@@ -0,0 +1,156 @@
+"""Synthetic pantries and ingredient lines for benchmarks."""
+
+import random
+
+BASE_INGREDIENTS = [
+    "garlic", "olive oil", "salt", "black pepper", "onion", "butter", "flour",
+    "sugar", "brown sugar", "eggs", "milk", "heavy cream", "parmesan cheese",
+    "cheddar cheese", "chicken breast", "chicken thigh", "ground beef", "bacon",
+    "rice", "basmati rice", "pasta", "spaghetti", "tomato paste", "canned tomatoes",
+    "cumin", "paprika", "smoked paprika", "chili powder", "oregano", "thyme",
+    "rosemary", "basil", "cilantro", "parsley", "lemon", "lime", "ginger",
+    "soy sauce", "fish sauce", "honey", "maple syrup", "vanilla extract",
+    "baking soda", "baking powder", "yeast", "carrots", "celery", "potatoes",
+    "sweet potatoes", "spinach", "kale", "broccoli", "bell pepper", "jalapeno",
+    "avocado", "black beans", "chickpeas", "lentils", "coconut milk", "vinegar",
+    "red wine vinegar", "dijon mustard", "mayonnaise", "sour cream", "yogurt",
+    "mozzarella", "feta cheese", "shrimp", "salmon", "tofu", "scallions",
+]
+MODIFIERS = [
+    "fresh", "dried", "ground", "sliced", "diced", "organic", "frozen", "smoked",
+    "extra virgin", "whole wheat", "low sodium", "unsalted", "roasted", "raw",
+]
+BRANDS = ["acme", "kirkland", "365", "trader joe's", "bob's", "great value"]
+RECIPE_LINES = [
+    "2 cups all-purpose flour", "1 tablespoon olive oil", "3 cloves garlic, minced",
+    "1 teaspoon salt", "1/2 teaspoon black pepper", "1 large onion, diced",
+    "2 tablespoons unsalted butter", "1 cup whole milk", "2 large eggs",
+    "1 lb chicken breast", "1 can black beans, drained", "2 tbsp soy sauce",
+    "1 cup basmati rice", "1 tsp ground cumin", "1/4 cup fresh cilantro",
+    "1 lime, juiced", "1 cup heavy cream", "1/2 cup grated parmesan cheese",
+    "8 oz spaghetti", "1 can crushed tomatoes", "1 tsp dried oregano",
+    "2 carrots, peeled and chopped", "1 tbsp fresh ginger, grated",
+    "1 cup frozen peas", "2 tbsp honey", "saffron threads", "1 bunch scallions",
+]
+
+
+def synthetic_pantry(size: int, seed: int = 0) -> list[str]:
+    """Return ``size`` unique pantry names built from base ingredients and modifiers."""
+    rng = random.Random(seed)
+    names = dict.fromkeys(BASE_INGREDIENTS[:size])
+    while len(names) < size:
+        words = rng.sample(MODIFIERS, rng.randint(1, 2))
+        name = " ".join(words + [rng.choice(BASE_INGREDIENTS)])
+        if name in names:
+            # Large pantries outgrow the combinations; add a brand-like suffix
+            name = f"{name} {rng.choice(BRANDS)} {len(names)}"
+        names[name] = None
+    return list(names)
+
+
+def recipe_lines(count: int, seed: int = 0) -> list[str]:
+    """Return ``count`` raw recipe ingredient lines."""
+    rng = random.Random(seed)
+    return [rng.choice(RECIPE_LINES) for _ in range(count)]
+
+
+QUANTITIES = ["1", "2", "3", "4", "1/2", "1/4", "3/4", "1 1/2", "2 1/2", "8", "12", "16"]
+UNITS = [
+    "cup", "cups", "tablespoon", "tablespoons", "tbsp", "teaspoon", "tsp", "ounce",
+    "oz", "pound", "lb", "gram", "g", "ml", "clove", "cloves", "can", "pinch", "bunch",
+]
+PREPARATIONS = [
+    "finely chopped", "minced", "diced", "thinly sliced", "at room temperature",
+    "divided", "drained and rinsed", "to taste", "plus more for serving", "softened",
+]
+
+
+def ingredient_corpus(count: int, seed: int = 0) -> list[str]:
+    """Return ``count`` varied ingredient lines: quantity, unit, modifiers, preparation."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        parts = []
+        if rng.random() < 0.9:
+            parts.append(rng.choice(QUANTITIES))
+            if rng.random() < 0.75:
+                parts.append(rng.choice(UNITS))
+        if rng.random() < 0.4:
+            parts.append(rng.choice(MODIFIERS))
+        parts.append(rng.choice(BASE_INGREDIENTS))
+        line = " ".join(parts)
+        if rng.random() < 0.35:
+            line += ", " + rng.choice(PREPARATIONS)
+        lines.append(line)
+    return lines
+
+
+def _photo_image(size: tuple[int, int], grain: int):
+    """Smooth colour gradients plus coarse grain, compressing like a phone photo."""
+    from PIL import Image, ImageChops
+
+    base = Image.merge("RGB", [
+        Image.linear_gradient("L").resize(size),
+        Image.radial_gradient("L").resize(size),
+        Image.linear_gradient("L").rotate(90).resize(size),
+    ])
+    if not grain:
+        return base
+    noise = Image.effect_noise((size[0] // 4, size[1] // 4), grain).resize(size).convert("RGB")
+    return ImageChops.add(base, noise, offset=-64)
+
+
+def sample_photos(heic: bool = True) -> list[tuple[str, bytes, str]]:
+    """Return ``(label, data, mime_type)`` photos shaped like phone uploads."""
+    import io
+
+    from PIL import Image
+
+    photos = []
+
+    def jpeg(label, size, grain, orientation=None):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"
+        if orientation:
+            exif[0x0112] = orientation
+        buf = io.BytesIO()
+        _photo_image(size, grain).save(buf, format="JPEG", quality=95, exif=exif.tobytes())
+        photos.append((label, buf.getvalue(), "image/jpeg"))
+
+    jpeg("12MP jpeg", (4032, 3024), 40)
+    jpeg("12MP portrait", (4032, 3024), 40, orientation=6)
+    jpeg("3MP jpeg", (2048, 1536), 40)
+    buf = io.BytesIO()
+    _photo_image((4032, 3024), 40).save(buf, format="PNG")
+    photos.append(("12MP png", buf.getvalue(), "image/png"))
+    buf = io.BytesIO()
+    _photo_image((1024, 768), 0).save(buf, format="JPEG", quality=80)
+    photos.append(("small jpeg", buf.getvalue(), "image/jpeg"))
+    if heic:
+        import pillow_heif
+
+        # HEIC encoding is slow, so the sample stays smooth and mid-sized
+        buf = io.BytesIO()
+        pillow_heif.from_pillow(_photo_image((2016, 1512), 0)).save(buf, quality=80)
+        photos.append(("3MP heic", buf.getvalue(), "image/heic"))
+    return photos
+
+
+def typo_queries(names: list[str], count: int, seed: int = 0) -> list[str]:
+    """Return ``count`` misspelled variants of ``names``, which force fuzzy scoring."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    queries = []
+    for _ in range(count):
+        chars = list(rng.choice(names))
+        for _ in range(rng.randint(1, 2)):
+            i = rng.randrange(len(chars))
+            edit = rng.random()
+            if edit < 0.4:
+                chars[i] = rng.choice(letters)
+            elif edit < 0.7 and len(chars) > 3:
+                del chars[i]
+            elif i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        queries.append("".join(chars))
+    return queries
@@ -0,0 +1,378 @@
+"""Benchmark suite for the backend hot paths, with a regression check.
+
+Builds synthetic pantries (100 to 100k items by default) in scratch SQLite
+files and a corpus of varied ingredient lines. It measures throughput and
+latency percentiles for parse, match, diff, batch diff (a 20-recipe week),
+bulk insert, search and list, each in two ways:
+- ``service.*``: calling the service functions on a session
+- ``app.*``: requests through the ASGI app in process (httpx ASGITransport),
+  middleware included and rate limits off
+
+Results are written as JSON together with the commit and machine they came
+from. ``--compare`` checks them against an earlier run and exits non-zero
+when any case's latency grew by more than ``--threshold``.
+
+    python -m backend.benchmarks.suite --out bench.json
+    python -m backend.benchmarks.suite --compare bench.json --threshold 0.25
+
+The default run takes under a minute on one core. Use ``--sizes 100 1000 --iterations 20``
+for a quick pass, or ``--cases`` to select cases by substring.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import Base, create_sqlite_engine, sqlite_pragmas
+from ..models import PantryItem
+from ..schemas import PantryItemCreate, RecipeBatchDiffRequest, RecipeDiffRequest
+from ..services import pantry_search
+from ..services.ingredient_matcher import PantryMatcher
+from ..services.ingredient_parser import parse_many
+from ..services.pantry_index import pantry_index
+from ..services.pantry_merge import upsert_items
+from ..services.parse_cache import parse_cache
+from .data import ingredient_corpus, synthetic_pantry
+
+RECIPE_SIZE = 15  # ingredient lines per diff/parse call
+WEEK_SIZE = 20  # recipes per batch diff call
+BULK_SIZE = 100  # items per bulk insert call
+PAGE_SIZE = 100
+SEARCH_TERMS = ["garlic", "smoked pap", "cheese", "organic", "saffron"]
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Latency percentiles (ms) and throughput for per-operation timings in seconds."""
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return 1000 * ordered[min(len(ordered) - 1, round(p * (len(ordered) - 1)))]
+
+    total = sum(ordered)
+    return {
+        "ops": len(ordered),
+        "throughput_per_s": len(ordered) / total if total else 0.0,
+        "mean_ms": 1000 * statistics.fmean(ordered),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": 1000 * ordered[-1],
+    }
+
+
+def _time_each(fn: Callable[[int], object], iterations: int) -> list[float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _time_each_async(fn: Callable[[int], Awaitable[object]], iterations: int) -> list[float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _recipes(iterations: int, seed: int) -> list[list[str]]:
+    corpus = ingredient_corpus(iterations * RECIPE_SIZE, seed=seed)
+    return [corpus[i * RECIPE_SIZE:(i + 1) * RECIPE_SIZE] for i in range(iterations)]
+
+
+def _weeks(iterations: int, seed: int) -> list[RecipeBatchDiffRequest]:
+    # Recipes in a week overlap (salt, oil, garlic...), like a real meal plan
+    recipes = _recipes(iterations * WEEK_SIZE, seed=seed)
+    return [
+        RecipeBatchDiffRequest(recipes=[
+            RecipeDiffRequest(ingredients=lines)
+            for lines in recipes[i * WEEK_SIZE:(i + 1) * WEEK_SIZE]
+        ])
+        for i in range(iterations)
+    ]
+
+
+def _bulk_batch(size: int, layer: str, i: int) -> list[PantryItemCreate]:
+    # New names each call, so every batch inserts into the sized pantry
+    return [
+        PantryItemCreate(name=f"bench {layer} {size} {i} {j}", quantity=1, unit="each")
+        for j in range(BULK_SIZE)
+    ]
+
+
+def _build_pantry(path: Path, size: int):
+    engine = create_sqlite_engine(f"sqlite:///{path}", sqlite_pragmas())
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        pantry_search.install(conn)
+        if size:
+            conn.execute(
+                insert(PantryItem),
+                [{"name": name, "quantity": 1, "unit": "each"} for name in synthetic_pantry(size)],
+            )
+    return engine
+
+
+def _service_cases(db: Session, size: int, iterations: int) -> dict[str, Callable[[int], object]]:
+    from ..routers.recipes import _diff, _diff_batch
+
+    recipes = _recipes(iterations, seed=1)
+    weeks = _weeks(iterations, seed=3)
+    matcher = PantryMatcher.from_names(synthetic_pantry(size))
+    recipe_names = [[line.split(",")[0] for line in recipe] for recipe in recipes]
+
+    def list_pages(i: int) -> None:
+        q = db.query(PantryItem).order_by(PantryItem.name, PantryItem.id)
+        page = q.limit(PAGE_SIZE).all()
+        if page:
+            # Second page through the (name, id) keyset, like the cursor API
+            last = page[-1]
+            q.filter(
+                (PantryItem.name > last.name)
+                | ((PantryItem.name == last.name) & (PantryItem.id > last.id))
+            ).limit(PAGE_SIZE).all()
+
+    def bulk(i: int) -> None:
+        upsert_items(db, _bulk_batch(size, "service", i))
+        db.commit()
+
+    return {
+        "match": lambda i: matcher.match_many(recipe_names[i]),
+        "diff": lambda i: _diff(RecipeDiffRequest(ingredients=recipes[i]), db),
+        "diff_batch": lambda i: _diff_batch(weeks[i], db),
+        "bulk_insert": bulk,
+        "search": lambda i: pantry_search.apply_search(
+            db.query(PantryItem), db, SEARCH_TERMS[i % len(SEARCH_TERMS)]
+        ).all(),
+        "list": list_pages,
+    }
+
+
+def _app_cases(client: httpx.AsyncClient, size: int, iterations: int) -> dict[str, Callable[[int], Awaitable[None]]]:
+    recipes = _recipes(iterations, seed=2)
+
+    async def ok(request: Awaitable[httpx.Response]) -> httpx.Response:
+        response = await request
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response
+
+    async def list_pages(i: int) -> None:
+        response = await ok(client.get("/api/pantry", params={"limit": PAGE_SIZE}))
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor:
+            await ok(client.get("/api/pantry", params={"limit": PAGE_SIZE, "cursor": cursor}))
+
+    if size == 0:
+        return {
+            "parse": lambda i: ok(client.post("/api/recipes/parse", json={"ingredients": recipes[i]})),
+        }
+    return {
+        "diff": lambda i: ok(client.post("/api/recipes/diff", json={"ingredients": recipes[i]})),
+        "bulk_insert": lambda i: ok(client.post(
+            "/api/pantry/bulk", json=[item.model_dump() for item in _bulk_batch(size, "app", i)]
+        )),
+        "search": lambda i: ok(
+            client.get("/api/pantry", params={"search": SEARCH_TERMS[i % len(SEARCH_TERMS)]})
+        ),
+        "list": list_pages,
+    }
+
+
+def _wanted(name: str, selected: list[str] | None) -> bool:
+    return not selected or any(s in name for s in selected)
+
+
+def _store(results: dict, name: str, latencies: list[float] | None, error: Exception | None = None) -> None:
+    if error is None:
+        results[name] = summarize(latencies)
+        status = f"p50 {results[name]['p50_ms']:.2f} ms"
+    else:
+        # e.g. the CRF model's NLTK data missing; the other cases still run
+        detail = next((line.strip() for line in str(error).splitlines() if line.strip(" *")), "")
+        results[name] = {"error": f"{type(error).__name__}: {detail}"}
+        status = results[name]["error"]
+    print(f"  {name:<32} {status}", file=sys.stderr)
+
+
+async def _run_app(engine_for: Callable[[int], object], sizes: list[int], iterations: int, selected, results: dict) -> None:
+    from ..database import get_db, get_read_db
+    from ..main import app
+    from ..services.rate_limit import rate_limiter
+
+    saved_limits, rate_limiter.limits = rate_limiter.limits, {}
+    saved_overrides = dict(app.dependency_overrides)
+    try:
+        for size in (0, *sizes):
+            factory = sessionmaker(bind=engine_for(size), autoflush=False)
+
+            def override():
+                db = factory()
+                try:
+                    yield db
+                finally:
+                    db.close()
+
+            app.dependency_overrides[get_db] = override
+            app.dependency_overrides[get_read_db] = override
+            pantry_index.invalidate()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for case, fn in _app_cases(client, size, iterations).items():
+                    name = f"app.{case}" + (f"[{size}]" if size else "")
+                    if not _wanted(name, selected):
+                        continue
+                    parse_cache.clear_memory()
+                    try:
+                        _store(results, name, await _time_each_async(fn, iterations))
+                    except Exception as exc:
+                        _store(results, name, None, exc)
+    finally:
+        rate_limiter.limits = saved_limits
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(saved_overrides)
+
+
+def run(sizes: list[int], iterations: int, selected: list[str] | None = None) -> dict:
+    """Run every case and return ``{case name: summary or {"error": ...}}``.
+
+    The in-process parse cache is cleared before each case, so parse and
+    diff timings include CRF parsing of lines the case hasn't seen.
+    """
+    results: dict = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {}
+
+        def engine_for(size: int):
+            if size not in engines:
+                engines[size] = _build_pantry(Path(tmp) / f"pantry-{size}.db", size)
+            return engines[size]
+
+        if _wanted("service.parse", selected):
+            lines = _recipes(iterations, seed=0)
+            try:
+                _store(results, "service.parse", _time_each(lambda i: parse_many(lines[i]), iterations))
+            except Exception as exc:
+                _store(results, "service.parse", None, exc)
+
+        for size in sizes:
+            print(f"pantry {size}", file=sys.stderr)
+            with Session(engine_for(size)) as db:
+                pantry_index.invalidate()
+                for case, fn in _service_cases(db, size, iterations).items():
+                    name = f"service.{case}[{size}]"
+                    if not _wanted(name, selected):
+                        continue
+                    parse_cache.clear_memory()
+                    try:
+                        _store(results, name, _time_each(fn, iterations))
+                    except Exception as exc:
+                        db.rollback()
+                        _store(results, name, None, exc)
+
+        asyncio.run(_run_app(engine_for, sizes, iterations, selected, results))
+        for engine in engines.values():
+            engine.dispose()
+    return results
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, metric: str, threshold: float) -> list[dict]:
+    """Per-case change in ``metric`` between two result sets; flags regressions."""
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        if "error" in before or "error" in after or not before.get(metric):
+            continue
+        change = after[metric] / before[metric] - 1
+        rows.append({
+            "case": name,
+            "baseline": before[metric],
+            "current": after[metric],
+            "change": change,
+            "regressed": change > threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per case")
+    parser.add_argument("--cases", nargs="+", help="only cases whose name contains one of these")
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON to check against")
+    parser.add_argument("--metric", choices=METRICS, default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown, 0.20 = 20%%")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.iterations, args.cases)
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": args.sizes,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"{'case':<32} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in results.items():
+        if "error" in row:
+            print(f"{name:<32} {'error: ' + row['error'][:60]}")
+        else:
+            print(
+                f"{name:<32} {row['throughput_per_s']:>9.1f} {row['p50_ms']:>9.2f} "
+                f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+            )
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        rows = compare(baseline, results, args.metric, args.threshold)
+        print(f"\n{'case':<32} {'base ' + args.metric:>14} {'now':>9} {'change':>8}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regressed"] else ""
+            print(
+                f"{row['case']:<32} {row['baseline']:>14.2f} {row['current']:>9.2f} "
+                f"{row['change']:>+7.0%}{flag}"
+            )
+        regressions = [row["case"] for row in rows if row["regressed"]]
+        if regressions:
+            print(f"\n{len(regressions)} case(s) over the {args.threshold:.0%} threshold", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import hashlib
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,11 +8,95 @@ class Settings(BaseSettings):
     anthropic_api_key: str = ""
     gemini_api_key: str = ""
     gemini_model: str = "gemini-2.5-flash"
+    # Gemini calls: overall deadline (retries included), per-attempt timeout
+    # (0: the whole deadline), retry policy, circuit breaker, hedging (0
+    # disables) and HTTP connection pool size. The base URL
+    # override points the SDK at a proxy or a local fake server.
+    gemini_base_url: str = ""
+    gemini_timeout_seconds: float = 30.0
+    gemini_attempt_timeout_seconds: float = 12.0
+    gemini_max_retries: int = 2
+    gemini_retry_base_ms: int = 250
+    gemini_breaker_failures: int = 5
+    gemini_breaker_reset_seconds: float = 30.0
+    gemini_hedge_after_ms: int = 0
+    gemini_max_connections: int = 20
     backend_host: str = "127.0.0.1"
     backend_port: int = 8000
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
     environment: str = "development"
     api_key: str = ""
+    # Token-bucket rate limits per client IP and route class: sustained
+    # requests per minute and burst size (0 per minute disables the class).
+    # "sqlite" shares buckets across the workers on a host through
+    # RATE_LIMIT_SQLITE_PATH (empty: a file in the temp directory);
+    # "memory" keeps them per worker.
+    rate_limit_backend: str = "sqlite"
+    rate_limit_sqlite_path: str = ""
+    rate_limit_max_keys: int = 20000
+    rate_limit_read_per_minute: int = 300
+    rate_limit_read_burst: int = 60
+    rate_limit_write_per_minute: int = 60
+    rate_limit_write_burst: int = 20
+    rate_limit_compute_per_minute: int = 30
+    rate_limit_compute_burst: int = 10
+    rate_limit_upload_per_minute: int = 10
+    rate_limit_upload_burst: int = 4
+    # Per-route request metrics at /api/metrics; each worker writes its
+    # snapshot to METRICS_DIR (empty: a directory in the temp dir) every
+    # METRICS_FLUSH_INTERVAL seconds so any worker can report the total
+    metrics_enabled: bool = True
+    metrics_dir: str = ""
+    metrics_flush_interval: float = 5.0
+    # SQLite connection profile (applied to every pooled connection)
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 16384
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_temp_store: str = "memory"
+    sqlite_write_retries: int = 5
+    sqlite_retry_base_ms: int = 20
+    # Seconds between background WAL checkpoints (0 disables)
+    sqlite_checkpoint_interval: float = 60.0
+    # rapidfuzz cdist worker threads for batched matching (-1 = all cores)
+    matcher_workers: int = -1
+    # Above this many pantry names, fuzzy matching scores only the top
+    # MATCHER_CANDIDATES names from a trigram index (0 = always score all)
+    matcher_prune_min: int = 5000
+    matcher_candidates: int = 256
+    # Ingredient parser processes per app worker (0 = parse in the request
+    # thread). Opt-in: pool processes are spawned, so each holds a private
+    # copy of the CRF model, while with 0 the preloading gunicorn master
+    # loads it once and every worker shares it copy-on-write.
+    parser_workers: int = 0
+    parser_batch_size: int = 16
+    # Dedicated executor for recipe parsing/matching; excess requests get a 503
+    nlp_workers: int = 4
+    nlp_queue_size: int = 32
+    # Recipes per POST /api/recipes/diff/batch request
+    recipe_batch_max_recipes: int = 50
+    # Process pool for HEIC/PIL decoding; uploads get a 503 when it is full
+    image_workers: int = 2
+    image_queue_size: int = 4
+    # Photos are downscaled/recompressed to these limits before the vision call
+    vision_max_long_edge: int = 1600
+    vision_max_bytes: int = 1024 * 1024
+    # Bytes of photo uploads being preprocessed at once per worker; uploads over
+    # the budget wait up to the given seconds, then get a 503
+    upload_budget_bytes: int = 96 * 1024 * 1024
+    upload_budget_wait_seconds: float = 10.0
+    # Batch photo upload: photos per request and concurrent analyses per batch
+    vision_batch_max_photos: int = 12
+    vision_batch_concurrency: int = 4
+    # Vision result cache: entry lifetime, row cap, and near-duplicate matching
+    # (max differing bits of the 64-bit dHash; 0 disables the lookup)
+    vision_cache_ttl_seconds: int = 7 * 24 * 3600
+    vision_cache_max_entries: int = 5000
+    vision_cache_dhash_distance: int = 0
+    # Parsed-line cache: in-process LRU size and persistent (SQLite) row cap
+    parse_cache_memory_entries: int = 10000
+    parse_cache_max_entries: int = 200000
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -20,6 +106,12 @@ class Settings(BaseSettings):
             return "sqlite:////home/data/pantry.db"
         return self.database_url
 
+    @property
+    def instance_tag(self) -> str:
+        """Short digest of the database URL; keeps per-host scratch files of
+        different deployments apart."""
+        return hashlib.sha1(self.effective_database_url.encode()).hexdigest()[:10]
+
     @property
     def cors_origins(self) -> list[str]:
         origins = [o.strip() for o in self.allowed_origins.split(",") if o.strip()]
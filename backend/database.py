@@ -1,20 +1,64 @@
+import functools
+import logging
+import random
+import time
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from .config import settings
 
+log = logging.getLogger(__name__)
+
 # Ensure the database directory exists (needed for Azure persistent storage)
 _db_url = settings.effective_database_url
 if _db_url.startswith("sqlite:////"):
     Path(_db_url.replace("sqlite:////", "/")).parent.mkdir(parents=True, exist_ok=True)
 
-engine = create_engine(
-    _db_url,
-    connect_args={"check_same_thread": False},
-)
+
+def sqlite_pragmas(read_only: bool = False) -> dict[str, str | int]:
+    """Per-connection PRAGMAs from Settings, in the order they are applied."""
+    pragmas: dict[str, str | int] = {
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        # negative cache_size is in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+    if read_only:
+        # journal_mode is persistent in the file; only the writer sets it
+        del pragmas["journal_mode"]
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def create_sqlite_engine(
+    url: str, pragmas: dict[str, str | int] | None = None, **kwargs
+) -> Engine:
+    """Create an engine that applies ``pragmas`` to every new connection."""
+    new_engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+    if pragmas and new_engine.dialect.name == "sqlite":
+
+        @event.listens_for(new_engine, "connect")
+        def _apply_pragmas(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return new_engine
+
+
+engine = create_sqlite_engine(_db_url, sqlite_pragmas())
+# Separate pool for GET routes so reads never queue behind write connections
+read_engine = create_sqlite_engine(_db_url, sqlite_pragmas(read_only=True))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 
 
 class Base(DeclarativeBase):
@@ -27,3 +71,52 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for read-only routes; writes through it fail (``query_only``)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def is_busy_error(exc: OperationalError) -> bool:
+    message = str(exc.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_busy(fn):
+    """Re-run a write endpoint when SQLite reports the database is busy.
+
+    busy_timeout already waits inside SQLite; this covers the cases it can't
+    (e.g. a read transaction upgrading to a write while another writer holds
+    the lock). The request's ``db`` session is rolled back between attempts,
+    and sleeps use full jitter so competing workers don't retry in lockstep.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.sqlite_write_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as exc:
+                if not is_busy_error(exc) or attempt == settings.sqlite_write_retries:
+                    raise
+                db = kwargs.get("db")
+                if db is not None:
+                    db.rollback()
+                delay = random.uniform(0, settings.sqlite_retry_base_ms / 1000 * 2**attempt)
+                log.info("SQLite busy, retrying write in %.0f ms", delay * 1000)
+                time.sleep(delay)
+
+    return wrapper
+
+
+def checkpoint_wal(mode: str = "PASSIVE") -> tuple[int, int, int] | None:
+    """Run a WAL checkpoint; returns (busy, log frames, checkpointed frames)."""
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        return tuple(conn.execute(text(f"PRAGMA wal_checkpoint({mode})")).one())
@@ -1,19 +1,67 @@
-import hmac
-import time
-from collections import defaultdict
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from . import startup
 from .config import settings
-from .database import Base, engine
-from .routers import pantry, photos, recipes
+from .database import checkpoint_wal
+from .middleware import ApiKeyMiddleware, MetricsMiddleware, RateLimitMiddleware
+from .routers import pantry, photos, recipes, shopping
+from .services import metrics
+from .services.executor import nlp_executor
+from .services.image_convert import image_pool
+from .services.ingredient_parser import parser_pool
+from .services.rate_limit import rate_limiter
+
+log = logging.getLogger(__name__)
+
+
+async def _checkpoint_loop(interval: float):
+    # Keeps the WAL from growing without bound under steady write load
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(checkpoint_wal)
+        except Exception:
+            log.exception("WAL checkpoint failed")
+
+
+async def _metrics_flush_loop(interval: float):
+    # Lets whichever worker answers /api/metrics report this one's numbers too
+    while True:
+        await asyncio.sleep(interval)
+        snapshot = metrics.registry.snapshot()
+        try:
+            await asyncio.to_thread(metrics.metrics_store.flush, snapshot)
+        except OSError:
+            log.exception("Metrics flush failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup and warm-up; a no-op if a preloading gunicorn master did it
+    await asyncio.to_thread(startup.prepare)
+    parser_pool.start()
+    image_pool.start()
+    tasks = []
+    if settings.sqlite_checkpoint_interval > 0:
+        tasks.append(asyncio.create_task(_checkpoint_loop(settings.sqlite_checkpoint_interval)))
+    if settings.metrics_enabled and settings.metrics_flush_interval > 0:
+        tasks.append(asyncio.create_task(_metrics_flush_loop(settings.metrics_flush_interval)))
+    yield
+    for task in tasks:
+        task.cancel()
+    nlp_executor.shutdown()
+    image_pool.shutdown()
+    parser_pool.shutdown()
 
-Base.metadata.create_all(bind=engine)
 
 # Disable interactive API docs in production
 _docs_url = None if settings.environment == "production" else "/docs"
@@ -24,6 +72,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url=_docs_url,
     redoc_url=_redoc_url,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -35,45 +84,13 @@ app.add_middleware(
 )
 
 
-# --- API key authentication middleware ---
-@app.middleware("http")
-async def api_key_auth(request: Request, call_next):
-    if not settings.api_key:
-        return await call_next(request)
-    path = request.url.path
-    if not path.startswith("/api/") or path == "/api/health":
-        return await call_next(request)
-    provided_key = request.headers.get("X-Api-Key", "")
-    if not hmac.compare_digest(provided_key, settings.api_key):
-        return JSONResponse(status_code=401, content={"detail": "Invalid or missing API key"})
-    return await call_next(request)
-
-
-# --- Rate limiting middleware ---
-_rate_limit_store: dict[str, list[float]] = defaultdict(list)
-_RATE_LIMIT = 30  # requests per window
-_RATE_WINDOW = 60  # seconds
-_MAX_TRACKED_IPS = 10000  # cap to prevent memory exhaustion
-
-
-@app.middleware("http")
-async def rate_limit(request: Request, call_next):
-    if not request.url.path.startswith("/api/"):
-        return await call_next(request)
-    client_ip = request.client.host if request.client else "unknown"
-    now = time.monotonic()
-    _rate_limit_store[client_ip] = [
-        t for t in _rate_limit_store[client_ip] if now - t < _RATE_WINDOW
-    ]
-    if len(_rate_limit_store) > _MAX_TRACKED_IPS:
-        _rate_limit_store.clear()
-    if len(_rate_limit_store[client_ip]) >= _RATE_LIMIT:
-        return JSONResponse(
-            status_code=429,
-            content={"detail": "Too many requests. Please try again later."},
-        )
-    _rate_limit_store[client_ip].append(now)
-    return await call_next(request)
+# Outermost last: metrics see every request, including rate-limited and
+# unauthorized ones
+app.add_middleware(ApiKeyMiddleware)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+if settings.metrics_enabled:
+    metrics.instrument_engines()
+    app.add_middleware(MetricsMiddleware)
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -84,6 +101,7 @@ templates = Jinja2Templates(directory=BASE_DIR / "templates")
 app.include_router(pantry.router)
 app.include_router(recipes.router)
 app.include_router(photos.router)
+app.include_router(shopping.router)
 
 
 # --- Web UI Routes ---
@@ -108,5 +126,19 @@ def shopping_page(request: Request):
 
 
 @app.get("/health")
+@app.get("/api/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/api/startup", include_in_schema=False)
+def startup_report():
+    """Import/warm-up timings, whether this worker was preloaded, and its shared vs private memory."""
+    return startup.report()
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request counts, in-flight gauges and latency/stage histograms summed over all workers."""
+    snapshot = await asyncio.to_thread(metrics.metrics_store.collect, metrics.registry.snapshot())
+    return PlainTextResponse(metrics.render(snapshot), media_type=metrics.CONTENT_TYPE)
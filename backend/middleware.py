@@ -0,0 +1,99 @@
+"""Pure ASGI middleware: API key check, rate limiting and request metrics.
+
+These are plain ASGI callables rather than ``@app.middleware("http")``
+functions. BaseHTTPMiddleware wraps each request in an extra task and
+memory streams for the body. These instead pass ``scope``, ``receive``
+and ``send`` straight through, and only build a response when they
+short-circuit the request.
+"""
+
+import hmac
+import math
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .services import metrics
+from .services.rate_limit import RateLimiter, classify
+
+
+class ApiKeyMiddleware:
+    """Require ``X-Api-Key`` on /api/ routes (except health) when API_KEY is set."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.api_key:
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if not path.startswith("/api/") or path == "/api/health":
+            return await self.app(scope, receive, send)
+        provided_key = Headers(scope=scope).get("x-api-key", "")
+        if not hmac.compare_digest(provided_key, settings.api_key):
+            response = JSONResponse(status_code=401, content={"detail": "Invalid or missing API key"})
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        retry_after = self.limiter.check(scope["method"], scope["path"], client_ip)
+        if retry_after:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests. Please try again later."},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """Count, time and stage-profile every HTTP request.
+
+    The route label is the matched route's template (``/api/pantry/{item_id}``),
+    read from the scope after routing. Requests that never reached a route
+    (404s, static files, requests rejected by outer middleware) are labelled
+    ``<unrouted>``.
+    """
+
+    def __init__(self, app: ASGIApp, registry: metrics.Registry | None = None):
+        self.app = app
+        self.registry = registry or metrics.registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        route_class = classify(method, scope["path"]) or "other"
+        status = 500  # if the app raises before responding
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stages, token = metrics.begin_request()
+        self.registry.in_flight(route_class, 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.end_request(token)
+            self.registry.in_flight(route_class, -1)
+            route = getattr(scope.get("route"), "path", "<unrouted>")
+            self.registry.observe_request(method, route, status, elapsed, stages.totals)
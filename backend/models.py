@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, Float, Index, Integer, Text
+from sqlalchemy import Column, DateTime, Float, Index, Integer, Text, func, literal_column
 
 from .database import Base
 
@@ -24,6 +24,15 @@ class PantryItem(Base):
     __table_args__ = (Index("ix_pantry_name_lower", "name"),)
 
 
+class PantryMeta(Base):
+    """Single-row table holding the pantry version, bumped by every pantry write."""
+
+    __tablename__ = "pantry_meta"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class ShoppingListItem(Base):
     __tablename__ = "shopping_list_items"
 
@@ -35,3 +44,53 @@ class ShoppingListItem(Base):
     whole_foods_url = Column(Text, nullable=True)
     purchased = Column(Integer, default=0)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # One row per (normalized name, unit); bulk adds upsert into it
+        Index(
+            "uq_shopping_list_name_unit",
+            name,
+            func.coalesce(unit, literal_column("''")),
+            unique=True,
+        ),
+        # "Unpurchased, newest first" listing and its keyset pages
+        Index("ix_shopping_list_purchased_created", purchased, created_at, id),
+    )
+
+
+class ParsedIngredientCache(Base):
+    """Persistent tier of the parsed ingredient line cache."""
+
+    __tablename__ = "parsed_ingredient_cache"
+
+    key = Column(Text, primary_key=True)
+    parser_version = Column(Text, nullable=False)
+    name = Column(Text, nullable=False)
+    quantity = Column(Float, nullable=True)
+    unit = Column(Text, nullable=True)
+    comment = Column(Text, nullable=True)
+    last_used_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
+
+
+class VisionResultCache(Base):
+    """Validated vision results keyed by the preprocessed image bytes."""
+
+    __tablename__ = "vision_result_cache"
+
+    # sha256 of the bytes sent to the model
+    key = Column(Text, primary_key=True)
+    # sha256 of the upload as received, so repeats can skip preprocessing
+    source_key = Column(Text, nullable=True, index=True)
+    # model + prompt fingerprint; results from another variant never hit
+    variant = Column(Text, nullable=False)
+    # 64-bit difference hash (stored signed) for near-duplicate lookups
+    dhash = Column(Integer, nullable=True)
+    items = Column(Text, nullable=False)
+    created_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
+    last_used_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
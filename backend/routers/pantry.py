@@ -1,97 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+import base64
+import binascii
+import json
 
-from ..database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as ORMQuery, Session
+
+from ..database import get_db, get_read_db, retry_on_busy
 from ..models import PantryItem
 from ..schemas import PantryItemCreate, PantryItemOut, PantryItemUpdate
+from ..services import pantry_version
+from ..services.pantry_index import pantry_index
+from ..services.pantry_merge import load_items, upsert_items
+from ..services.pantry_search import apply_search
 
 router = APIRouter(prefix="/api/pantry", tags=["pantry"])
 
 
+_STREAM_BATCH = 500  # rows fetched per round trip when streaming NDJSON
+
+
+def _check_etag(db: Session, if_none_match: str | None) -> tuple[str, Response | None]:
+    """ETag for the current pantry version, plus a 304 if the client has it.
+
+    Costs one single-row lookup; the 304 path never touches pantry_items.
+    """
+    tag = pantry_version.etag(pantry_version.current(db))
+    if pantry_version.etag_matches(if_none_match, tag):
+        return tag, Response(status_code=304, headers={"ETag": tag, "Cache-Control": "no-cache"})
+    return tag, None
+
+
+def _encode_cursor(item: PantryItem) -> str:
+    raw = json.dumps([item.name, item.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        name, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(name, str) or not isinstance(item_id, int):
+            raise ValueError
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    return name, item_id
+
+
+def _stream_ndjson(db: Session, q: ORMQuery, headers: dict[str, str]) -> StreamingResponse:
+    # The request session is closed before the body streams, so the generator
+    # opens its own on the same engine and walks a server-side cursor.
+    statement = q.statement.execution_options(yield_per=_STREAM_BATCH)
+    bind = db.get_bind()
+
+    def rows():
+        with Session(bind=bind) as stream_db:
+            for item in stream_db.scalars(statement):
+                yield PantryItemOut.model_validate(item).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson", headers=headers)
+
+
 @router.get("", response_model=list[PantryItemOut])
 def list_pantry(
+    response: Response,
     category: str | None = Query(None),
     search: str | None = Query(None),
-    db: Session = Depends(get_db),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
 ):
+    """List pantry items.
+
+    Pass ``limit`` (and then ``cursor``) for keyset pages ordered by
+    ``(name, id)``; the next page's cursor comes back in ``X-Next-Cursor``.
+    ``format=ndjson`` streams one JSON object per line in constant memory.
+    Responses carry the pantry-version ETag and honour ``If-None-Match``.
+    """
+    tag, not_modified = _check_etag(db, if_none_match)
+    if not_modified:
+        return not_modified
+    # no-cache: browsers revalidate with If-None-Match instead of refetching
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+
+    paginate = limit is not None or cursor is not None
     q = db.query(PantryItem)
     if category:
         q = q.filter(func.lower(PantryItem.category) == category.lower())
     if search:
-        escaped = search.replace("%", r"\%").replace("_", r"\_")
-        q = q.filter(PantryItem.name.ilike(f"%{escaped}%", escape="\\"))
-    return q.order_by(PantryItem.name).all()
+        q = apply_search(q, db, search, ranked=not paginate)
+    elif not paginate:
+        q = q.order_by(PantryItem.name, PantryItem.id)
+
+    if paginate:
+        limit = limit or 100
+        if cursor:
+            q = q.filter(tuple_(PantryItem.name, PantryItem.id) > _decode_cursor(cursor))
+        q = q.order_by(PantryItem.name, PantryItem.id)
+        if output == "json":
+            # One extra row tells us whether another page exists
+            items = q.limit(limit + 1).all()
+            if len(items) > limit:
+                items = items[:limit]
+                response.headers["X-Next-Cursor"] = _encode_cursor(items[-1])
+            return items
+        # NDJSON pages can't peek ahead without buffering; hand out the
+        # cursor of the last row and let an empty page end the walk
+        last = q.offset(limit - 1).first()
+        if last is not None:
+            headers["X-Next-Cursor"] = _encode_cursor(last)
+        q = q.limit(limit)
+
+    if output == "ndjson":
+        return _stream_ndjson(db, q, headers)
+    return q.all()
 
 
 @router.get("/{item_id}", response_model=PantryItemOut)
-def get_pantry_item(item_id: int, db: Session = Depends(get_db)):
+def get_pantry_item(
+    item_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    # Existence first: a deleted id must 404 even for a matching tag or "*"
     item = db.get(PantryItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    tag, not_modified = _check_etag(db, if_none_match)
+    if not_modified:
+        return not_modified
+    response.headers.update({"ETag": tag, "Cache-Control": "no-cache"})
     return item
 
 
 @router.post("", response_model=PantryItemOut, status_code=201)
+@retry_on_busy
 def create_pantry_item(body: PantryItemCreate, db: Session = Depends(get_db)):
     item = PantryItem(**body.model_dump())
     item.name = item.name.strip().lower()
     db.add(item)
+    version = pantry_version.bump(db)
     db.commit()
     db.refresh(item)
+    pantry_index.upsert([item], version)
     return item
 
 
 @router.post("/bulk", response_model=list[PantryItemOut], status_code=201)
+@retry_on_busy
 def bulk_create_pantry_items(
     items: list[PantryItemCreate], db: Session = Depends(get_db)
 ):
-    # Deduplicate incoming items by name, summing quantities
-    merged: dict[str, PantryItemCreate] = {}
-    for body in items:
-        key = body.name.strip().lower()
-        if key in merged:
-            existing = merged[key]
-            if body.quantity and existing.quantity:
-                merged[key] = existing.model_copy(
-                    update={"quantity": existing.quantity + body.quantity}
-                )
-            elif body.quantity:
-                merged[key] = existing.model_copy(update={"quantity": body.quantity})
-        else:
-            merged[key] = body
-
-    result = []
-    for key, body in merged.items():
-        # Check if item already exists in pantry
-        existing = db.query(PantryItem).filter(
-            func.lower(PantryItem.name) == key
-        ).first()
-
-        if existing:
-            # Merge: add quantities together
-            if body.quantity:
-                existing.quantity = (existing.quantity or 0) + body.quantity
-            if body.unit and not existing.unit:
-                existing.unit = body.unit
-            if body.category and not existing.category:
-                existing.category = body.category
-            if body.notes and not existing.notes:
-                existing.notes = body.notes
-            result.append(existing)
-        else:
-            item = PantryItem(**body.model_dump())
-            item.name = key
-            db.add(item)
-            result.append(item)
-
+    ids = upsert_items(db, items)
+    version = pantry_version.bump(db)
     db.commit()
-    for item in result:
-        db.refresh(item)
+    result = load_items(db, ids)
+    pantry_index.upsert(result, version)
     return result
 
 
 @router.put("/{item_id}", response_model=PantryItemOut)
+@retry_on_busy
 def update_pantry_item(
     item_id: int, body: PantryItemUpdate, db: Session = Depends(get_db)
 ):
@@ -103,15 +176,20 @@ def update_pantry_item(
         updates["name"] = updates["name"].strip().lower()
     for key, value in updates.items():
         setattr(item, key, value)
+    version = pantry_version.bump(db)
     db.commit()
     db.refresh(item)
+    pantry_index.upsert([item], version)
     return item
 
 
 @router.delete("/{item_id}", status_code=204)
+@retry_on_busy
 def delete_pantry_item(item_id: int, db: Session = Depends(get_db)):
     item = db.get(PantryItem, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     db.delete(item)
+    version = pantry_version.bump(db)
     db.commit()
+    pantry_index.discard(item_id, version)
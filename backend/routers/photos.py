@@ -1,9 +1,33 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import tempfile
+from dataclasses import dataclass
 
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
-from ..schemas import PhotoUploadResponse
-from ..services.vision import VisionAnalysisError, analyze_image
+from ..config import settings
+from ..database import get_db
+from ..schemas import PantryItemCreate, PhotoBatchResponse, PhotoResult, PhotoUploadResponse
+from ..services.executor import ExecutorSaturated
+from ..services.image_convert import image_pool
+from ..services.image_preprocess import PreparedImage, prepare_image
+from ..services.metrics import timed
+from ..services.pantry_merge import merge_items
+from ..services.upload_budget import BudgetExceeded, upload_budget
+from ..services.vision import (
+    VisionAnalysisError,
+    VisionUnavailable,
+    analyze_image,
+    gemini_calls,
+    stream_image,
+)
+from ..services.vision_cache import digest, vision_cache
 
 router = APIRouter(prefix="/api/photos", tags=["photos"])
 log = logging.getLogger(__name__)
@@ -15,72 +39,10 @@ _ALLOWED_MIME_TYPES = {
 # HEIC/HEIF need conversion to JPEG for Gemini (it doesn't accept HEIC)
 _NEEDS_CONVERSION = {"image/heic", "image/heif"}
 _MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
+_SPOOL_CHUNK = 1024 * 1024
 
 
-@router.post("/upload", response_model=PhotoUploadResponse)
-async def upload_photo(photo: UploadFile):
-    """Upload a pantry photo for ingredient detection.
-
-    Uses Gemini Vision to detect grocery items when configured.
-    Falls back to a stub message when no API key is set.
-    """
-    content_type = photo.content_type or "application/octet-stream"
-
-    # Validate MIME type
-    if content_type not in _ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=415,
-            detail=f"Unsupported image type '{content_type}'. "
-            f"Accepted types: JPEG, PNG, WebP, GIF, HEIC.",
-        )
-
-    # Read file in chunks to enforce size limit before loading fully into memory
-    chunks = []
-    total_size = 0
-    while True:
-        chunk = await photo.read(64 * 1024)  # 64 KB chunks
-        if not chunk:
-            break
-        total_size += len(chunk)
-        if total_size > _MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Image too large (>{_MAX_FILE_SIZE / 1024 / 1024:.0f} MB). "
-                f"Maximum size is {_MAX_FILE_SIZE / 1024 / 1024:.0f} MB.",
-            )
-        chunks.append(chunk)
-    image_bytes = b"".join(chunks)
-    mime_type = content_type
-
-    # Convert HEIC/HEIF to JPEG for Gemini compatibility
-    if content_type in _NEEDS_CONVERSION:
-        try:
-            import pillow_heif
-            pillow_heif.register_heif_opener()
-            from PIL import Image
-            import io
-
-            img = Image.open(io.BytesIO(image_bytes))
-            buf = io.BytesIO()
-            img.convert("RGB").save(buf, format="JPEG", quality=90)
-            image_bytes = buf.getvalue()
-            mime_type = "image/jpeg"
-        except Exception as exc:
-            log.warning("HEIC conversion failed: %s", exc)
-            raise HTTPException(
-                status_code=415,
-                detail="Could not process HEIC/HEIF image. Try converting to JPEG first.",
-            ) from exc
-
-    try:
-        items = await analyze_image(image_bytes, mime_type)
-    except VisionAnalysisError as exc:
-        log.error("Vision analysis failed: %s", exc)
-        raise HTTPException(
-            status_code=502,
-            detail="Image analysis failed. Please try again later.",
-        ) from exc
-
+def _response(items: list[PantryItemCreate] | None, cached: bool = False) -> PhotoUploadResponse:
     # Not configured — return stub
     if items is None:
         return PhotoUploadResponse(
@@ -99,9 +61,332 @@ async def upload_photo(photo: UploadFile):
                 "Try a clearer photo of a receipt, food items, or pantry shelf."
             ),
             items=[],
+            cached=cached,
         )
 
     return PhotoUploadResponse(
         message=f"Detected {len(items)} item{'s' if len(items) != 1 else ''} from photo.",
         items=items,
+        cached=cached,
+    )
+
+
+def _lookup_prepared(db: Session, data: bytes, dhash: int | None) -> tuple[str, list[PantryItemCreate] | None]:
+    key = digest(data)
+    return key, vision_cache.lookup(db, key, dhash)
+
+
+def _check_type(content_type: str) -> None:
+    if content_type not in _ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported image type '{content_type}'. "
+            f"Accepted types: JPEG, PNG, WebP, GIF, HEIC.",
+        )
+
+
+def _spool(src) -> tuple[str, str]:
+    """Copy the upload to a named temp file, hashing it on the way.
+
+    Returns the path and the source cache key. The image pool opens the
+    path itself, so the bytes are never held whole in this process or
+    pickled into the pool; one reused chunk buffer is all that's allocated.
+    """
+    hasher = hashlib.sha256()  # same key as vision_cache.digest
+    size = 0
+    buf = bytearray(_SPOOL_CHUNK)
+    src.seek(0)
+    with memoryview(buf) as view, tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as dst:
+        try:
+            while n := src.readinto(view):
+                size += n
+                if size > _MAX_FILE_SIZE:
+                    raise _too_large()
+                hasher.update(view[:n])
+                dst.write(view[:n])
+        except BaseException:
+            dst.close()
+            os.unlink(dst.name)
+            raise
+    return dst.name, hasher.hexdigest()
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Image too large (>{_MAX_FILE_SIZE / 1024 / 1024:.0f} MB). "
+        f"Maximum size is {_MAX_FILE_SIZE / 1024 / 1024:.0f} MB.",
+    )
+
+
+def _vision_error(exc: VisionAnalysisError) -> HTTPException:
+    if isinstance(exc, VisionUnavailable):
+        # The circuit breaker is open; don't queue more calls behind it
+        log.warning("Vision analysis skipped: %s", exc)
+        return HTTPException(
+            status_code=503,
+            detail="Image analysis is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(int(settings.gemini_breaker_reset_seconds))},
+        )
+    log.error("Vision analysis failed: %s", exc)
+    return HTTPException(
+        status_code=502,
+        detail="Image analysis failed. Please try again later.",
+    )
+
+
+@dataclass
+class _PreparedUpload:
+    source_key: str
+    key: str | None = None
+    prepared: PreparedImage | None = None
+    cached: list[PantryItemCreate] | None = None
+
+
+async def _prepare_upload(db: Session, path: str, source_key: str, content_type: str) -> _PreparedUpload:
+    """Cache lookups and preprocessing, everything before the model call.
+
+    Raises HTTPException for failures the client should see.
+    """
+    # SQLite lookups run off the event loop
+    cached = await run_in_threadpool(vision_cache.lookup_source, db, source_key)
+    if cached is not None:
+        return _PreparedUpload(source_key, cached=cached)
+
+    # Downscale/recompress (and convert HEIC/HEIF to JPEG, which Gemini
+    # doesn't accept). Decoding is CPU-bound, so it runs on the image
+    # process pool instead of blocking the event loop.
+    try:
+        with timed("image"):
+            prepared = await image_pool.run(
+                prepare_image,
+                path,
+                content_type,
+                settings.vision_max_long_edge,
+                settings.vision_max_bytes,
+                settings.vision_cache_dhash_distance > 0,
+            )
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many photos are being processed. Please try again shortly.",
+            headers={"Retry-After": "2"},
+        ) from exc
+    except Exception as exc:
+        log.warning("Image preprocessing failed: %s", exc)
+        if content_type in _NEEDS_CONVERSION:
+            detail = "Could not process HEIC/HEIF image. Try converting to JPEG first."
+        else:
+            detail = "Could not decode image."
+        raise HTTPException(status_code=415, detail=detail) from exc
+    log.info(
+        "Prepared photo: %d -> %d bytes, %dx%d -> %dx%d in %.0f ms%s",
+        prepared.original_bytes,
+        len(prepared.data),
+        *prepared.original_size,
+        *prepared.size,
+        prepared.seconds * 1000,
+        " (unchanged)" if prepared.skipped else "",
     )
+
+    key, cached = await run_in_threadpool(_lookup_prepared, db, prepared.data, prepared.dhash)
+    return _PreparedUpload(source_key, key, prepared, cached)
+
+
+async def _ingest(db: Session, photo: UploadFile, content_type: str) -> _PreparedUpload:
+    """Spool and prepare an upload within the per-worker memory budget.
+
+    The reservation covers the upload and its decode in the image pool, so
+    it is held until preprocessing is done; the temp file goes with it.
+    """
+    if photo.size is not None and photo.size > _MAX_FILE_SIZE:
+        raise _too_large()
+    try:
+        async with upload_budget.reserve(photo.size or _MAX_FILE_SIZE):
+            path, source_key = await run_in_threadpool(_spool, photo.file)
+            try:
+                return await _prepare_upload(db, path, source_key, content_type)
+            finally:
+                os.unlink(path)
+    except BudgetExceeded as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many photos are being processed. Please try again shortly.",
+            headers={"Retry-After": "2"},
+        ) from exc
+
+
+async def _analyze_upload(db: Session, photo: UploadFile, content_type: str) -> tuple[list[PantryItemCreate] | None, bool]:
+    """Detected items for one photo and whether they came from the cache.
+
+    Raises HTTPException for failures the client should see.
+    """
+    upload = await _ingest(db, photo, content_type)
+    if upload.cached is not None:
+        return upload.cached, True
+    prepared = upload.prepared
+
+    try:
+        items = await analyze_image(prepared.data, prepared.mime_type)
+    except VisionAnalysisError as exc:
+        raise _vision_error(exc) from exc
+
+    if items is not None:
+        await run_in_threadpool(
+            vision_cache.store, db, upload.key, items, upload.source_key, prepared.dhash
+        )
+    return items, False
+
+
+@router.post("/upload", response_model=PhotoUploadResponse)
+async def upload_photo(photo: UploadFile, db: Session = Depends(get_db)):
+    """Upload a pantry photo for ingredient detection.
+
+    Uses Gemini Vision to detect grocery items when configured.
+    Falls back to a stub message when no API key is set. Results are cached
+    by image content, so a repeat upload skips the model call and comes
+    back with ``cached: true``.
+    """
+    content_type = photo.content_type or "application/octet-stream"
+    _check_type(content_type)
+    items, cached = await _analyze_upload(db, photo, content_type)
+    return _response(items, cached)
+
+
+def _ndjson_event(event: str, data: dict) -> str:
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/upload/stream")
+async def upload_photo_stream(
+    photo: UploadFile,
+    output: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
+    db: Session = Depends(get_db),
+):
+    """Upload a photo and stream detected items as the model generates them.
+
+    Emits one ``item`` event per validated item, then a ``summary`` event
+    carrying the same body as ``/upload``. A failure after streaming has
+    begun arrives as an ``error`` event with the status code ``/upload``
+    would have returned. ``format=sse`` frames the events as Server-Sent
+    Events instead of NDJSON lines.
+    """
+    content_type = photo.content_type or "application/octet-stream"
+    _check_type(content_type)
+    upload = await _ingest(db, photo, content_type)
+    encode = _sse_event if output == "sse" else _ndjson_event
+    media_type = "text/event-stream" if output == "sse" else "application/x-ndjson"
+    bind = db.get_bind()
+
+    async def events():
+        if upload.cached is not None:
+            for item in upload.cached:
+                yield encode("item", {"item": item.model_dump()})
+            yield encode("summary", _response(upload.cached, cached=True).model_dump())
+            return
+
+        prepared = upload.prepared
+        stream = stream_image(prepared.data, prepared.mime_type)
+        if stream is None:
+            yield encode("summary", _response(None).model_dump())
+            return
+        items = []
+        try:
+            async for item in stream:
+                items.append(item)
+                yield encode("item", {"item": item.model_dump()})
+        except VisionAnalysisError as exc:
+            error = _vision_error(exc)
+            yield encode("error", {"status_code": error.status_code, "detail": error.detail})
+            return
+        # The request session is closed once streaming starts
+        with Session(bind=bind) as stream_db:
+            await run_in_threadpool(
+                vision_cache.store, stream_db, upload.key, items, upload.source_key, prepared.dhash
+            )
+        yield encode("summary", _response(items).model_dump())
+
+    return StreamingResponse(
+        events(), media_type=media_type, headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.post("/upload/batch", response_model=PhotoBatchResponse)
+async def upload_photo_batch(photos: list[UploadFile], db: Session = Depends(get_db)):
+    """Analyze several photos concurrently and merge what they detect.
+
+    At most ``VISION_BATCH_CONCURRENCY`` photos are in flight at once.
+    Items are merged across photos like ``POST /api/pantry/bulk`` does:
+    by normalized name, summing quantities. A failed photo is reported in
+    its own result and does not fail the batch.
+    """
+    if len(photos) > settings.vision_batch_max_photos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many photos ({len(photos)}). "
+            f"Maximum is {settings.vision_batch_max_photos} per batch.",
+        )
+    slots = asyncio.Semaphore(max(1, settings.vision_batch_concurrency))
+    bind = db.get_bind()
+
+    async def one(photo: UploadFile) -> PhotoResult:
+        content_type = photo.content_type or "application/octet-stream"
+        async with slots:
+            # Sessions aren't thread-safe, so each concurrent photo gets its own
+            photo_db = Session(bind=bind)
+            try:
+                _check_type(content_type)
+                items, cached = await _analyze_upload(photo_db, photo, content_type)
+            except HTTPException as exc:
+                return PhotoResult(
+                    filename=photo.filename, status_code=exc.status_code, error=exc.detail
+                )
+            except Exception:
+                # A cache, pool or decode failure costs this photo, not the batch
+                log.exception("Batch photo %r failed", photo.filename)
+                return PhotoResult(
+                    filename=photo.filename, status_code=500, error="Internal error analyzing this photo."
+                )
+            finally:
+                await run_in_threadpool(photo_db.close)
+        response = _response(items, cached)
+        return PhotoResult(
+            filename=photo.filename,
+            message=response.message,
+            items=response.items,
+            cached=cached,
+        )
+
+    results = await asyncio.gather(*(one(photo) for photo in photos))
+    merged = [
+        item.model_copy(update={"name": name})
+        for name, item in merge_items(item for r in results for item in r.items).items()
+    ]
+    failed = sum(1 for r in results if r.error)
+    message = (
+        f"Detected {len(merged)} item{'s' if len(merged) != 1 else ''} "
+        f"across {len(results) - failed} of {len(results)} photos."
+    )
+    return PhotoBatchResponse(message=message, items=merged, photos=results, failed=failed)
+
+
+@router.get("/memory")
+def upload_memory_stats():
+    """This worker's upload byte budget and its RSS (current and peak)."""
+    return upload_budget.stats()
+
+
+@router.get("/vision")
+def vision_call_stats():
+    """Gemini call counters, latency percentiles and circuit breaker state."""
+    return gemini_calls.stats()
+
+
+@router.get("/cache")
+def vision_cache_stats(db: Session = Depends(get_db)):
+    """Hit/miss counters for this worker's vision cache, plus its size."""
+    return vision_cache.stats(db)
@@ -1,61 +1,185 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from ..config import settings
 from ..database import get_db
-from ..models import PantryItem
 from ..schemas import (
     IngredientStatus,
+    MissingItem,
     ParsedIngredient,
     ParseRequest,
     ParseResponse,
+    RecipeBatchDiffRequest,
+    RecipeBatchDiffResponse,
     RecipeDiffRequest,
     RecipeDiffResponse,
 )
-from ..services.ingredient_matcher import match_ingredient
-from ..services.ingredient_parser import parse_single
+from ..services.executor import ExecutorSaturated, nlp_executor
+from ..services.ingredient_matcher import MatchResult
+from ..services.ingredient_parser import ParsedIngredient as ParsedLine
+from ..services.pantry_index import pantry_index
+from ..services.pantry_merge import normalize_name
+from ..services.parse_cache import parse_cache
 from ..services.shopping import whole_foods_url
+from ..services.units import coverage, resolve
 
 router = APIRouter(prefix="/api/recipes", tags=["recipes"])
 
 
-@router.post("/diff", response_model=RecipeDiffResponse)
-def recipe_diff(body: RecipeDiffRequest, db: Session = Depends(get_db)):
-    pantry_names = [item.name for item in db.query(PantryItem.name).all()]
-
-    statuses: list[IngredientStatus] = []
-    for raw in body.ingredients:
-        parsed = parse_single(raw)
-        match = match_ingredient(parsed.name, pantry_names)
-        url = None if match.in_pantry else whole_foods_url(parsed.name)
-
-        statuses.append(
-            IngredientStatus(
-                raw=raw,
-                name=parsed.name,
-                quantity=parsed.quantity,
-                unit=parsed.unit,
-                in_pantry=match.in_pantry,
-                pantry_match=match.pantry_match,
-                match_score=match.score,
-                whole_foods_url=url,
-            )
-        )
+async def _run_nlp(fn, body, db: Session):
+    """Run ``fn(body, session)`` on the dedicated executor, not the shared threadpool.
+
+    The job gets its own Session on the request session's engine and closes
+    it itself. A cancelled request closes ``db`` while the job may still be
+    running, and Sessions aren't thread-safe.
+    """
+    bind = db.get_bind()
+
+    def job():
+        with Session(bind=bind, autoflush=False) as job_db:
+            return fn(body, job_db)
+
+    try:
+        return await nlp_executor.run(job)
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Recipe processing is busy. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+def _status(raw: str, parsed: ParsedLine, match: MatchResult) -> IngredientStatus:
+    covered = coverage(
+        match.in_pantry, parsed.quantity, parsed.unit, match.pantry_quantity, match.pantry_unit
+    )
+    return IngredientStatus(
+        raw=raw,
+        name=parsed.name,
+        quantity=parsed.quantity,
+        unit=parsed.unit,
+        in_pantry=match.in_pantry,
+        pantry_match=match.pantry_match,
+        match_score=match.score,
+        coverage=covered.status,
+        shortfall=covered.shortfall,
+        whole_foods_url=None if covered.status == "full" else whole_foods_url(parsed.name),
+    )
 
+
+def _recipe_response(recipe: RecipeDiffRequest, statuses: list[IngredientStatus]) -> RecipeDiffResponse:
     in_pantry_count = sum(1 for s in statuses if s.in_pantry)
     return RecipeDiffResponse(
-        recipe_title=body.recipe_title,
-        recipe_url=body.recipe_url,
+        recipe_title=recipe.recipe_title,
+        recipe_url=recipe.recipe_url,
         ingredients=statuses,
         missing_count=len(statuses) - in_pantry_count,
         in_pantry_count=in_pantry_count,
+        partial_count=sum(1 for s in statuses if s.coverage == "partial"),
     )
 
 
-@router.post("/parse", response_model=ParseResponse)
-def parse_ingredients(body: ParseRequest):
+def _diff(body: RecipeDiffRequest, db: Session) -> RecipeDiffResponse:
+    parsed_lines = parse_cache.parse(db, body.ingredients)
+    matches = pantry_index.match_many(db, [p.name for p in parsed_lines])
+    statuses = [
+        _status(raw, parsed, match)
+        for raw, parsed, match in zip(body.ingredients, parsed_lines, matches)
+    ]
+    return _recipe_response(body, statuses)
+
+
+class _Need:
+    """One ingredient's demand across a batch, in the unit it was first seen in."""
+
+    def __init__(self, status: IngredientStatus, match: MatchResult):
+        self.name = normalize_name(status.name)
+        self.unit = resolve(status.unit)
+        self.label = self.unit.key if status.unit else None
+        self.quantity: float | None = None
+        self.match = match
+        self.recipes: list[int] = []
+        self.whole_foods_url = status.whole_foods_url or whole_foods_url(self.name)
+
+    def add(self, recipe: int, status: IngredientStatus) -> None:
+        if status.quantity is not None:
+            factor = resolve(status.unit).factor / self.unit.factor
+            self.quantity = (self.quantity or 0) + status.quantity * factor
+        if not self.recipes or self.recipes[-1] != recipe:
+            self.recipes.append(recipe)
+
+    def missing(self) -> MissingItem | None:
+        match = self.match
+        covered = coverage(
+            match.in_pantry, self.quantity, self.label, match.pantry_quantity, match.pantry_unit
+        )
+        if covered.status == "full":
+            return None
+        return MissingItem(
+            name=self.name,
+            quantity=covered.shortfall,
+            unit=self.label,
+            recipes=self.recipes,
+            whole_foods_url=self.whole_foods_url,
+        )
+
+
+def _diff_batch(body: RecipeBatchDiffRequest, db: Session) -> RecipeBatchDiffResponse:
+    # Each distinct line is parsed once and each distinct name matched once,
+    # all against a single version of the pantry index
+    lines = list(dict.fromkeys(raw for recipe in body.recipes for raw in recipe.ingredients))
+    parsed_lines = parse_cache.parse(db, lines)
+    names = list(dict.fromkeys(p.name for p in parsed_lines))
+    matches = dict(zip(names, pantry_index.match_many(db, names)))
+    match_by_line = {raw: matches[parsed.name] for raw, parsed in zip(lines, parsed_lines)}
+    by_line = {
+        raw: _status(raw, parsed, matches[parsed.name])
+        for raw, parsed in zip(lines, parsed_lines)
+    }
+
+    # Demand is summed per name and unit dimension before it is compared
+    # with the pantry, so two recipes can together outrun the stock
+    recipes: list[RecipeDiffResponse] = []
+    needs: dict[tuple[str, str], _Need] = {}
+    for index, recipe in enumerate(body.recipes):
+        statuses = [by_line[raw] for raw in recipe.ingredients]
+        recipes.append(_recipe_response(recipe, statuses))
+        for raw, status in zip(recipe.ingredients, statuses):
+            if not status.name:
+                continue
+            key = (normalize_name(status.name), resolve(status.unit).dimension)
+            need = needs.get(key)
+            if need is None:
+                need = needs[key] = _Need(status, match_by_line[raw])
+            need.add(index, status)
+    missing = [item for need in needs.values() if (item := need.missing()) is not None]
+    return RecipeBatchDiffResponse(recipes=recipes, missing=missing, unique_ingredients=len(lines))
+
+
+@router.post("/diff", response_model=RecipeDiffResponse)
+async def recipe_diff(body: RecipeDiffRequest, db: Session = Depends(get_db)):
+    return await _run_nlp(_diff, body, db)
+
+
+@router.post("/diff/batch", response_model=RecipeBatchDiffResponse)
+async def recipe_diff_batch(body: RecipeBatchDiffRequest, db: Session = Depends(get_db)):
+    """Diff several recipes (e.g. a week's meal plan) in one request.
+
+    Lines shared between recipes are parsed and matched once. Missing items
+    are also aggregated across recipes, summing quantities per name and unit.
+    """
+    if len(body.recipes) > settings.recipe_batch_max_recipes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many recipes ({len(body.recipes)}). "
+            f"Maximum is {settings.recipe_batch_max_recipes} per batch.",
+        )
+    return await _run_nlp(_diff_batch, body, db)
+
+
+def _parse(body: ParseRequest, db: Session) -> ParseResponse:
     parsed = []
-    for raw in body.ingredients:
-        p = parse_single(raw)
+    for p in parse_cache.parse(db, body.ingredients):
         parsed.append(
             ParsedIngredient(
                 raw=p.raw,
@@ -66,3 +190,20 @@ def parse_ingredients(body: ParseRequest):
             )
         )
     return ParseResponse(parsed=parsed)
+
+
+@router.post("/parse", response_model=ParseResponse)
+async def parse_ingredients(body: ParseRequest, db: Session = Depends(get_db)):
+    return await _run_nlp(_parse, body, db)
+
+
+@router.get("/parse/cache")
+def parse_cache_stats(db: Session = Depends(get_db)):
+    """Hit/miss counters for this worker's parse cache, plus tier sizes."""
+    return parse_cache.stats(db)
+
+
+@router.get("/executor")
+def executor_stats():
+    """Queue depth, wait times and rejections for the recipe executor."""
+    return nlp_executor.stats()
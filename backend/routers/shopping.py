@@ -0,0 +1,127 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from ..database import get_db, get_read_db, retry_on_busy
+from ..models import ShoppingListItem
+from ..schemas import (
+    ShoppingBulkCreate,
+    ShoppingListItemOut,
+    ShoppingPurchaseRequest,
+    ShoppingPurchaseResponse,
+    ShoppingPurchasedUpdate,
+)
+from ..services import pantry_version, shopping_list
+from ..services.pantry_index import pantry_index
+from ..services.pantry_merge import load_items
+
+router = APIRouter(prefix="/api/shopping", tags=["shopping"])
+
+
+def _encode_cursor(item: ShoppingListItem) -> str:
+    raw = json.dumps([item.created_at.isoformat(), item.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(created_at, str) or not isinstance(item_id, int):
+            raise ValueError
+        return datetime.fromisoformat(created_at), item_id
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _load(db: Session, ids: list[int]) -> list[ShoppingListItem]:
+    by_id = {
+        item.id: item
+        for item in db.query(ShoppingListItem).filter(ShoppingListItem.id.in_(set(ids)))
+    }
+    return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+
+@router.get("", response_model=list[ShoppingListItemOut])
+def list_shopping(
+    response: Response,
+    purchased: bool = Query(False),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: Session = Depends(get_read_db),
+):
+    """List unpurchased (or purchased) items, newest first.
+
+    Keyset pages on ``(created_at, id)`` descending, served by the
+    ``(purchased, created_at, id)`` index; the next page's cursor comes back
+    in ``X-Next-Cursor``.
+    """
+    q = db.query(ShoppingListItem).filter(ShoppingListItem.purchased == int(purchased))
+    if cursor:
+        q = q.filter(tuple_(ShoppingListItem.created_at, ShoppingListItem.id) < _decode_cursor(cursor))
+    q = q.order_by(ShoppingListItem.created_at.desc(), ShoppingListItem.id.desc())
+    items = q.limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(items[-1])
+    return items
+
+
+@router.post("/bulk", response_model=list[ShoppingListItemOut], status_code=201)
+@retry_on_busy
+def bulk_add_shopping(body: ShoppingBulkCreate, db: Session = Depends(get_db)):
+    """Add items, e.g. straight from a recipe diff's ``missing`` list.
+
+    Items merge by normalized name and unit, with each other and with rows
+    already on the list, in one upsert.
+    """
+    items = body.items
+    if body.source_recipe:
+        items = [
+            item if item.source_recipe else item.model_copy(update={"source_recipe": body.source_recipe})
+            for item in items
+        ]
+    ids = shopping_list.add_items(db, items)
+    db.commit()
+    return _load(db, ids)
+
+
+@router.post("/purchased")
+@retry_on_busy
+def set_purchased(body: ShoppingPurchasedUpdate, db: Session = Depends(get_db)):
+    updated = shopping_list.set_purchased(db, body.ids, body.purchased)
+    db.commit()
+    return {"updated": updated}
+
+
+@router.delete("")
+@retry_on_busy
+def clear_shopping(
+    purchased: bool | None = Query(None, description="Only purchased (true) or unpurchased (false) items"),
+    db: Session = Depends(get_db),
+):
+    deleted = shopping_list.clear(db, purchased)
+    db.commit()
+    return {"deleted": deleted}
+
+
+@router.post("/purchase", response_model=ShoppingPurchaseResponse)
+@retry_on_busy
+def purchase_to_pantry(body: ShoppingPurchaseRequest, db: Session = Depends(get_db)):
+    """Move items into the pantry, merging with what's there, in one transaction.
+
+    Without ``ids`` every purchased item is moved; given ``ids`` that were
+    not marked purchased stay on the list.
+    """
+    moved, pantry_ids = shopping_list.move_to_pantry(db, body.ids)
+    if not moved:
+        return {"moved": 0, "pantry": []}
+    version = pantry_version.bump(db)
+    db.commit()
+    result = load_items(db, pantry_ids)
+    pantry_index.upsert(result, version)
+    return {"moved": moved, "pantry": result}
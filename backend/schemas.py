@@ -52,6 +52,10 @@ class IngredientStatus(BaseModel):
     in_pantry: bool = False
     pantry_match: str | None = None
     match_score: float = 0.0
+    # How much of the quantity the matched pantry stock covers:
+    # "full", "partial" or "none"; shortfall is in this line's unit
+    coverage: str = "none"
+    shortfall: float | None = None
     whole_foods_url: str | None = None
 
 
@@ -61,6 +65,25 @@ class RecipeDiffResponse(BaseModel):
     ingredients: list[IngredientStatus]
     missing_count: int
     in_pantry_count: int
+    partial_count: int = 0  # in the pantry, but not enough of it
+
+
+class RecipeBatchDiffRequest(BaseModel):
+    recipes: list[RecipeDiffRequest]
+
+
+class MissingItem(BaseModel):
+    name: str
+    quantity: float | None = None  # summed over the recipes, less pantry stock
+    unit: str | None = None
+    recipes: list[int]  # indexes into the request's recipes
+    whole_foods_url: str | None = None
+
+
+class RecipeBatchDiffResponse(BaseModel):
+    recipes: list[RecipeDiffResponse]
+    missing: list[MissingItem]  # aggregated across recipes, per name and unit dimension
+    unique_ingredients: int
 
 
 # --- Parse ---
@@ -88,6 +111,23 @@ class ParseResponse(BaseModel):
 class PhotoUploadResponse(BaseModel):
     message: str
     items: list[PantryItemCreate]
+    cached: bool = False
+
+
+class PhotoResult(BaseModel):
+    filename: str | None
+    status_code: int = 200
+    message: str | None = None
+    items: list[PantryItemCreate] = []
+    cached: bool = False
+    error: str | None = None
+
+
+class PhotoBatchResponse(BaseModel):
+    message: str
+    items: list[PantryItemCreate]  # merged across photos
+    photos: list[PhotoResult]
+    failed: int
 
 
 # --- Shopping list ---
@@ -104,3 +144,32 @@ class ShoppingListItemOut(BaseModel):
     created_at: datetime | None
 
     model_config = {"from_attributes": True}
+
+
+class ShoppingListItemCreate(BaseModel):
+    # Extra fields are ignored, so diff ``ingredients``/``missing`` entries
+    # can be posted as they are
+    name: str
+    quantity: float | None = None
+    unit: str | None = None
+    source_recipe: str | None = None
+    whole_foods_url: str | None = None
+
+
+class ShoppingBulkCreate(BaseModel):
+    items: list[ShoppingListItemCreate]
+    source_recipe: str | None = None  # default for items without their own
+
+
+class ShoppingPurchasedUpdate(BaseModel):
+    ids: list[int]
+    purchased: bool = True
+
+
+class ShoppingPurchaseRequest(BaseModel):
+    ids: list[int] | None = None  # None: every purchased item; unbought ids are skipped
+
+
+class ShoppingPurchaseResponse(BaseModel):
+    moved: int
+    pantry: list[PantryItemOut]
@@ -0,0 +1,67 @@
+"""Ingredient synonyms, resolved to one canonical spelling by hash lookup.
+
+Pantry names and recipe queries both go through ``canonicalize`` before
+matching. As a result, "green onions" finds "scallions" as an exact match
+instead of depending on a fuzzy score. Phrases are replaced
+longest-first, a word at a time, so "fresh coriander leaves" becomes
+"fresh cilantro". A trailing plural "s" on an alias is dropped with the
+rest of it.
+"""
+
+# The first spelling in each group is the canonical one
+ALIAS_GROUPS: list[tuple[str, ...]] = [
+    ("scallion", "green onion", "spring onion"),
+    ("cilantro", "coriander", "coriander leaves", "coriander leaf"),
+    ("bell pepper", "capsicum", "sweet pepper"),
+    ("eggplant", "aubergine"),
+    ("zucchini", "courgette"),
+    ("chickpea", "garbanzo bean", "garbanzo"),
+    ("powdered sugar", "confectioners sugar", "confectioners' sugar", "icing sugar"),
+    ("baking soda", "bicarbonate of soda", "sodium bicarbonate"),
+    ("cornstarch", "corn starch", "cornflour"),
+    ("heavy cream", "heavy whipping cream", "double cream"),
+    ("all-purpose flour", "all purpose flour", "plain flour"),
+    ("ground beef", "minced beef", "beef mince"),
+    ("arugula", "rocket"),
+    ("shrimp", "prawn"),
+    ("beet", "beetroot"),
+    ("romaine lettuce", "cos lettuce"),
+    ("molasses", "treacle"),
+    ("rutabaga", "swede"),
+]
+
+
+def _build(groups: list[tuple[str, ...]]) -> tuple[dict[tuple[str, ...], str], int]:
+    table: dict[tuple[str, ...], str] = {}
+    for group in groups:
+        canonical = group[0]
+        for spelling in group:
+            words = tuple(spelling.split())
+            table[words] = canonical
+            table[words[:-1] + (words[-1] + "s",)] = canonical
+    return table, max((len(words) for words in table), default=0)
+
+
+_TABLE, _LONGEST = _build(ALIAS_GROUPS)
+
+
+def canonicalize(normalized: str) -> str:
+    """Replace known aliases in an already lower-cased, stripped name."""
+    words = normalized.split()
+    if not words:
+        return normalized
+    out: list[str] = []
+    changed = False
+    i = 0
+    while i < len(words):
+        for size in range(min(_LONGEST, len(words) - i), 0, -1):
+            canonical = _TABLE.get(tuple(words[i:i + size]))
+            if canonical is not None:
+                out.append(canonical)
+                changed = changed or canonical != " ".join(words[i:i + size])
+                i += size
+                break
+        else:
+            out.append(words[i])
+            i += 1
+    return " ".join(out) if changed else normalized
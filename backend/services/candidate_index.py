@@ -0,0 +1,57 @@
+"""Character-trigram inverted index for pruning fuzzy-match candidates.
+
+Scoring a query with rapidfuzz against every name is linear in the pantry.
+For product catalogs and shared pantries of 50k-500k names, this index
+narrows each query to the top-K names by trigram Dice similarity first. Only
+those K are scored. The postings are ``int32`` row arrays built once per set
+of names. A query costs one ``bincount`` over the postings of its own
+trigrams, plus a partial sort of the rows that share any trigram.
+"""
+
+import numpy as np
+
+GRAM = 3
+
+
+def grams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+class TrigramIndex:
+    """Trigram postings over a fixed list of (normalized) names."""
+
+    def __init__(self, names: list[str]):
+        postings: dict[str, list[int]] = {}
+        sizes = np.empty(len(names), dtype=np.int32)
+        for row, name in enumerate(names):
+            name_grams = grams(name)
+            sizes[row] = len(name_grams)
+            for gram in name_grams:
+                postings.setdefault(gram, []).append(row)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self._sizes = sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def candidates(self, query: str, k: int) -> np.ndarray:
+        """Rows of the ``k`` names most similar to ``query``, in row order.
+
+        Similarity is the Dice coefficient of the trigram sets. Ties at the
+        cut go to the lowest rows. Names sharing no trigram are never
+        candidates.
+        """
+        query_grams = grams(query)
+        arrays = [self._postings[g] for g in query_grams if g in self._postings]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        counts = np.bincount(np.concatenate(arrays), minlength=len(self._sizes))
+        rows = np.flatnonzero(counts)
+        if len(rows) <= k:
+            return rows
+        dice = counts[rows] / (self._sizes[rows] + len(query_grams))
+        cut = np.partition(dice, len(dice) - k)[len(dice) - k]
+        above = rows[dice > cut]
+        at_cut = rows[dice == cut][: k - len(above)]
+        return np.sort(np.concatenate([above, at_cut]))
@@ -0,0 +1,165 @@
+"""Dedicated, bounded pools for CPU-heavy work.
+
+FastAPI runs plain ``def`` endpoints on the shared AnyIO threadpool, which
+also serves every cheap CRUD call, and ``async def`` endpoints on the event
+loop itself. Recipe parsing/matching and image decoding run on these pools
+instead, so a burst of heavy requests queues behind its own workers and is
+rejected once the queue is full rather than starving pantry reads.
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TypeVar
+
+from ..config import settings
+
+T = TypeVar("T")
+
+_WAIT_SAMPLES = 1000  # recent queue-wait samples kept for stats
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor's queue is full."""
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix=self.name
+            )
+        return self._pool
+
+    def _submit(self, pool: Executor, fn: Callable[..., T], args: tuple, submitted: float) -> Future:
+        # Carry the request's context (e.g. its metrics stage timings) into the worker thread
+        context = contextvars.copy_context()
+
+        def job() -> T:
+            with self._lock:
+                self._running += 1
+                self._waits.append(time.perf_counter() - submitted)
+            try:
+                return context.run(fn, *args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        return pool.submit(job)
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on the pool, or raise ExecutorSaturated."""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self._pending += 1
+            pool = self._get_pool()
+        submitted = time.perf_counter()
+
+        def release(_: Future) -> None:
+            # Runs even if the awaiting request was cancelled
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+        try:
+            future = self._submit(pool, fn, args, submitted)
+        except Exception:
+            # e.g. BrokenProcessPool; drop the pool so the next call starts fresh
+            with self._lock:
+                self._pending -= 1
+                self._pool = None
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_ms_avg": 1000 * sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "wait_ms_max": 1000 * waits[-1] if waits else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class BoundedProcessExecutor(BoundedExecutor):
+    """BoundedExecutor over worker processes, for work that holds the GIL.
+
+    ``fn`` and its arguments must be picklable. Workers are spawned (not
+    forked) and run ``initializer`` once at start-up. Queue wait is not
+    observable across the process boundary, so wait stats are reported as
+    submit-to-result latency instead.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int, initializer: Callable[[], None] | None = None):
+        super().__init__(name, workers, queue_size)
+        self.initializer = initializer
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+        return self._pool
+
+    def _submit(self, pool: Executor, fn: Callable[..., T], args: tuple, submitted: float) -> Future:
+        future = pool.submit(fn, *args)
+
+        def record(_: Future) -> None:
+            with self._lock:
+                self._waits.append(time.perf_counter() - submitted)
+
+        future.add_done_callback(record)
+        return future
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        pending = stats["running"] + stats["queued"]
+        stats["running"] = min(pending, self.workers)
+        stats["queued"] = pending - stats["running"]
+        return stats
+
+    def start(self) -> None:
+        """Spawn the workers now instead of on the first submit."""
+        pool = self._get_pool()
+        for future in [pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+
+def _noop() -> None:
+    pass
+
+
+nlp_executor = BoundedExecutor("nlp", settings.nlp_workers, settings.nlp_queue_size)
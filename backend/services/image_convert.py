@@ -0,0 +1,16 @@
+"""Bounded process pool for CPU-bound image decoding and preprocessing."""
+
+from ..config import settings
+from .executor import BoundedProcessExecutor
+
+
+def init_worker() -> None:
+    """Register the HEIC/HEIF opener once per pool process."""
+    import pillow_heif
+
+    pillow_heif.register_heif_opener()
+
+
+image_pool = BoundedProcessExecutor(
+    "image", settings.image_workers, settings.image_queue_size, initializer=init_worker
+)
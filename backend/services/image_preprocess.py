@@ -0,0 +1,127 @@
+"""Shrink uploaded photos before they are sent to Gemini.
+
+Phone photos arrive at full sensor resolution, and their size dominates the
+upload time and token cost of a vision call. ``prepare_image`` downscales
+to a maximum long edge and recompresses to a byte budget. It applies the
+EXIF orientation and drops the metadata. Transparency is flattened onto
+white, since JPEG has no alpha and a plain RGB conversion turns it black.
+Images that are already small, need no rotation and carry no EXIF are
+passed through untouched. It runs on the image process pool, so it must
+stay a picklable module-level function. The router hands it the path of
+the upload's temp file rather than the bytes, so the upload isn't pickled
+into the pool process. It can also compute a difference hash for the
+vision cache's near-duplicate lookup, while the pixels are already decoded.
+"""
+
+import io
+import os
+import time
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+# JPEG qualities tried in order until the output fits the byte budget
+_QUALITIES = (85, 75, 65, 55, 45)
+# Long-edge scale applied when even the lowest quality is over budget
+_SHRINK = 0.75
+# Formats Gemini accepts as-is when no work is needed
+_PASSTHROUGH_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    original_size: tuple[int, int]
+    size: tuple[int, int]
+    seconds: float
+    skipped: bool = False
+    dhash: int | None = None
+
+
+def difference_hash(img: Image.Image) -> int:
+    """64-bit dHash: one bit per horizontally adjacent pair of a 9x8 thumbnail."""
+    px = img.convert("L").resize((9, 8), Image.Resampling.BOX).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return bits
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB copy of ``img`` with transparent areas on white rather than black."""
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, rgba).convert("RGB")
+    return img.convert("RGB")
+
+
+def _encode(img: Image.Image, max_bytes: int) -> bytes:
+    while True:
+        for quality in _QUALITIES:
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality, optimize=True)
+            if buf.tell() <= max_bytes:
+                return buf.getvalue()
+        if max(img.size) <= 256:
+            # Give up on the budget rather than sending a useless thumbnail
+            return buf.getvalue()
+        img = img.resize(
+            (max(1, int(img.width * _SHRINK)), max(1, int(img.height * _SHRINK))),
+            Image.Resampling.LANCZOS,
+        )
+
+
+def prepare_image(
+    source: bytes | bytearray | str, mime_type: str, max_long_edge: int, max_bytes: int, dhash: bool = False
+) -> PreparedImage:
+    """Downscale and recompress ``source`` (the image, or a path to it) for the vision model.
+
+    Raises whatever PIL raises if the image cannot be decoded.
+    """
+    start = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        fp, original_bytes = io.BytesIO(source), len(source)
+    else:
+        fp, original_bytes = open(source, "rb"), os.path.getsize(source)
+    with fp:
+        img = Image.open(fp)
+        original_size = img.size
+        if (
+            mime_type in _PASSTHROUGH_TYPES
+            and original_bytes <= max_bytes
+            and max(original_size) <= max_long_edge
+            and not img.getexif()
+        ):
+            hashed = difference_hash(img) if dhash else None
+            fp.seek(0)
+            return PreparedImage(
+                data=fp.read(),
+                mime_type=mime_type,
+                original_bytes=original_bytes,
+                original_size=original_size,
+                size=original_size,
+                seconds=time.perf_counter() - start,
+                skipped=True,
+                dhash=hashed,
+            )
+
+        if img.format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the target allows
+            img.draft("RGB", (max_long_edge, max_long_edge))
+        img = _flatten(ImageOps.exif_transpose(img))
+    img.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+    # Saved without exif=..., so no metadata survives
+    out = _encode(img, max_bytes)
+    return PreparedImage(
+        data=out,
+        mime_type="image/jpeg",
+        original_bytes=original_bytes,
+        original_size=original_size,
+        size=Image.open(io.BytesIO(out)).size,
+        seconds=time.perf_counter() - start,
+        dhash=difference_hash(img) if dhash else None,
+    )
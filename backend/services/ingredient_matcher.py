@@ -1,11 +1,22 @@
 """Fuzzy matching of parsed ingredient names against pantry items using rapidfuzz."""
 
+from collections.abc import Iterable
 from dataclasses import dataclass
+from itertools import combinations
 
+import numpy as np
 from rapidfuzz import fuzz, process
 
+from ..config import settings
+from .aliases import canonicalize
+from .candidate_index import TrigramIndex
+
 
 MATCH_THRESHOLD = 70  # minimum score to consider a match
+# Pantry names scored per cdist call; bounds the score matrix for huge pantries
+_CDIST_CHUNK = 16384
+# Queries with more distinct tokens than this find token subsets by scanning
+_MAX_SUBSET_TOKENS = 10
 
 
 @dataclass
@@ -14,50 +25,313 @@ class MatchResult:
     in_pantry: bool
     pantry_match: str | None = None
     score: float = 0.0
+    pantry_id: int | None = None
+    # Stock of the matched item, filled in by PantryIndex
+    pantry_quantity: float | None = None
+    pantry_unit: str | None = None
 
 
-def match_ingredient(name: str, pantry_names: list[str]) -> MatchResult:
-    """Match a single ingredient name against a list of pantry item names.
+def _normalize(name: str) -> str:
+    return canonicalize(name.lower().strip())
+
+
+class PantryMatcher:
+    """Reusable match index over a set of pantry item names.
+
+    Names are normalized once when added, so matching a recipe only pays for
+    the fuzzy scoring. Entries are keyed by pantry item id, which lets callers
+    patch the index in place as items are created, renamed or deleted.
 
-    Uses token_set_ratio which handles word reordering and partial matches well
-    for ingredient names (e.g., "garlic cloves" vs "garlic").
+    Names are canonicalized through the alias table, so synonyms match
+    exactly. Pantries of at least ``matcher_prune_min`` names score each fuzzy
+    query only against its top-K trigram candidates. The trigram index
+    outlives patches: names added or renamed since it was built are scored
+    directly, until there are enough of them to justify a rebuild.
     """
-    if not name or not pantry_names:
-        return MatchResult(ingredient_name=name, in_pantry=False)
 
-    name_lower = name.lower().strip()
+    def __init__(self, items: Iterable[tuple[int, str]] = ()):
+        self._names: dict[int, str] = {}
+        self._choices: dict[int, str] = {}
+        # normalized name -> ids carrying that name (duplicates are allowed)
+        self._exact: dict[str, set[int]] = {}
+        # whitespace token -> ids, for resolving token_set_ratio == 100 by lookup
+        self._tokens: dict[str, set[int]] = {}
+        self._token_sets: dict[int, frozenset[str]] = {}
+        # token set -> ids, for finding names whose tokens are a query subset
+        self._by_token_set: dict[frozenset[str], set[int]] = {}
+        # (ids, choices, id -> column) for cdist, rebuilt after patches
+        self._snapshot: tuple[list[int], list[str], dict[int, int]] | None = None
+        # (trigram index, the ids and names it was built over)
+        self._trigrams: tuple[TrigramIndex, list[int], list[str]] | None = None
+        self._unindexed: set[int] = set()  # ids added or renamed since the build
+        for item_id, name in items:
+            self.add(item_id, name)
 
-    # Exact match first
-    for pn in pantry_names:
-        if pn.lower().strip() == name_lower:
-            return MatchResult(
-                ingredient_name=name,
-                in_pantry=True,
-                pantry_match=pn,
-                score=100.0,
+    @classmethod
+    def from_names(cls, pantry_names: list[str]) -> "PantryMatcher":
+        return cls(enumerate(pantry_names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._names
+
+    def add(self, item_id: int, name: str) -> None:
+        """Insert or replace the entry for ``item_id``."""
+        if item_id in self._names:
+            self.remove(item_id)
+        normalized = _normalize(name)
+        self._names[item_id] = name
+        self._choices[item_id] = normalized
+        self._exact.setdefault(normalized, set()).add(item_id)
+        tokens = frozenset(normalized.split())
+        self._token_sets[item_id] = tokens
+        self._by_token_set.setdefault(tokens, set()).add(item_id)
+        for token in tokens:
+            self._tokens.setdefault(token, set()).add(item_id)
+        self._snapshot = None
+        if self._trigrams is not None:
+            self._unindexed.add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        """Drop the entry for ``item_id`` if present."""
+        if item_id not in self._names:
+            return
+        del self._names[item_id]
+        normalized = self._choices.pop(item_id)
+        ids = self._exact[normalized]
+        ids.discard(item_id)
+        if not ids:
+            del self._exact[normalized]
+        tokens = self._token_sets.pop(item_id)
+        ids = self._by_token_set[tokens]
+        ids.discard(item_id)
+        if not ids:
+            del self._by_token_set[tokens]
+        for token in tokens:
+            ids = self._tokens[token]
+            ids.discard(item_id)
+            if not ids:
+                del self._tokens[token]
+        self._snapshot = None
+
+    def prepare(self) -> None:
+        """Build the lazily built match structures now rather than on first use."""
+        self._get_snapshot()
+        if self._prunes():
+            self._get_trigrams()
+
+    def _prunes(self) -> bool:
+        return 0 < settings.matcher_prune_min <= len(self._names)
+
+    def _get_snapshot(self) -> tuple[list[int], list[str], dict[int, int]]:
+        if self._snapshot is None:
+            ids = list(self._choices)
+            self._snapshot = (ids, list(self._choices.values()), {i: col for col, i in enumerate(ids)})
+        return self._snapshot
+
+    def _get_trigrams(self) -> tuple[TrigramIndex, list[int], list[str]]:
+        # Rebuild once the directly-scored remainder stops being small
+        if self._trigrams is None or len(self._unindexed) > max(1024, len(self._names) // 8):
+            ids, choices, _ = self._get_snapshot()
+            self._trigrams = (TrigramIndex(choices), ids, choices)
+            self._unindexed = set()
+        return self._trigrams
+
+    def _pruned_best(
+        self, query: str, choices: list[str], columns: dict[int, int]
+    ) -> tuple[int, float] | None:
+        """Best (column, score) among the query's trigram candidates."""
+        index, built_ids, built_choices = self._get_trigrams()
+        candidates = {
+            built_ids[row]
+            for row in index.candidates(query, settings.matcher_candidates).tolist()
+            # Deleted or renamed since the build
+            if self._choices.get(built_ids[row]) == built_choices[row]
+        }
+        candidates.update(i for i in self._unindexed if i in self._choices)
+        if not candidates:
+            return None
+        # Column order, so ties resolve to the same item as a full scan
+        cols = sorted(columns[i] for i in candidates)
+        result = process.extractOne(
+            query,
+            [choices[col] for col in cols],
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=MATCH_THRESHOLD,
+        )
+        if result is None:
+            return None
+        _, score, position = result
+        return cols[position], score
+
+    def _first_full_score(self, query: str, columns: dict[int, int]) -> int | None:
+        """Column of the first choice scoring 100 against ``query``, if any.
+
+        token_set_ratio is 100 exactly when the token sets share a token and
+        one contains the other. Names whose tokens are a subset of the query's
+        are found by looking up each subset; names containing every query
+        token by intersecting the token postings.
+        """
+        tokens = frozenset(query.split())
+        if not tokens:
+            return None
+        postings = sorted((self._tokens.get(token, set()) for token in tokens), key=len)
+        found = postings[0].intersection(*postings[1:])
+        if len(tokens) <= _MAX_SUBSET_TOKENS:
+            for size in range(1, len(tokens) + 1):
+                for subset in combinations(tokens, size):
+                    found.update(self._by_token_set.get(frozenset(subset), ()))
+        else:
+            found.update(
+                item_id
+                for posting in postings
+                for item_id in posting
+                if self._token_sets[item_id] <= tokens
             )
+        return min(map(columns.__getitem__, found), default=None)
 
-    # Fuzzy match
-    result = process.extractOne(
-        name_lower,
-        [p.lower() for p in pantry_names],
-        scorer=fuzz.token_set_ratio,
-        score_cutoff=MATCH_THRESHOLD,
-    )
-    if result:
-        match_text, score, idx = result
+    def _exact_match(self, name: str, normalized: str) -> MatchResult | None:
+        # The oldest item wins, as with a table scan
+        ids = self._exact.get(normalized)
+        if not ids:
+            return None
+        item_id = min(ids)
         return MatchResult(
             ingredient_name=name,
             in_pantry=True,
-            pantry_match=pantry_names[idx],
-            score=score,
+            pantry_match=self._names[item_id],
+            score=100.0,
+            pantry_id=item_id,
+        )
+
+    def match(self, name: str) -> MatchResult:
+        """Match a single ingredient name against the indexed pantry names.
+
+        Uses token_set_ratio which handles word reordering and partial matches well
+        for ingredient names (e.g., "garlic cloves" vs "garlic").
+        """
+        if not name or not self._names:
+            return MatchResult(ingredient_name=name, in_pantry=False)
+
+        name_lower = _normalize(name)
+
+        # Exact match first
+        exact = self._exact_match(name, name_lower)
+        if exact:
+            return exact
+
+        if self._prunes():
+            return self.match_many([name])[0]
+
+        # Fuzzy match
+        result = process.extractOne(
+            name_lower,
+            self._choices,
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=MATCH_THRESHOLD,
         )
+        if result:
+            _, score, item_id = result
+            return MatchResult(
+                ingredient_name=name,
+                in_pantry=True,
+                pantry_match=self._names[item_id],
+                score=score,
+                pantry_id=item_id,
+            )
+
+        return MatchResult(ingredient_name=name, in_pantry=False)
 
-    return MatchResult(ingredient_name=name, in_pantry=False)
+    def match_many(self, names: list[str]) -> list[MatchResult]:
+        """Match many ingredient names in one vectorized pass.
+
+        Exact and full-score matches are resolved by hash lookup; the remaining
+        names are scored against every pantry name with one ``process.cdist``
+        call per chunk of pantry names, taking the best column per row.
+        Results are identical to calling ``match`` for each name.
+        """
+        results: list[MatchResult | None] = [None] * len(names)
+        pending: dict[str, list[int]] = {}  # normalized query -> result slots
+        for i, name in enumerate(names):
+            if not name or not self._names:
+                results[i] = MatchResult(ingredient_name=name, in_pantry=False)
+                continue
+            normalized = _normalize(name)
+            exact = self._exact_match(name, normalized)
+            if exact:
+                results[i] = exact
+            else:
+                pending.setdefault(normalized, []).append(i)
+
+        if pending:
+            ids, choices, columns = self._get_snapshot()
+            # Rows that score 100 somewhere are settled by token lookup, the
+            # same first-100 short-circuit extractOne takes
+            best: dict[str, tuple[int, float]] = {}
+            for query in pending:
+                col = self._first_full_score(query, columns)
+                if col is not None:
+                    best[query] = (col, 100.0)
+
+            queries = [q for q in pending if q not in best]
+            if queries and self._prunes():
+                for query in queries:
+                    found = self._pruned_best(query, choices, columns)
+                    if found is not None:
+                        best[query] = found
+            elif queries:
+                best_scores = np.zeros(len(queries))
+                best_cols = np.full(len(queries), -1)
+                rows = np.arange(len(queries))
+                for start in range(0, len(choices), _CDIST_CHUNK):
+                    scores = process.cdist(
+                        queries,
+                        choices[start:start + _CDIST_CHUNK],
+                        scorer=fuzz.token_set_ratio,
+                        score_cutoff=MATCH_THRESHOLD,
+                        dtype=np.float64,
+                        workers=settings.matcher_workers,
+                    )
+                    cols = scores.argmax(axis=1)
+                    chunk_best = scores[rows, cols]
+                    # Strictly greater keeps the first best column, like extractOne
+                    better = chunk_best > best_scores
+                    best_scores[better] = chunk_best[better]
+                    best_cols[better] = cols[better] + start
+                for row, query in enumerate(queries):
+                    if best_cols[row] >= 0:
+                        best[query] = (int(best_cols[row]), float(best_scores[row]))
+
+            for query, slots in pending.items():
+                col, score = best.get(query, (-1, 0.0))
+                for i in slots:
+                    if col < 0:
+                        results[i] = MatchResult(ingredient_name=names[i], in_pantry=False)
+                    else:
+                        results[i] = MatchResult(
+                            ingredient_name=names[i],
+                            in_pantry=True,
+                            pantry_match=self._names[ids[col]],
+                            score=score,
+                            pantry_id=ids[col],
+                        )
+
+        return results
+
+
+def match_ingredient(name: str, pantry_names: list[str]) -> MatchResult:
+    """Match a single ingredient name against a list of pantry item names.
+
+    Builds a throwaway index; use a long-lived PantryMatcher when matching
+    many ingredients against the same pantry.
+    """
+    return PantryMatcher.from_names(pantry_names).match(name)
 
 
 def match_many(
     ingredient_names: list[str], pantry_names: list[str]
 ) -> list[MatchResult]:
     """Match a list of ingredient names against pantry."""
-    return [match_ingredient(name, pantry_names) for name in ingredient_names]
+    return PantryMatcher.from_names(pantry_names).match_many(ingredient_names)
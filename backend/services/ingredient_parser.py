@@ -1,12 +1,20 @@
 """Wrap ingredient-parser-nlp to parse raw ingredient strings into structured data."""
 
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 
+from ..config import settings
+
 try:
     from ingredient_parser import parse_ingredient
 except ImportError:
     parse_ingredient = None
 
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class ParsedIngredient:
@@ -86,3 +94,71 @@ def parse_single(raw: str) -> ParsedIngredient:
 def parse_many(ingredients: list[str]) -> list[ParsedIngredient]:
     """Parse a list of raw ingredient strings."""
     return [parse_single(raw) for raw in ingredients]
+
+
+def warm_up() -> None:
+    """Load the CRF model in this process by parsing a throwaway line."""
+    try:
+        parse_single("1 cup flour")
+    except Exception as exc:  # a broken model shouldn't block startup
+        log.warning("Ingredient parser warm-up failed: %s", exc)
+
+
+class ParserPool:
+    """Parse ingredient lists in batches on a pool of worker processes.
+
+    Each worker loads the CRF model once, at pool start. With zero workers
+    (the default) lines are parsed serially in the calling thread.
+    """
+
+    def __init__(self, workers: int = 0, batch_size: int = 16):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Spawn the workers and block until every one has loaded the model."""
+        if self.workers <= 0 or self._executor is not None:
+            warm_up()
+            return
+        # spawn, not fork: the pool starts inside an already-threaded server
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up,
+        )
+        for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        log.info("Ingredient parser pool started (workers=%d)", self.workers)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def parse(self, ingredients: list[str]) -> list[ParsedIngredient]:
+        """Parse a whole ingredient list, preserving order."""
+        if self._executor is None:
+            return parse_many(ingredients)
+        batches = [
+            ingredients[i:i + self.batch_size]
+            for i in range(0, len(ingredients), self.batch_size)
+        ]
+        try:
+            results = self._executor.map(parse_many, batches)
+            return [parsed for batch in results for parsed in batch]
+        except BrokenProcessPool:
+            log.exception("Ingredient parser pool died; falling back to serial parsing")
+            self._executor = None
+            return parse_many(ingredients)
+
+
+def _ping() -> None:
+    pass
+
+
+parser_pool = ParserPool(settings.parser_workers, settings.parser_batch_size)
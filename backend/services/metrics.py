@@ -0,0 +1,286 @@
+"""Per-route request metrics, aggregated across workers in Prometheus format.
+
+``MetricsMiddleware`` (backend/middleware.py) counts every HTTP request by
+method, route template and status. It times each request into a latency
+histogram and tracks in-flight requests per route class. While a request
+runs, ``timed(stage)`` blocks and the SQLAlchemy cursor hooks add to
+per-request totals for the ``db``, ``parser``, ``matcher``, ``image`` and
+``vision`` stages. These go into a second histogram, so the metrics show
+where a route's time goes.
+
+Each worker periodically writes its snapshot to ``<metrics dir>/<pid>.json``.
+``/api/metrics`` refreshes the answering worker's file, then sums the files
+of every live worker. Files left by dead workers are removed, so their
+counters drop out, which Prometheus treats as a counter reset.
+"""
+
+import bisect
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+log = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_PREFIX = "pantry_"
+_HELP = {
+    "http_requests_total": ("counter", "HTTP requests by method, route and status."),
+    "http_requests_in_flight": ("gauge", "HTTP requests in progress by route class."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by method and route."),
+    "http_request_stage_seconds": (
+        "histogram",
+        "Per-request time spent in db, parser, matcher, image and vision work.",
+    ),
+}
+
+
+class Stages:
+    """Per-request stage totals; added to from threadpool and executor threads."""
+
+    __slots__ = ("_lock", "totals")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.totals: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+
+_current: contextvars.ContextVar[Stages | None] = contextvars.ContextVar("request_stages", default=None)
+
+
+def begin_request() -> tuple[Stages, contextvars.Token]:
+    stages = Stages()
+    return stages, _current.set(stages)
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Add the block's wall time to ``stage`` of the current request, if any."""
+    stages = _current.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages.add(stage, time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stages = _current.get()
+    start = getattr(context, "_metrics_start", None)
+    if stages is not None and start is not None:
+        stages.add("db", time.perf_counter() - start)
+
+
+def instrument_engines() -> None:
+    """Time every cursor execute on every engine as the ``db`` stage."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """This worker's metrics. Updated from the event loop thread only.
+
+    Series are keyed by tuples of label values; label strings are only
+    built when a snapshot is taken.
+    """
+
+    def __init__(self) -> None:
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.in_flight_by_class: dict[tuple[str], int] = {}
+        self.durations: dict[tuple[str, str], list] = {}
+        self.stages: dict[tuple[str, str], list] = {}
+
+    def in_flight(self, route_class: str, delta: int) -> None:
+        key = (route_class,)
+        self.in_flight_by_class[key] = self.in_flight_by_class.get(key, 0) + delta
+
+    @staticmethod
+    def _observe(series: dict, key: tuple, seconds: float) -> None:
+        hist = series.get(key)
+        if hist is None:
+            # per-bucket counts (last is +Inf), sum, count
+            hist = series[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float, stages: dict[str, float]
+    ) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self._observe(self.durations, (method, route), seconds)
+        for stage, spent in stages.items():
+            self._observe(self.stages, (route, stage), spent)
+
+    def snapshot(self) -> dict:
+        def series(values: dict, names: tuple[str, ...], copy=lambda v: v) -> dict:
+            return {_labels(names, key): copy(value) for key, value in values.items()}
+
+        def hist(h: list) -> list:
+            return [list(h[0]), h[1], h[2]]
+
+        return {
+            "counters": {
+                "http_requests_total": series(self.requests, ("method", "route", "status")),
+            },
+            "gauges": {
+                "http_requests_in_flight": series(self.in_flight_by_class, ("route_class",)),
+            },
+            "histograms": {
+                "http_request_duration_seconds": series(self.durations, ("method", "route"), hist),
+                "http_request_stage_seconds": series(self.stages, ("route", "stage"), hist),
+            },
+        }
+
+    def reset(self) -> None:
+        self.__init__()
+
+
+def merge(snapshots: list[dict]) -> dict:
+    """Sum counters, gauges and histograms of several worker snapshots."""
+    merged: dict = {"counters": {}, "gauges": {}, "histograms": {}}
+    for snap in snapshots:
+        for kind in ("counters", "gauges"):
+            for name, series in snap.get(kind, {}).items():
+                target = merged[kind].setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0) + value
+        for name, series in snap.get("histograms", {}).items():
+            target = merged["histograms"].setdefault(name, {})
+            for key, (buckets, total, count) in series.items():
+                if key not in target:
+                    target[key] = [list(buckets), total, count]
+                else:
+                    hist = target[key]
+                    hist[0] = [a + b for a, b in zip(hist[0], buckets)]
+                    hist[1] += total
+                    hist[2] += count
+    return merged
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(snapshot: dict) -> str:
+    """Prometheus text exposition format."""
+    lines: list[str] = []
+    for kind in ("counters", "gauges", "histograms"):
+        for name, series in sorted(snapshot.get(kind, {}).items()):
+            full = _PREFIX + name
+            metric_type, help_text = _HELP[name]
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {metric_type}")
+            for key, value in sorted(series.items()):
+                if kind != "histograms":
+                    lines.append(f"{full}{{{key}}} {_number(value)}")
+                    continue
+                buckets, total, count = value
+                cumulative = 0
+                for bound, n in zip((*BUCKETS, "+Inf"), buckets):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else repr(bound)
+                    lines.append(f'{full}_bucket{{{key},le="{le}"}} {cumulative}')
+                lines.append(f"{full}_sum{{{key}}} {repr(float(total))}")
+                lines.append(f"{full}_count{{{key}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsStore:
+    """Per-pid snapshot files shared by the workers on a host."""
+
+    def __init__(self, directory: str, registry: Registry):
+        self.directory = Path(directory)
+        self.registry = registry
+
+    def flush(self, snapshot: dict | None = None) -> None:
+        """Write this worker's snapshot (taken on the event loop) atomically."""
+        snapshot = snapshot if snapshot is not None else self.registry.snapshot()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot))
+        os.replace(tmp, path)
+
+    def collect(self, own: dict) -> dict:
+        """Merge this worker's fresh snapshot with those of every other live worker."""
+        snapshots = [own]
+        try:
+            self.flush(own)
+            paths = list(self.directory.glob("*.json"))
+        except OSError as exc:
+            log.warning("Metrics directory unavailable (%s); reporting this worker only", exc)
+            return own
+        for path in paths:
+            try:
+                pid = int(path.stem)
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not _alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # mid-replace or unreadable; next scrape gets it
+        return merge(snapshots)
+
+
+def _default_dir() -> str:
+    return str(Path(tempfile.gettempdir()) / f"pantry-metrics-{settings.instance_tag}")
+
+
+registry = Registry()
+metrics_store = MetricsStore(settings.metrics_dir or _default_dir(), registry)
@@ -0,0 +1,99 @@
+"""Process-wide PantryMatcher kept in sync with the pantry_items table.
+
+The pantry write routes patch the index in place after they commit. Before
+each use the index's version is compared with the durable pantry version, so
+writes made by another worker process trigger a rebuild instead of serving
+stale matches.
+"""
+
+import threading
+from collections.abc import Iterable
+
+from sqlalchemy.orm import Session
+
+from ..models import PantryItem
+from . import pantry_version
+from .ingredient_matcher import MatchResult, PantryMatcher
+from .metrics import timed
+
+
+class PantryIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._matcher: PantryMatcher | None = None
+        self._version: int | None = None
+        # item id -> (quantity, unit), for quantity-aware diffs
+        self._stock: dict[int, tuple[float | None, str | None]] = {}
+
+    def _rebuild(self, db: Session, version: int) -> None:
+        rows = (
+            db.query(PantryItem.id, PantryItem.name, PantryItem.quantity, PantryItem.unit)
+            .order_by(PantryItem.id)
+            .all()
+        )
+        self._matcher = PantryMatcher((row.id, row.name) for row in rows)
+        self._stock = {row.id: (row.quantity, row.unit) for row in rows}
+        # Read before the rows: a write landing in between only causes one
+        # extra rebuild, never a stale index
+        self._version = version
+
+    def _ensure_fresh(self, db: Session) -> PantryMatcher:
+        version = pantry_version.current(db)
+        if self._matcher is None or version != self._version:
+            self._rebuild(db, version)
+        return self._matcher
+
+    def match_many(self, db: Session, names: list[str]) -> list[MatchResult]:
+        """Match ingredient names against the current pantry.
+
+        Matches carry the matched item's id, quantity and unit.
+        """
+        with self._lock:
+            matcher = self._ensure_fresh(db)
+            with timed("matcher"):
+                results = matcher.match_many(names)
+            for result in results:
+                if result.pantry_id is not None:
+                    result.pantry_quantity, result.pantry_unit = self._stock[result.pantry_id]
+            return results
+
+    def warm(self, db: Session) -> None:
+        """Load the index (and its fuzzy-match structures) ahead of the first diff."""
+        with self._lock:
+            self._ensure_fresh(db).prepare()
+
+    def _advance(self, version: int) -> None:
+        # Only a patch for the very next version keeps the index current;
+        # anything else means another writer got in between
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            self._version = None
+
+    def upsert(self, items: Iterable[PantryItem], version: int) -> None:
+        """Record committed creates/updates made at pantry ``version``."""
+        with self._lock:
+            if self._matcher is None:
+                return
+            for item in items:
+                self._matcher.add(item.id, item.name)
+                self._stock[item.id] = (item.quantity, item.unit)
+            self._advance(version)
+
+    def discard(self, item_id: int, version: int) -> None:
+        """Record a committed delete made at pantry ``version``."""
+        with self._lock:
+            if self._matcher is None:
+                return
+            self._matcher.remove(item_id)
+            self._stock.pop(item_id, None)
+            self._advance(version)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._matcher = None
+            self._version = None
+            self._stock = {}
+
+
+pantry_index = PantryIndex()
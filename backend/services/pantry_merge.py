@@ -0,0 +1,109 @@
+"""Merge incoming pantry items by normalized name and upsert them in bulk.
+
+Quantities whose units convert (``units.convert``) are summed in the
+existing item's unit, so "2 lb" of flour added to "500 g" makes about
+1407 g. Otherwise they add as plain numbers, as they always have.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from ..models import PantryItem
+from ..schemas import PantryItemCreate
+from .units import convert
+
+# Stay well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def merge_items(items: Iterable[PantryItemCreate]) -> dict[str, PantryItemCreate]:
+    """Deduplicate items by normalized name, summing quantities."""
+    merged: dict[str, PantryItemCreate] = {}
+    for body in items:
+        key = normalize_name(body.name)
+        if key in merged:
+            existing = merged[key]
+            if body.quantity and existing.quantity:
+                converted = convert(body.quantity, body.unit, existing.unit)
+                merged[key] = existing.model_copy(
+                    update={"quantity": existing.quantity + (body.quantity if converted is None else converted)}
+                )
+            elif body.quantity:
+                merged[key] = existing.model_copy(update={"quantity": body.quantity})
+        else:
+            merged[key] = body
+    return merged
+
+
+def upsert_items(db: Session, items: Iterable[PantryItemCreate]) -> list[int]:
+    """Insert new pantry items and merge quantities into existing ones.
+
+    Set-based: one ``IN`` lookup over the normalized names, one batched
+    INSERT ... RETURNING and one executemany UPDATE. The caller commits.
+    Returns one pantry item id per merged name, in input order.
+    """
+    merged = merge_items(items)
+    keys = list(merged)
+    existing: dict = {}
+    for i in range(0, len(keys), _IN_CHUNK):
+        rows = db.execute(
+            select(
+                PantryItem.id, PantryItem.name, PantryItem.quantity,
+                PantryItem.unit, PantryItem.category, PantryItem.notes,
+            )
+            .where(PantryItem.name.in_(keys[i:i + _IN_CHUNK]))
+            .order_by(PantryItem.id)
+        )
+        for row in rows:
+            existing.setdefault(row.name, row)  # oldest wins on legacy duplicates
+
+    now = datetime.now(timezone.utc)
+    updates = []
+    inserts = []
+    for key, body in merged.items():
+        row = existing.get(key)
+        if row is None:
+            inserts.append(
+                {**body.model_dump(), "name": key, "created_at": now, "updated_at": now}
+            )
+            continue
+        # Merge: add quantities together, fill in missing details
+        converted = convert(body.quantity, body.unit, row.unit) if body.quantity and row.quantity else None
+        added = body.quantity if converted is None else converted
+        values = {
+            "quantity": (row.quantity or 0) + added if body.quantity else row.quantity,
+            # A converted amount is already in the row's unit
+            "unit": body.unit if body.unit and not row.unit and converted is None else row.unit,
+            "category": body.category if body.category and not row.category else row.category,
+            "notes": body.notes if body.notes and not row.notes else row.notes,
+        }
+        if any(values[col] != getattr(row, col) for col in values):
+            updates.append({"id": row.id, **values, "updated_at": now})
+
+    if updates:
+        db.execute(update(PantryItem), updates)
+    new_ids = {}
+    if inserts:
+        for row in db.execute(
+            insert(PantryItem).returning(PantryItem.id, PantryItem.name), inserts
+        ):
+            new_ids[row.name] = row.id
+    return [existing[key].id if key in existing else new_ids[key] for key in keys]
+
+
+def load_items(db: Session, ids: list[int]) -> list[PantryItem]:
+    """Fetch pantry items by id with one re-select, preserving ``ids`` order."""
+    by_id: dict[int, PantryItem] = {}
+    for i in range(0, len(ids), _IN_CHUNK):
+        rows = db.execute(
+            select(PantryItem).where(PantryItem.id.in_(ids[i:i + _IN_CHUNK]))
+        ).scalars()
+        by_id.update((item.id, item) for item in rows)
+    return [by_id[item_id] for item_id in ids]
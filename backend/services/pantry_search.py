@@ -0,0 +1,119 @@
+"""SQLite FTS5 trigram index over pantry item names and notes.
+
+``pantry_items_fts`` is an external-content FTS5 table kept in sync with
+``pantry_items`` by triggers, so substring searches use the trigram index
+instead of a ``LIKE '%term%'`` table scan. Builds of SQLite without FTS5 (or
+the trigram tokenizer) fall back to ``LIKE``.
+"""
+
+import logging
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, event, literal_column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Query, Session
+
+from ..models import PantryItem
+
+log = logging.getLogger(__name__)
+
+FTS_TABLE = "pantry_items_fts"
+# Trigram tokens need at least three characters
+MIN_QUERY_LENGTH = 3
+
+# Kept out of Base.metadata so create_all never tries to build it as a plain table
+fts_table = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", Text),
+    Column("notes", Text),
+)
+# Name hits rank well above notes hits
+_RANK = literal_column(f"bm25({FTS_TABLE}, 10.0, 1.0)")
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, notes, content='pantry_items', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON pantry_items BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, notes) VALUES (new.id, new.name, new.notes);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON pantry_items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, notes)
+        VALUES ('delete', old.id, old.name, old.notes);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, notes ON pantry_items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, notes)
+        VALUES ('delete', old.id, old.name, old.notes);
+        INSERT INTO {FTS_TABLE}(rowid, name, notes) VALUES (new.id, new.name, new.notes);
+    END""",
+]
+
+# Per-database availability, keyed by URL
+_available: dict[str, bool] = {}
+
+
+def _exists(conn: Connection) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first() is not None
+
+
+def install(conn: Connection) -> bool:
+    """Create the index and triggers if missing, backfilling existing rows.
+
+    Returns False when this SQLite build lacks FTS5/trigram support.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    if _exists(conn):
+        return True
+    try:
+        with conn.begin_nested():
+            for ddl in _DDL:
+                conn.execute(text(ddl))
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as exc:
+        log.warning("FTS5 trigram search unavailable, using LIKE: %s", exc)
+        return False
+    return True
+
+
+@event.listens_for(PantryItem.__table__, "after_create")
+def _after_create(target, connection, **kw):
+    install(connection)
+
+
+@event.listens_for(PantryItem.__table__, "before_drop")
+def _before_drop(target, connection, **kw):
+    # Triggers go with pantry_items; the virtual table has to be dropped itself
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def _fts_ready(db: Session) -> bool:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _available:
+        with bind.connect() as conn:
+            _available[key] = _exists(conn)
+    return _available[key]
+
+
+def apply_search(q: Query, db: Session, search: str, ranked: bool = True) -> Query:
+    """Filter a PantryItem query by ``search``.
+
+    With ``ranked``, results are ordered by bm25 when indexed (by name
+    otherwise); without it the caller supplies its own ordering.
+    """
+    term = search.strip()
+    if len(term) >= MIN_QUERY_LENGTH and _fts_ready(db):
+        phrase = '"' + term.replace('"', '""') + '"'
+        q = q.join(fts_table, fts_table.c.rowid == PantryItem.id).filter(
+            text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=phrase)
+        )
+        return q.order_by(_RANK, PantryItem.name) if ranked else q
+    escaped = search.replace("%", r"\%").replace("_", r"\_")
+    q = q.filter(PantryItem.name.ilike(f"%{escaped}%", escape="\\"))
+    return q.order_by(PantryItem.name) if ranked else q
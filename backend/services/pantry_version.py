@@ -0,0 +1,38 @@
+"""Durable pantry version counter, shared by every worker through the database.
+
+Write routes call ``bump`` inside their transaction; readers use the version
+as an ETag and as the staleness check for in-process caches, which costs one
+single-row lookup instead of a scan of ``pantry_items``.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..models import PantryMeta
+
+_ROW_ID = 1
+
+
+def current(db: Session) -> int:
+    return db.scalar(select(PantryMeta.version).where(PantryMeta.id == _ROW_ID)) or 0
+
+
+def bump(db: Session) -> int:
+    """Increment the version in the caller's transaction and return the new value."""
+    stmt = insert(PantryMeta).values(id=_ROW_ID, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PantryMeta.id], set_={"version": PantryMeta.version + 1}
+    )
+    return db.scalar(stmt.returning(PantryMeta.version))
+
+
+def etag(version: int) -> str:
+    return f'"pantry-{version}"'
+
+
+def etag_matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in candidates or tag in candidates
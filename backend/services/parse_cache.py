@@ -0,0 +1,243 @@
+"""Two-tier memoization of parsed ingredient lines.
+
+Tier one is an in-process LRU; tier two is the ``parsed_ingredient_cache``
+table in the app database, shared by every gunicorn worker and surviving
+restarts. Entries are tagged with the parser library version so an upgrade
+invalidates them.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from importlib import metadata
+
+from sqlalchemy import delete, literal_column, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ParsedIngredientCache
+from .ingredient_parser import ParsedIngredient, parse_ingredient, parser_pool
+from .metrics import timed
+
+log = logging.getLogger(__name__)
+
+# Bump when the shape of ParsedIngredient, its extraction logic or cache_key changes
+_CACHE_SCHEMA = 2
+# Stay well under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+# Persistent-tier eviction runs once per this many new rows
+_EVICT_EVERY = 256
+# A persistent hit refreshes last_used_at only once it is this old, so
+# repeat lookups stay read-only instead of taking the database write lock
+_TOUCH_AFTER = timedelta(minutes=10)
+_UPSERT_COLUMNS = ("parser_version", "name", "quantity", "unit", "comment", "last_used_at")
+
+
+def _parser_version() -> str:
+    if parse_ingredient is None:
+        return f"{_CACHE_SCHEMA}:fallback"
+    try:
+        return f"{_CACHE_SCHEMA}:{metadata.version('ingredient-parser-nlp')}"
+    except metadata.PackageNotFoundError:
+        return f"{_CACHE_SCHEMA}:unknown"
+
+
+# "T" is a tablespoon and "t" a teaspoon (see units.py), with or without
+# a quantity glued on: "1T", "2 t."
+_CASED_TOKEN = re.compile(r"[\d./]*[tT]\.?")
+
+
+def cache_key(raw: str) -> str:
+    """Normalize a raw line: collapse whitespace and ignore case, except in t/T units."""
+    return " ".join(
+        word if _CASED_TOKEN.fullmatch(word) else word.lower() for word in raw.split()
+    )
+
+
+@dataclass(frozen=True)
+class _Entry:
+    name: str
+    quantity: float | None
+    unit: str | None
+    comment: str | None
+
+    def to_parsed(self, raw: str) -> ParsedIngredient:
+        return ParsedIngredient(
+            raw=raw.strip(),
+            name=self.name,
+            quantity=self.quantity,
+            unit=self.unit,
+            comment=self.comment,
+        )
+
+
+class ParseCache:
+    def __init__(self, memory_entries: int, max_entries: int):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.version = _parser_version()
+        self._lru: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._inserts_since_evict = 0
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        # caller holds the lock
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def _load(self, db: Session, keys: list[str]) -> tuple[dict[str, _Entry], list[str]]:
+        """Persistent entries for ``keys``, and the found keys due a recency refresh."""
+        found: dict[str, _Entry] = {}
+        stale: list[str] = []
+        # SQLite hands DateTime back naive (in UTC)
+        touch_before = datetime.now(timezone.utc).replace(tzinfo=None) - _TOUCH_AFTER
+        for i in range(0, len(keys), _IN_CHUNK):
+            rows = db.execute(
+                select(ParsedIngredientCache).where(
+                    ParsedIngredientCache.key.in_(keys[i:i + _IN_CHUNK]),
+                    ParsedIngredientCache.parser_version == self.version,
+                )
+            ).scalars()
+            for row in rows:
+                found[row.key] = _Entry(row.name, row.quantity, row.unit, row.comment)
+                if row.last_used_at is None or row.last_used_at.replace(tzinfo=None) < touch_before:
+                    stale.append(row.key)
+        return found, stale
+
+    def _persist(self, db: Session, touched: list[str], parsed: dict[str, _Entry]) -> None:
+        """Refresh recency of stale hits and upsert new results, in one commit."""
+        if not touched and not parsed:
+            return
+        now = datetime.now(timezone.utc)
+        for i in range(0, len(touched), _IN_CHUNK):
+            db.execute(
+                update(ParsedIngredientCache)
+                .where(ParsedIngredientCache.key.in_(touched[i:i + _IN_CHUNK]))
+                .values(last_used_at=now)
+            )
+        if parsed:
+            stmt = insert(ParsedIngredientCache)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[ParsedIngredientCache.key],
+                    set_={col: stmt.excluded[col] for col in _UPSERT_COLUMNS},
+                ),
+                [
+                    {"key": key, "parser_version": self.version, "name": e.name,
+                     "quantity": e.quantity, "unit": e.unit, "comment": e.comment,
+                     "last_used_at": now}
+                    for key, e in parsed.items()
+                ],
+            )
+            # parse() runs concurrently on executor threads
+            with self._lock:
+                self._inserts_since_evict += len(parsed)
+                evict = self._inserts_since_evict >= _EVICT_EVERY
+                if evict:
+                    self._inserts_since_evict = 0
+            if evict:
+                self._evict(db)
+        db.commit()
+
+    def _evict(self, db: Session) -> None:
+        # Stale parser versions can never hit again
+        db.execute(
+            delete(ParsedIngredientCache).where(
+                ParsedIngredientCache.parser_version != self.version
+            )
+        )
+        # Exactly the rows past the newest max_entries. A batch shares one
+        # timestamp, so rowid breaks ties; the last_used_at index already
+        # ends in rowid, so this is still one walk of the index.
+        rowid = literal_column("rowid")
+        excess = (
+            select(rowid)
+            .select_from(ParsedIngredientCache)
+            .order_by(ParsedIngredientCache.last_used_at.desc(), rowid.desc())
+            .offset(self.max_entries)
+        )
+        db.execute(delete(ParsedIngredientCache).where(rowid.in_(excess)))
+
+    def parse(self, db: Session, ingredients: list[str]) -> list[ParsedIngredient]:
+        """Parse ingredient lines, running the CRF model only on cache misses."""
+        keys = [cache_key(raw) for raw in ingredients]
+        unique: dict[str, str] = {}  # key -> first raw line seen for it
+        for key, raw in zip(keys, ingredients):
+            unique.setdefault(key, raw)
+
+        entries: dict[str, _Entry] = {}
+        with self._lock:
+            for key in unique:
+                entry = self._lru.get(key)
+                if entry is not None:
+                    self._lru.move_to_end(key)
+                    entries[key] = entry
+            self.memory_hits += len(entries)
+
+        missing = [key for key in unique if key not in entries]
+        if missing:
+            try:
+                loaded, stale = self._load(db, missing)
+            except SQLAlchemyError as exc:
+                log.warning("Parse cache lookup failed: %s", exc)
+                db.rollback()
+                loaded, stale = {}, []
+            to_parse = [key for key in missing if key not in loaded]
+            results = []
+            if to_parse:
+                with timed("parser"):
+                    results = parser_pool.parse([unique[key] for key in to_parse])
+            parsed = {
+                key: _Entry(p.name, p.quantity, p.unit, p.comment)
+                for key, p in zip(to_parse, results)
+            }
+            try:
+                self._persist(db, stale, parsed)
+            except SQLAlchemyError as exc:
+                # The persistent tier is an optimization; never fail the request on it
+                log.warning("Parse cache write failed: %s", exc)
+                db.rollback()
+
+            with self._lock:
+                self.persistent_hits += len(loaded)
+                self.misses += len(parsed)
+                for key, entry in {**loaded, **parsed}.items():
+                    self._remember(key, entry)
+            entries.update(loaded)
+            entries.update(parsed)
+
+        return [entries[key].to_parsed(raw) for key, raw in zip(keys, ingredients)]
+
+    def stats(self, db: Session) -> dict:
+        with self._lock:
+            memory_size = len(self._lru)
+            counters = {
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+            }
+        lookups = sum(counters.values())
+        return {
+            **counters,
+            "hit_rate": (lookups - counters["misses"]) / lookups if lookups else 0.0,
+            "memory_entries": memory_size,
+            "persistent_entries": db.query(ParsedIngredientCache).count(),
+            "parser_version": self.version,
+        }
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+
+parse_cache = ParseCache(settings.parse_cache_memory_entries, settings.parse_cache_max_entries)
@@ -0,0 +1,256 @@
+"""Per-client token-bucket rate limits by route class.
+
+Every ``/api/`` request is classified as ``read``, ``write``, ``compute``
+(recipe parse/diff) or ``upload`` (photo uploads). It takes one token from
+the bucket for its (class, client IP). A bucket holds up to ``burst`` tokens
+and refills continuously at the class's sustained rate. Each check touches
+only that one bucket, in O(1).
+
+``MemoryBuckets`` keeps buckets in an OrderedDict per worker and evicts the
+least recently used key when full. ``SqliteBuckets`` keeps them in a small
+SQLite file that every gunicorn worker on the host opens, so the limit is
+per client rather than per client per worker. Each check is a single
+atomic UPSERT ... RETURNING. Checks run on the event loop, so they never wait
+on another worker's write lock (``busy_timeout=0``). If the file is busy or
+unusable, the check falls back to the worker's in-memory buckets rather
+than stalling or failing the request.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..config import settings
+
+log = logging.getLogger(__name__)
+
+# SQLite buckets: prune idle and over-cap rows once per this many checks
+_PRUNE_EVERY = 1024
+# Lock wait for the once-per-thread schema setup; checks themselves don't wait
+_SETUP_BUSY_TIMEOUT_MS = 50
+
+_TAKE_SQL = """
+INSERT INTO rate_limit_buckets (key, tokens, updated, allowed)
+VALUES (:key, :burst - :cost, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    allowed = min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost,
+    tokens = min(:burst, tokens + max(0, :now - updated) * :rate)
+        - CASE WHEN min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost
+          THEN :cost ELSE 0 END,
+    updated = :now
+RETURNING tokens, allowed
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # tokens per second
+    burst: int
+
+    @classmethod
+    def per_minute(cls, requests: int, burst: int) -> "Limit":
+        return cls(rate=requests / 60, burst=max(1, burst))
+
+    @property
+    def full_after(self) -> float:
+        """Seconds an untouched bucket takes to refill from empty."""
+        return self.burst / self.rate
+
+
+class MemoryBuckets:
+    """Buckets for this worker only. Called from the event loop thread."""
+
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max(1, max_keys)
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.evicted = 0
+
+    def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; 0.0 if allowed, else seconds until they'd be available."""
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(limit.burst)
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            self._buckets.move_to_end(key)
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (cost - tokens) / limit.rate
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SqliteBuckets:
+    """Buckets shared by every process that opens ``path``."""
+
+    def __init__(
+        self,
+        path: str,
+        max_keys: int,
+        idle_seconds: float,
+        clock: Callable[[], float] = time.time,
+        busy_timeout_ms: int = 0,
+    ):
+        self.path = path
+        self.max_keys = max(1, max_keys)
+        self.idle_seconds = idle_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self._clock = clock  # wall clock: monotonic time isn't comparable across processes
+        self._local = threading.local()
+        self._checks = 0
+        self.fallbacks = 0
+        self.busy = 0  # fallbacks because another process held the write lock
+        self.fallback = MemoryBuckets(max_keys)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={_SETUP_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode=wal")
+        # Losing bucket state in a crash only forgives some requests
+        conn.execute("PRAGMA synchronous=off")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, allowed INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_updated "
+            "ON rate_limit_buckets (updated)"
+        )
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; 0.0 if allowed, else seconds until they'd be available."""
+        now = self._clock()
+        try:
+            conn = self._connect()
+            tokens, allowed = conn.execute(
+                _TAKE_SQL,
+                {"key": key, "burst": limit.burst, "cost": cost, "now": now, "rate": limit.rate},
+            ).fetchone()
+            self._checks += 1
+            if self._checks % _PRUNE_EVERY == 0:
+                self.prune(conn, now)
+        except sqlite3.Error as exc:
+            self.fallbacks += 1
+            if _is_busy(exc):
+                # Expected under write contention between workers; not worth a log line
+                self.busy += 1
+            else:
+                log.warning("Shared rate limit store unavailable (%s); using this worker's buckets", exc)
+            return self.fallback.take(key, limit, cost)
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def prune(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop buckets idle long enough to be full again, then the oldest over the cap."""
+        conn.execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.idle_seconds,))
+        conn.execute(
+            "DELETE FROM rate_limit_buckets WHERE key IN ("
+            "SELECT key FROM rate_limit_buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    def reset(self) -> None:
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+        self.fallback.reset()
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT count(*) FROM rate_limit_buckets").fetchone()[0]
+
+
+def _is_busy(exc: sqlite3.Error) -> bool:
+    code = getattr(exc, "sqlite_errorcode", None)  # Python 3.11+
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(exc)
+
+
+def classify(method: str, path: str) -> str | None:
+    """Route class of an API request, or None if it isn't rate limited."""
+    if not path.startswith("/api/") or path == "/api/health":
+        return None
+    if path.startswith("/api/photos/upload"):
+        return "upload"
+    if method == "POST" and path.startswith(("/api/recipes/diff", "/api/recipes/parse")):
+        return "compute"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, Limit], store: MemoryBuckets | SqliteBuckets):
+        self.limits = limits
+        self.store = store
+
+    def check(self, method: str, path: str, client: str) -> float:
+        """0.0 if the request may proceed, else seconds the client should wait."""
+        route_class = classify(method, path)
+        limit = self.limits.get(route_class) if route_class else None
+        if limit is None:
+            return 0.0
+        return self.store.take(f"{route_class}:{client}", limit)
+
+    def reset(self) -> None:
+        self.store.reset()
+
+
+def _default_sqlite_path() -> str:
+    # Local temp dir, not the data volume: the state is disposable and
+    # every check writes
+    return str(Path(tempfile.gettempdir()) / f"pantry-ratelimit-{settings.instance_tag}.db")
+
+
+def _limits() -> dict[str, Limit]:
+    configured = {
+        "read": (settings.rate_limit_read_per_minute, settings.rate_limit_read_burst),
+        "write": (settings.rate_limit_write_per_minute, settings.rate_limit_write_burst),
+        "compute": (settings.rate_limit_compute_per_minute, settings.rate_limit_compute_burst),
+        "upload": (settings.rate_limit_upload_per_minute, settings.rate_limit_upload_burst),
+    }
+    return {
+        name: Limit.per_minute(per_minute, burst)
+        for name, (per_minute, burst) in configured.items()
+        if per_minute > 0
+    }
+
+
+def _build() -> RateLimiter:
+    limits = _limits()
+    if settings.rate_limit_backend == "sqlite":
+        idle = max((limit.full_after for limit in limits.values()), default=0.0)
+        store = SqliteBuckets(
+            settings.rate_limit_sqlite_path or _default_sqlite_path(),
+            settings.rate_limit_max_keys,
+            idle,
+        )
+    else:
+        store = MemoryBuckets(settings.rate_limit_max_keys)
+    return RateLimiter(limits, store)
+
+
+rate_limiter = _build()
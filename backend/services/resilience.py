@@ -0,0 +1,268 @@
+"""Deadlines, retries, circuit breaking and hedging for upstream API calls.
+
+``ResilientCaller.call`` runs an async call factory under an overall
+deadline. Each attempt is also capped at ``attempt_timeout``, so one hung
+request can't use up the deadline its retries need. Retryable failures
+(429, 5xx, transport errors, attempt timeouts) are retried with full-jitter
+exponential backoff while the deadline allows. A circuit breaker fails fast with CircuitOpen after
+repeated failures, then lets a single trial call through once the reset
+period has passed. Optionally, a second identical request is started when
+the first is slower than ``hedge_after`` seconds, and whichever finishes
+first wins.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LATENCY_SAMPLES = 1000  # recent call latencies kept for stats
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised without calling upstream while the breaker is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient upstream failures: timeouts, transport errors, 408/429/5xx."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    try:
+        import httpx
+
+        if isinstance(exc, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    code = getattr(exc, "code", None)  # google.genai.errors.APIError
+    return isinstance(code, int) and code in _RETRYABLE_STATUS
+
+
+class CircuitBreaker:
+    """Closed → open after ``failure_threshold`` straight failures → half-open
+    after ``reset_seconds``, admitting one trial call."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half-open" and self._trial_in_flight):
+                raise CircuitOpen("upstream circuit is open")
+            if state == "half-open":
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    log.warning("Circuit opened after %d failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """End a half-open trial that neither succeeded nor failed upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        max_retries: int,
+        retry_base: float,
+        breaker: CircuitBreaker,
+        hedge_after: float = 0.0,
+        attempt_timeout: float = 0.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_base = retry_base
+        self.breaker = breaker
+        self.hedge_after = hedge_after
+        self.attempt_timeout = attempt_timeout  # 0: an attempt may use the whole deadline
+        self.retryable = retryable
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._counters = dict.fromkeys(
+            ("calls", "failures", "retries", "timeouts", "short_circuited", "hedged", "hedge_wins"), 0
+        )
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+    async def _hedged(self, factory: Callable[[], Awaitable[T]]) -> T:
+        tasks = [asyncio.ensure_future(factory())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self._count("hedged")
+                tasks.append(asyncio.ensure_future(factory()))
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempts(self, factory: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if self.attempt_timeout > 0:
+                remaining = min(self.attempt_timeout, remaining)
+            try:
+                call = self._hedged(factory) if hedge and self.hedge_after > 0 else factory()
+                return await asyncio.wait_for(call, remaining)
+            except Exception as exc:
+                if isinstance(exc, asyncio.TimeoutError):
+                    self._count("timeouts")
+                if not self.retryable(exc) or attempt >= self.max_retries:
+                    raise
+                # Full jitter, never sleeping past the deadline
+                delay = random.uniform(0, self.retry_base * 2 ** attempt)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self._count("retries")
+                log.info("%s call failed (%s); retry %d in %.0f ms", self.name, exc, attempt, delay * 1000)
+                await asyncio.sleep(delay)
+
+    async def call(self, factory: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """Await ``factory()`` with deadline, retries, breaker and hedging.
+
+        ``factory`` must start a fresh request each time it is called.
+        Raises CircuitOpen while the breaker is open; otherwise the last
+        error once retries or the deadline run out.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpen:
+            self._count("short_circuited")
+            raise
+        self._count("calls")
+        start = time.perf_counter()
+        try:
+            result = await self._attempts(factory, hedge)
+        except asyncio.CancelledError:
+            self.breaker.release_trial()
+            raise
+        except Exception as exc:
+            self._count("failures")
+            if self.retryable(exc):
+                self.breaker.record_failure()
+            else:
+                # The upstream answered; a bad request says nothing about its health
+                self.breaker.record_success()
+            raise
+        finally:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start)
+        self.breaker.record_success()
+        return result
+
+    async def stream(self, factory: Callable[[], Awaitable[AsyncIterator[T]]]) -> AsyncIterator[T]:
+        """Open a stream through ``call`` and iterate it within the same deadline.
+
+        Opening the stream and receiving its first chunk (where HTTP errors
+        surface) are retried like any call. Later failures are not retried,
+        since earlier chunks may already have been consumed.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        async def open_stream() -> tuple[AsyncIterator[T], list[T]]:
+            iterator = await factory()
+            try:
+                return iterator, [await anext(iterator)]
+            except StopAsyncIteration:
+                return iterator, []
+            except BaseException:
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+                raise
+
+        iterator, head = await self.call(open_stream, hedge=False)
+        try:
+            for chunk in head:
+                yield chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(iterator), deadline - time.monotonic())
+                except StopAsyncIteration:
+                    return
+                except Exception as exc:
+                    if isinstance(exc, asyncio.TimeoutError):
+                        self._count("timeouts")
+                    if self.retryable(exc):
+                        self.breaker.record_failure()
+                    raise
+                yield chunk
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+
+        def pct(p: float) -> float:
+            return 1000 * latencies[int(p * (len(latencies) - 1))] if latencies else 0.0
+
+        return {
+            **counters,
+            "breaker": self.breaker.state,
+            "latency_ms_avg": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_ms_p50": pct(0.5),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_max": 1000 * latencies[-1] if latencies else 0.0,
+        }
@@ -0,0 +1,174 @@
+"""Set-based shopping list writes: bulk add, toggle, clear, move to pantry.
+
+Rows are unique on (normalized name, unit) through the
+``uq_shopping_list_name_unit`` expression index. Units are stored as their
+canonical ``units`` key, so "cups" and "cup" share a row, and plain counts
+are stored without a unit. A bulk add is therefore one
+INSERT ... ON CONFLICT DO UPDATE per chunk. Quantities are summed into an
+unpurchased row, and a row that was already bought is reset to the new
+quantity. Toggles and clears are single UPDATE/DELETE statements. The
+caller commits.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+from sqlalchemy import case, delete, func, literal_column, select, text, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import ShoppingListItem
+from ..schemas import PantryItemCreate, ShoppingListItemCreate
+from .pantry_merge import normalize_name, upsert_items
+from .shopping import whole_foods_url
+from .units import resolve
+
+# 5 bound parameters per row; stay well under SQLite's limit
+_CHUNK = 500
+_UNIQUE_KEY = [ShoppingListItem.name, func.coalesce(ShoppingListItem.unit, literal_column("''"))]
+
+
+def normalize_unit(unit: str | None) -> str | None:
+    key = resolve(unit).key
+    return None if key == "each" else key
+
+
+def merge_entries(items: Iterable[ShoppingListItemCreate]) -> dict[tuple[str, str | None], dict]:
+    """Deduplicate by normalized name and unit, summing known quantities."""
+    merged: dict[tuple[str, str | None], dict] = {}
+    for body in items:
+        name = normalize_name(body.name)
+        if not name:
+            continue
+        key = (name, normalize_unit(body.unit))
+        row = merged.get(key)
+        if row is None:
+            merged[key] = {
+                "name": name,
+                "unit": key[1],
+                "quantity": body.quantity,
+                "source_recipe": body.source_recipe,
+                "whole_foods_url": body.whole_foods_url or whole_foods_url(name),
+            }
+        elif body.quantity is not None:
+            row["quantity"] = (row["quantity"] or 0) + body.quantity
+    return merged
+
+
+def add_items(db: Session, items: Iterable[ShoppingListItemCreate]) -> list[int]:
+    """Upsert items into the list; returns one row id per merged entry, in order."""
+    rows = list(merge_entries(items).values())
+    now = datetime.now(timezone.utc)
+    ids: list[int] = []
+    for i in range(0, len(rows), _CHUNK):
+        stmt = insert(ShoppingListItem).values(
+            [{**row, "purchased": 0, "created_at": now} for row in rows[i:i + _CHUNK]]
+        )
+        bought = ShoppingListItem.purchased != 0
+        summed = case(
+            (stmt.excluded.quantity.is_(None), ShoppingListItem.quantity),
+            else_=func.coalesce(ShoppingListItem.quantity, 0) + stmt.excluded.quantity,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_UNIQUE_KEY,
+            set_={
+                "quantity": case((bought, stmt.excluded.quantity), else_=summed),
+                "purchased": 0,
+                # A bought item added again goes back to the top of the list
+                "created_at": case((bought, stmt.excluded.created_at), else_=ShoppingListItem.created_at),
+                "source_recipe": func.coalesce(ShoppingListItem.source_recipe, stmt.excluded.source_recipe),
+                "whole_foods_url": func.coalesce(ShoppingListItem.whole_foods_url, stmt.excluded.whole_foods_url),
+            },
+        )
+        by_key = {
+            (row.name, row.unit): row.id
+            for row in db.execute(
+                stmt.returning(ShoppingListItem.id, ShoppingListItem.name, ShoppingListItem.unit)
+            )
+        }
+        ids.extend(by_key[(row["name"], row["unit"])] for row in rows[i:i + _CHUNK])
+    return ids
+
+
+def set_purchased(db: Session, ids: list[int], purchased: bool) -> int:
+    """Mark the given rows bought or not; returns the number of rows changed."""
+    changed = 0
+    for i in range(0, len(ids), _CHUNK):
+        result = db.execute(
+            update(ShoppingListItem)
+            .where(ShoppingListItem.id.in_(ids[i:i + _CHUNK]))
+            .values(purchased=int(purchased))
+        )
+        changed += result.rowcount
+    return changed
+
+
+def clear(db: Session, purchased: bool | None = None) -> int:
+    """Delete purchased, unpurchased or (None) all rows; returns the count."""
+    stmt = delete(ShoppingListItem)
+    if purchased is not None:
+        stmt = stmt.where(ShoppingListItem.purchased == int(purchased))
+    return db.execute(stmt).rowcount
+
+
+def move_to_pantry(db: Session, ids: list[int] | None = None) -> tuple[int, list[int]]:
+    """Merge bought rows (all, or those among ``ids``) into the pantry and drop them.
+
+    One select, the set-based pantry upsert and one delete, all in the
+    caller's transaction. Returns the number of list rows moved and the
+    affected pantry item ids.
+    """
+    query = (
+        select(ShoppingListItem.id, ShoppingListItem.name, ShoppingListItem.quantity, ShoppingListItem.unit)
+        .where(ShoppingListItem.purchased != 0)
+    )
+    rows = []
+    for i in range(0, len(ids), _CHUNK) if ids is not None else [None]:
+        chunk = query if i is None else query.where(ShoppingListItem.id.in_(ids[i:i + _CHUNK]))
+        rows.extend(db.execute(chunk))
+    if not rows:
+        return 0, []
+    pantry_ids = upsert_items(
+        db, (PantryItemCreate(name=row.name, quantity=row.quantity, unit=row.unit) for row in rows)
+    )
+    moved = [row.id for row in rows]
+    for i in range(0, len(moved), _CHUNK):
+        db.execute(delete(ShoppingListItem).where(ShoppingListItem.id.in_(moved[i:i + _CHUNK])))
+    return len(moved), pantry_ids
+
+
+def install(conn: Connection) -> None:
+    """Add the shopping list indexes to databases created before them.
+
+    Names and units are normalized the way new rows are, then duplicate
+    (name, unit) rows left from before the unique index are collapsed into
+    their oldest row, summing quantities.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    names = {row[1] for row in conn.execute(text("PRAGMA index_list(shopping_list_items)"))}
+    if "uq_shopping_list_name_unit" not in names:
+        conn.execute(text("UPDATE shopping_list_items SET name = lower(trim(name))"))
+        for (unit,) in conn.execute(text("SELECT DISTINCT unit FROM shopping_list_items")).all():
+            if normalize_unit(unit) != unit:
+                conn.execute(
+                    text("UPDATE shopping_list_items SET unit = :new WHERE unit IS :old"),
+                    {"new": normalize_unit(unit), "old": unit},
+                )
+        conn.execute(text(
+            "UPDATE shopping_list_items AS keep SET quantity = ("
+            "  SELECT sum(dup.quantity) FROM shopping_list_items AS dup"
+            "  WHERE dup.name = keep.name AND coalesce(dup.unit, '') = coalesce(keep.unit, '')"
+            ") WHERE id IN ("
+            "  SELECT min(id) FROM shopping_list_items"
+            "  GROUP BY name, coalesce(unit, '') HAVING count(*) > 1)"
+        ))
+        conn.execute(text(
+            "DELETE FROM shopping_list_items WHERE id NOT IN ("
+            "  SELECT min(id) FROM shopping_list_items GROUP BY name, coalesce(unit, ''))"
+        ))
+    # checkfirst can't see expression indexes, so compare names instead
+    for index in ShoppingListItem.__table__.indexes:
+        if index.name not in names:
+            index.create(conn)
@@ -0,0 +1,145 @@
+"""Unit normalization and pantry coverage for recipe quantities.
+
+Units resolve to a canonical key, a dimension (volume, mass, count) and a
+factor to that dimension's base unit (ml, g, each). The tables are expanded
+once at import, aliases and plurals included, with interned keys. Lookups of
+the raw strings the parser produces are memoized, so a diff line pays for
+one cached call and a multiply.
+
+Units outside the tables ("can", "clove", "bunch") are their own dimension.
+They compare with the same unit and nothing else. Volume and mass never
+convert into each other, since that would need a density per ingredient.
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple
+
+VOLUME = "volume"
+MASS = "mass"
+COUNT = "count"
+
+# canonical key -> (dimension, factor to base unit, aliases); US customary volumes
+_UNITS: dict[str, tuple[str, float, tuple[str, ...]]] = {
+    "ml": (VOLUME, 1.0, ("milliliter", "millilitre", "mL", "cc")),
+    "l": (VOLUME, 1000.0, ("liter", "litre")),
+    "tsp": (VOLUME, 4.92892159375, ("teaspoon", "t")),
+    "tbsp": (VOLUME, 14.78676478125, ("tablespoon", "tbs", "tbl", "T")),
+    "fl oz": (VOLUME, 29.5735295625, ("fluid ounce", "fl. oz", "floz")),
+    "cup": (VOLUME, 236.5882365, ("c",)),
+    "pint": (VOLUME, 473.176473, ("pt",)),
+    "quart": (VOLUME, 946.352946, ("qt",)),
+    "gallon": (VOLUME, 3785.411784, ("gal",)),
+    "mg": (MASS, 0.001, ("milligram",)),
+    "g": (MASS, 1.0, ("gram", "gr")),
+    "kg": (MASS, 1000.0, ("kilogram", "kilo")),
+    "oz": (MASS, 28.349523125, ("ounce",)),
+    "lb": (MASS, 453.59237, ("pound", "lbs")),
+    "each": (COUNT, 1.0, ("", "ea", "piece", "pc", "whole", "item", "unit", "count")),
+    "dozen": (COUNT, 12.0, ("doz",)),
+}
+
+# Full coverage tolerates rounding in the conversion factors
+_EPSILON = 1e-6
+
+
+class Unit(NamedTuple):
+    key: str
+    dimension: str
+    factor: float
+
+
+def _plurals(word: str) -> tuple[str, ...]:
+    return (word + "s", word + "es") if len(word) > 2 else ()
+
+
+def _build_table() -> dict[str, Unit]:
+    table: dict[str, Unit] = {}
+    for key, (dimension, factor, aliases) in _UNITS.items():
+        unit = Unit(sys.intern(key), sys.intern(dimension), factor)
+        for alias in (key, *aliases):
+            # Case only matters for the single-letter spoons ("t" vs "T")
+            names = (alias,) if len(alias) == 1 else (alias.lower(), *_plurals(alias.lower()))
+            for name in names:
+                table.setdefault(sys.intern(name), unit)
+    return table
+
+
+_TABLE = _build_table()
+_CLEAN = re.compile(r"[\s_]+")
+_ES_PLURAL = re.compile(r"(?:ch|sh|ss|x)es$")
+
+
+def _singular(word: str) -> str:
+    if _ES_PLURAL.search(word):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=4096)
+def resolve(unit: str | None) -> Unit:
+    """Canonical unit for a raw unit string; no unit means a count."""
+    raw = _CLEAN.sub(" ", (unit or "").strip()).rstrip(".")
+    found = _TABLE.get(raw) if len(raw) == 1 else None
+    if found is None:
+        lowered = raw.lower()
+        found = _TABLE.get(lowered)
+        if found is None:
+            key = sys.intern(_singular(lowered))
+            found = _TABLE.get(key) or Unit(key, key, 1.0)
+    return found
+
+
+def to_base(quantity: float, unit: str | None) -> tuple[float, Unit]:
+    resolved = resolve(unit)
+    return quantity * resolved.factor, resolved
+
+
+def convert(quantity: float, unit: str | None, to_unit: str | None) -> float | None:
+    """``quantity unit`` expressed in ``to_unit``; None across dimensions."""
+    source, target = resolve(unit), resolve(to_unit)
+    if source.dimension != target.dimension:
+        return None
+    return quantity if source is target else quantity * source.factor / target.factor
+
+
+@dataclass(frozen=True)
+class Coverage:
+    status: str  # "full", "partial" or "none"
+    shortfall: float | None = None  # still to buy, in the requested unit
+
+
+FULL = Coverage("full")
+
+
+def coverage(
+    in_pantry: bool,
+    quantity: float | None,
+    unit: str | None,
+    stock_quantity: float | None,
+    stock_unit: str | None,
+) -> Coverage:
+    """How much of ``quantity unit`` the matched pantry stock covers.
+
+    Without a known amount on either side, or with units that don't convert,
+    a name match counts as full coverage, as it did before quantities were
+    compared.
+    """
+    if not in_pantry:
+        return Coverage("none", quantity)
+    if quantity is None or stock_quantity is None:
+        return FULL
+    need = resolve(unit)
+    have = resolve(stock_unit)
+    if need.dimension != have.dimension:
+        return FULL
+    missing = quantity * need.factor - stock_quantity * have.factor
+    if missing <= _EPSILON * max(quantity * need.factor, 1.0):
+        return FULL
+    if stock_quantity <= 0:
+        return Coverage("none", quantity)
+    return Coverage("partial", missing / need.factor)
@@ -0,0 +1,133 @@
+"""Per-worker budget on the bytes of uploads being preprocessed at once.
+
+Each photo upload reserves its size before its body is spooled to a temp
+file and releases it once the image pool has decoded and shrunk it. Uploads that don't fit wait in
+FIFO order for up to ``wait_seconds``, then are rejected with
+BudgetExceeded, so a burst of large photos queues instead of spiking RSS.
+A single upload larger than the whole budget is admitted on its own.
+"""
+
+import asyncio
+import resource
+import sys
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+from ..config import settings
+
+
+class BudgetExceeded(Exception):
+    """Raised when an upload can't be admitted within the wait time."""
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ByteBudget:
+    def __init__(self, limit: int, wait_seconds: float):
+        self.limit = max(1, limit)
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak = 0
+        self._waiters: deque[tuple[int, asyncio.Future, asyncio.AbstractEventLoop]] = deque()
+        self._admitted = 0
+        self._queued = 0  # admissions that had to wait
+        self._rejected = 0
+
+    def _grant(self, nbytes: int) -> None:
+        # caller holds the lock
+        self._in_flight += nbytes
+        self._peak = max(self._peak, self._in_flight)
+        self._admitted += 1
+
+    async def acquire(self, nbytes: int) -> int:
+        """Reserve ``nbytes``; returns the amount to pass to ``release``."""
+        nbytes = min(max(0, nbytes), self.limit)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight + nbytes <= self.limit:
+                self._grant(nbytes)
+                return nbytes
+            if self.wait_seconds <= 0:
+                self._rejected += 1
+                raise BudgetExceeded("upload memory budget exhausted")
+            waiter = (nbytes, loop.create_future(), loop)
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.wait_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._rejected += 1
+                    self._drain()
+                    raise BudgetExceeded("upload memory budget exhausted") from None
+            # Otherwise it was granted just as the wait ended
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+                    self._drain()
+            if granted:
+                self.release(nbytes)
+            raise
+        with self._lock:
+            self._queued += 1
+        return nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self._in_flight -= nbytes
+            self._drain()
+
+    def _drain(self) -> None:
+        # caller holds the lock; runs on release and whenever a waiter leaves,
+        # since a departed head may have been all that blocked the next one.
+        # FIFO: a large waiter at the head blocks smaller ones behind it
+        while self._waiters and self._in_flight + self._waiters[0][0] <= self.limit:
+            size, future, loop = self._waiters.popleft()
+            self._grant(size)
+            loop.call_soon_threadsafe(_resolve, future)
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        reserved = await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(reserved)
+
+    def stats(self) -> dict:
+        with self._lock:
+            budget = {
+                "limit_bytes": self.limit,
+                "in_flight_bytes": self._in_flight,
+                "peak_in_flight_bytes": self._peak,
+                "waiting": len(self._waiters),
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "rejected": self._rejected,
+            }
+        return {**budget, "rss_bytes": _rss_bytes(), "peak_rss_bytes": _peak_rss_bytes()}
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+upload_budget = ByteBudget(settings.upload_budget_bytes, settings.upload_budget_wait_seconds)
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import json
 import logging
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING
 
 from ..config import settings
 from ..schemas import PantryItemCreate
+from .metrics import timed
+from .resilience import CircuitBreaker, CircuitOpen, ResilientCaller
 
 if TYPE_CHECKING:
     from google.genai import Client
@@ -42,6 +46,22 @@ class VisionAnalysisError(Exception):
     """Raised when the Gemini Vision API call fails."""
 
 
+class VisionUnavailable(VisionAnalysisError):
+    """Raised without calling Gemini while its circuit breaker is open."""
+
+
+# Every Gemini call goes through this: deadline, retries, breaker, hedging
+gemini_calls = ResilientCaller(
+    "gemini",
+    timeout=settings.gemini_timeout_seconds,
+    max_retries=settings.gemini_max_retries,
+    retry_base=settings.gemini_retry_base_ms / 1000,
+    breaker=CircuitBreaker(settings.gemini_breaker_failures, settings.gemini_breaker_reset_seconds),
+    hedge_after=settings.gemini_hedge_after_ms / 1000,
+    attempt_timeout=settings.gemini_attempt_timeout_seconds,
+)
+
+
 _client: Client | None = None
 _client_initialized = False
 
@@ -58,9 +78,25 @@ def _get_client() -> Client | None:
         return None
 
     try:
+        import httpx
         from google import genai
-
-        _client = genai.Client(api_key=settings.gemini_api_key)
+        from google.genai import types
+
+        _client = genai.Client(
+            api_key=settings.gemini_api_key,
+            http_options=types.HttpOptions(
+                base_url=settings.gemini_base_url or None,
+                # Backstop only (milliseconds); gemini_calls enforces the real deadline
+                timeout=int(settings.gemini_timeout_seconds * 1000),
+                # One pooled connection set, shared by every request in this worker
+                async_client_args={
+                    "limits": httpx.Limits(
+                        max_connections=settings.gemini_max_connections,
+                        max_keepalive_connections=settings.gemini_max_connections,
+                    ),
+                },
+            ),
+        )
         log.info("Gemini client initialized (model=%s)", settings.gemini_model)
         return _client
     except ImportError:
@@ -68,6 +104,26 @@ def _get_client() -> Client | None:
         return None
 
 
+def _request(image_bytes: bytes, mime_type: str) -> dict:
+    from google.genai import types
+
+    return {
+        "model": settings.gemini_model,
+        "contents": [
+            types.Content(
+                parts=[
+                    types.Part.from_text(text=SYSTEM_PROMPT),
+                    types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+                ],
+            ),
+        ],
+        "config": types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=list[PantryItemCreate],
+        ),
+    }
+
+
 async def analyze_image(image_bytes: bytes, mime_type: str) -> list[PantryItemCreate] | None:
     """Analyze an image and return detected grocery items.
 
@@ -78,32 +134,110 @@ async def analyze_image(image_bytes: bytes, mime_type: str) -> list[PantryItemCr
     if client is None:
         return None
 
-    from google.genai import types
-
+    request = _request(image_bytes, mime_type)
     try:
-        response = await client.aio.models.generate_content(
-            model=settings.gemini_model,
-            contents=[
-                types.Content(
-                    parts=[
-                        types.Part.from_text(text=SYSTEM_PROMPT),
-                        types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
-                    ],
-                ),
-            ],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=list[PantryItemCreate],
-            ),
-        )
+        with timed("vision"):
+            response = await gemini_calls.call(lambda: client.aio.models.generate_content(**request))
+    except CircuitOpen as exc:
+        raise VisionUnavailable("Gemini is unavailable; failing fast") from exc
     except Exception as exc:
         raise VisionAnalysisError(f"Gemini API call failed: {exc}") from exc
 
-    import json
-
     try:
         raw = json.loads(response.text)
     except (json.JSONDecodeError, TypeError, AttributeError) as exc:
         raise VisionAnalysisError(f"Failed to parse Gemini response: {exc}") from exc
 
     return [PantryItemCreate.model_validate(item) for item in raw]
+
+
+class JsonArrayParser:
+    """Incremental parser yielding each element of a JSON array of objects.
+
+    ``feed`` takes text chunks as they arrive and returns the objects whose
+    closing brace has been seen, so callers can act on an item before the
+    rest of the array has been generated.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0  # next unscanned index into _text
+        self._start: int | None = None  # index of the open element's first brace
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._seen_array = False
+
+    def feed(self, chunk: str) -> list:
+        text = self._text + chunk
+        done = []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+                self._seen_array = True
+                if self._depth == 2:
+                    self._start = i
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._start is not None:
+                    done.append(json.loads(text[self._start:i + 1]))
+                    self._start = None
+        # Keep only the element still being generated
+        if self._start is None:
+            self._text, self._pos = "", 0
+        else:
+            self._text, self._pos = text[self._start:], len(text) - self._start
+            self._start = 0
+        return done
+
+    def close(self) -> None:
+        """Raise ValueError if the array was empty or truncated."""
+        if not self._seen_array or self._depth != 0 or self._in_string:
+            raise ValueError("incomplete JSON array")
+
+
+def stream_image(image_bytes: bytes, mime_type: str) -> AsyncIterator[PantryItemCreate] | None:
+    """Stream detected grocery items as the model generates them.
+
+    Returns None if the Gemini client is not configured; otherwise an async
+    iterator that raises VisionAnalysisError on API or parse failures.
+    """
+    client = _get_client()
+    if client is None:
+        return None
+    return _stream_items(client, image_bytes, mime_type)
+
+
+async def _stream_items(client: Client, image_bytes: bytes, mime_type: str) -> AsyncIterator[PantryItemCreate]:
+    parser = JsonArrayParser()
+    request = _request(image_bytes, mime_type)
+    try:
+        stream = gemini_calls.stream(lambda: client.aio.models.generate_content_stream(**request))
+        while True:
+            # Only time waiting on Gemini, not the consumer between items
+            with timed("vision"):
+                chunk = await anext(stream, None)
+            if chunk is None:
+                break
+            for raw in parser.feed(chunk.text or ""):
+                yield PantryItemCreate.model_validate(raw)
+        parser.close()
+    except VisionAnalysisError:
+        raise
+    except CircuitOpen as exc:
+        raise VisionUnavailable("Gemini is unavailable; failing fast") from exc
+    except (json.JSONDecodeError, ValueError) as exc:
+        # pydantic's ValidationError is a ValueError too
+        raise VisionAnalysisError(f"Failed to parse Gemini response: {exc}") from exc
+    except Exception as exc:
+        raise VisionAnalysisError(f"Gemini API call failed: {exc}") from exc
@@ -0,0 +1,201 @@
+"""Content-addressed cache of vision analysis results.
+
+Entries live in the ``vision_result_cache`` table, keyed by the SHA-256 of
+the preprocessed image bytes and tagged with a fingerprint of the Gemini
+model and system prompt, so changing either invalidates them. Each entry
+also records the digest of the upload as received, which lets an identical
+re-upload skip preprocessing entirely. An optional dHash lookup catches
+re-shot or re-encoded photos of the same receipt or shelf.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import VisionResultCache
+from ..schemas import PantryItemCreate
+from .vision import SYSTEM_PROMPT
+
+log = logging.getLogger(__name__)
+
+# Bump when the cached item shape changes
+_CACHE_SCHEMA = 1
+# Eviction runs once per this many new rows
+_EVICT_EVERY = 64
+_UPSERT_COLUMNS = ("source_key", "variant", "dhash", "items", "created_at", "last_used_at")
+_MASK64 = (1 << 64) - 1
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _variant(model: str) -> str:
+    fingerprint = f"{_CACHE_SCHEMA}\0{model}\0{SYSTEM_PROMPT}".encode()
+    return hashlib.sha256(fingerprint).hexdigest()[:16]
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class VisionCache:
+    def __init__(self, ttl_seconds: int, max_entries: int, dhash_distance: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self.dhash_distance = dhash_distance
+        self.variant = _variant(settings.gemini_model)
+        self._lock = threading.Lock()
+        self.source_hits = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._inserts_since_evict = 0
+
+    def _fresh(self):
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        return (VisionResultCache.variant == self.variant, VisionResultCache.created_at > cutoff)
+
+    def _hit(self, db: Session, row: VisionResultCache, counter: str) -> list[PantryItemCreate]:
+        db.execute(
+            update(VisionResultCache)
+            .where(VisionResultCache.key == row.key)
+            .values(last_used_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        return [PantryItemCreate.model_validate(item) for item in json.loads(row.items)]
+
+    def lookup_source(self, db: Session, source_key: str) -> list[PantryItemCreate] | None:
+        """Cached items for an upload seen before, byte for byte."""
+        try:
+            row = db.execute(
+                select(VisionResultCache)
+                .where(VisionResultCache.source_key == source_key, *self._fresh())
+                .limit(1)
+            ).scalar_one_or_none()
+            return self._hit(db, row, "source_hits") if row else None
+        except SQLAlchemyError as exc:
+            log.warning("Vision cache lookup failed: %s", exc)
+            db.rollback()
+            return None
+
+    def lookup(self, db: Session, key: str, dhash: int | None = None) -> list[PantryItemCreate] | None:
+        """Cached items for preprocessed bytes ``key``, or a near-duplicate of them."""
+        try:
+            row = db.execute(
+                select(VisionResultCache).where(VisionResultCache.key == key, *self._fresh())
+            ).scalar_one_or_none()
+            if row:
+                return self._hit(db, row, "exact_hits")
+            if dhash is not None and self.dhash_distance > 0:
+                row = self._nearest(db, dhash)
+                if row:
+                    return self._hit(db, row, "near_hits")
+        except SQLAlchemyError as exc:
+            log.warning("Vision cache lookup failed: %s", exc)
+            db.rollback()
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _nearest(self, db: Session, dhash: int) -> VisionResultCache | None:
+        # The table is capped at max_entries, so a scan of the hash column is cheap
+        best_key, best_distance = None, self.dhash_distance + 1
+        rows = db.execute(
+            select(VisionResultCache.key, VisionResultCache.dhash).where(
+                VisionResultCache.dhash.is_not(None), *self._fresh()
+            )
+        )
+        for key, other in rows:
+            distance = ((dhash ^ other) & _MASK64).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return db.get(VisionResultCache, best_key) if best_key else None
+
+    def store(
+        self,
+        db: Session,
+        key: str,
+        items: list[PantryItemCreate],
+        source_key: str | None = None,
+        dhash: int | None = None,
+    ) -> None:
+        """Record the validated items for preprocessed bytes ``key``."""
+        now = datetime.now(timezone.utc)
+        stmt = insert(VisionResultCache).values(
+            key=key,
+            source_key=source_key,
+            variant=self.variant,
+            dhash=_to_signed(dhash) if dhash is not None else None,
+            items=json.dumps([item.model_dump(mode="json") for item in items]),
+            created_at=now,
+            last_used_at=now,
+        )
+        try:
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[VisionResultCache.key],
+                    set_={col: stmt.excluded[col] for col in _UPSERT_COLUMNS},
+                )
+            )
+            self._inserts_since_evict += 1
+            if self._inserts_since_evict >= _EVICT_EVERY:
+                self.evict(db)
+                self._inserts_since_evict = 0
+            db.commit()
+        except SQLAlchemyError as exc:
+            # The cache is an optimization; never fail the upload on it
+            log.warning("Vision cache write failed: %s", exc)
+            db.rollback()
+
+    def evict(self, db: Session) -> None:
+        """Drop expired and other-variant rows, then the least recently used over the cap."""
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        db.execute(
+            delete(VisionResultCache).where(
+                (VisionResultCache.variant != self.variant)
+                | (VisionResultCache.created_at <= cutoff)
+            )
+        )
+        oldest_kept = (
+            select(VisionResultCache.last_used_at)
+            .order_by(VisionResultCache.last_used_at.desc())
+            .offset(self.max_entries)
+            .limit(1)
+            .scalar_subquery()
+        )
+        db.execute(delete(VisionResultCache).where(VisionResultCache.last_used_at <= oldest_kept))
+
+    def stats(self, db: Session) -> dict:
+        with self._lock:
+            counters = {
+                "source_hits": self.source_hits,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+            }
+        lookups = sum(counters.values())
+        return {
+            **counters,
+            "hit_rate": (lookups - counters["misses"]) / lookups if lookups else 0.0,
+            "entries": db.query(VisionResultCache).count(),
+            "variant": self.variant,
+        }
+
+
+vision_cache = VisionCache(
+    settings.vision_cache_ttl_seconds,
+    settings.vision_cache_max_entries,
+    settings.vision_cache_dhash_distance,
+)
@@ -0,0 +1,133 @@
+"""Process start-up: schema setup, warm-up and a timing report.
+
+None of this runs at import time. Under gunicorn, ``gunicorn.conf.py``
+preloads the app and calls ``prepare`` in the master before it forks. That
+way the schema is set up once, and the CRF model, rapidfuzz, PIL, the
+Gemini SDK and the pantry index are loaded once. Workers then share those
+pages copy-on-write. Anything else (``uvicorn``, a server without
+``preload_app``) calls ``prepare`` from the lifespan. There it is a no-op
+if this process, or the master it was forked from, already ran it.
+"""
+
+import io
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+log = logging.getLogger(__name__)
+
+# step -> seconds, for this process or the master it was forked from
+timings: dict[str, float] = {}
+_prepared_by: int | None = None  # pid that ran prepare()
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def record(step: str, seconds: float) -> None:
+    timings[step] = seconds
+
+
+@contextmanager
+def _step(step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(step, time.perf_counter() - start)
+
+
+def setup_schema(bind: Engine) -> None:
+    """Create tables and install indexes/triggers missing from older databases."""
+    from .database import Base
+    from .services import pantry_search, shopping_list
+
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        pantry_search.install(conn)  # backfills databases created before the index
+        shopping_list.install(conn)
+
+
+def warm_up() -> None:
+    """Load what the first diff and the first upload would otherwise load."""
+    from .database import ReadSessionLocal
+    from .services import ingredient_parser
+    from .services.pantry_index import pantry_index
+
+    if settings.parser_workers <= 0:
+        # Parsing happens in this process; with a pool each worker loads its own
+        with _step("warmup.parser"):
+            ingredient_parser.warm_up()
+    with _step("warmup.rapidfuzz"):
+        from rapidfuzz import fuzz, process
+
+        process.cdist(["garlic"], ["garlic cloves"], scorer=fuzz.token_set_ratio)
+    with _step("warmup.pil"):
+        from PIL import Image
+
+        from .services.image_convert import init_worker
+
+        init_worker()
+        Image.new("RGB", (8, 8)).save(io.BytesIO(), "JPEG")
+    with _step("warmup.genai"):
+        try:
+            import google.genai  # noqa: F401
+        except ImportError:
+            pass
+    with _step("warmup.pantry_index"):
+        with ReadSessionLocal() as db:
+            pantry_index.warm(db)
+
+
+def prepare(bind: Engine | None = None, warm: bool = True) -> None:
+    """Set up the schema and warm up, once per process tree."""
+    global _prepared_by
+    if _prepared_by is not None:
+        return
+    if bind is None:
+        from .database import engine as bind
+    with _step("schema"):
+        setup_schema(bind)
+    if warm:
+        warm_up()
+    _prepared_by = os.getpid()
+    log.info(
+        "Startup prepared in %.0f ms (%s)",
+        sum(timings.values()) * 1000,
+        ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items()),
+    )
+
+
+def memory() -> dict[str, int]:
+    """This process's resident memory, split into shared and private pages."""
+    usage: dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                field, _, rest = line.partition(":")
+                if field in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[field]] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage
+
+
+def report() -> dict:
+    return {
+        "pid": os.getpid(),
+        # True when a preloading master prepared the app before forking us
+        "preloaded": _prepared_by is not None and _prepared_by != os.getpid(),
+        "timings_ms": {step: round(seconds * 1000, 1) for step, seconds in timings.items()},
+        "memory": memory(),
+    }
@@ -116,7 +116,8 @@ if (uploadForm) uploadForm.addEventListener('submit', async (e) => {
 
     try {
         const fd = new FormData(uploadForm);
-        const res = await fetch(`${API}/photos/upload`, { method: 'POST', body: fd });
+        // One request for all selected photos; the server analyzes them concurrently
+        const res = await fetch(`${API}/photos/upload/batch`, { method: 'POST', body: fd });
         const data = await res.json();
 
         if (!res.ok) {
@@ -124,12 +125,18 @@ if (uploadForm) uploadForm.addEventListener('submit', async (e) => {
         }
 
         if (data.items.length === 0) {
-            list.innerHTML = `<li class="text-muted">${esc(data.message)}</li>`;
+            const note = data.photos.find(p => p.message)?.message || data.message;
+            list.innerHTML = `<li class="text-muted">${esc(note)}</li>`;
         } else {
             list.innerHTML = data.items.map(i =>
                 `<li>${esc(i.name)}${i.quantity ? ' — ' + i.quantity + ' ' + (i.unit || '') : ''}${i.category ? ' <span class="tag">' + esc(i.category) + '</span>' : ''}</li>`
             ).join('');
         }
+        const failures = data.photos.filter(p => p.error);
+        if (failures.length && errorDiv) {
+            errorDiv.textContent = failures.map(p => `${p.filename || 'photo'}: ${p.error}`).join(' ');
+            errorDiv.classList.remove('hidden');
+        }
         result.classList.remove('hidden');
 
         document.getElementById('add-all-btn').onclick = async () => {
@@ -3,8 +3,9 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from backend.database import Base, get_db
+from backend.database import Base, get_db, get_read_db
 from backend.main import app
+from backend.services.rate_limit import rate_limiter
 
 TEST_DATABASE_URL = "sqlite:///./test_pantry.db"
 
@@ -21,6 +22,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 @pytest.fixture(autouse=True)
@@ -30,6 +32,11 @@ def setup_db():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limit():
+    rate_limiter.reset()
+
+
 @pytest.fixture
 def client():
     return TestClient(app)
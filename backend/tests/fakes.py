@@ -0,0 +1,127 @@
+"""Test doubles shared across test modules.
+
+Functions run on process pools must be importable by the spawned workers,
+so they live here rather than in the test files.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend.services.image_preprocess import PreparedImage
+
+SLOW_CONVERT_SECONDS = 0.5
+
+
+def slow_prepare(
+    source: str, mime_type: str, max_long_edge: int, max_bytes: int, dhash: bool = False
+) -> PreparedImage:
+    """Hold a pool worker for a while, standing in for a large HEIC decode."""
+    time.sleep(SLOW_CONVERT_SECONDS)
+    with open(source, "rb") as f:
+        data = f.read()
+    return PreparedImage(
+        data=data,
+        mime_type="image/jpeg",
+        original_bytes=len(data),
+        original_size=(1, 1),
+        size=(1, 1),
+        seconds=SLOW_CONVERT_SECONDS,
+    )
+
+
+class FakeGeminiClient:
+    """Stands in for ``genai.Client``, answering with canned JSON text.
+
+    ``generate_content_stream`` yields ``chunks`` one at a time, sleeping
+    ``delay`` seconds before each, like tokens arriving from the model.
+    """
+
+    def __init__(self, chunks: list[str], delay: float = 0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self.generate_content,
+            generate_content_stream=self.generate_content_stream,
+        ))
+
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(self.delay * len(self.chunks))
+        return SimpleNamespace(text="".join(self.chunks))
+
+    async def generate_content_stream(self, model, contents, config):
+        async def chunks():
+            for text in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield SimpleNamespace(text=text)
+
+        return chunks()
+
+
+class FakeGeminiServer:
+    """Local HTTP server speaking enough of the Gemini REST API for the SDK.
+
+    ``script`` holds one ``(status, items, delay)`` step per request; the
+    last step repeats once the script runs out. Point the SDK at ``url``
+    via ``HttpOptions(base_url=...)``.
+    """
+
+    def __init__(self, script: list[tuple[int, list[dict], float]]):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.script = list(script)
+        self.paths: list[str] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                with server._lock:
+                    server.paths.append(self.path)
+                    step = server.script.pop(0) if len(server.script) > 1 else server.script[0]
+                status, items, delay = step
+                time.sleep(delay)
+                if status != 200:
+                    body = json.dumps({"error": {"code": status, "message": "fake failure", "status": "UNAVAILABLE"}})
+                    self._send(status, "application/json", body.encode())
+                    return
+                text = json.dumps(items)
+
+                def chunk(part: str) -> dict:
+                    return {"candidates": [{"content": {"parts": [{"text": part}], "role": "model"}}]}
+
+                if "streamGenerateContent" in self.path:
+                    half = len(text) // 2
+                    events = "".join(f"data: {json.dumps(chunk(p))}\r\n\r\n" for p in (text[:half], text[half:]))
+                    self._send(200, "text/event-stream", events.encode())
+                else:
+                    self._send(200, "application/json", json.dumps(chunk(text)).encode())
+
+            def _send(self, status: int, content_type: str, body: bytes) -> None:
+                try:
+                    self.send_response(status)
+                    self.send_header("content-type", content_type)
+                    self.send_header("content-length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (deadline or hedge)
+
+            def log_message(self, *args):
+                pass
+
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}/"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeGeminiServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.database import create_sqlite_engine, retry_on_busy, sqlite_pragmas
+
+
+def test_engine_profile_pragmas(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    writer = create_sqlite_engine(url, sqlite_pragmas())
+    reader = create_sqlite_engine(url, sqlite_pragmas(read_only=True))
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+    writer.dispose()
+    reader.dispose()
+
+
+def test_retry_on_busy():
+    calls = []
+
+    @retry_on_busy
+    def write(db=None):
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return "ok"
+
+    assert write() == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_on_busy_reraises_other_errors():
+    @retry_on_busy
+    def write(db=None):
+        raise OperationalError("INSERT", {}, sqlite3.OperationalError("no such table: t"))
+
+    with pytest.raises(OperationalError):
+        write()
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.routers import recipes
+from backend.services.executor import BoundedExecutor, ExecutorSaturated
+
+
+def _occupy(executor: BoundedExecutor, release: threading.Event) -> threading.Thread:
+    thread = threading.Thread(target=lambda: asyncio.run(executor.run(release.wait)))
+    thread.start()
+    while executor.stats()["running"] < 1:
+        time.sleep(0.001)
+    return thread
+
+
+def test_run_returns_result_and_records_wait():
+    executor = BoundedExecutor("test", workers=2, queue_size=0)
+    assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["queued"] == 0
+    executor.shutdown()
+
+
+def test_rejects_when_queue_full():
+    executor = BoundedExecutor("test", workers=1, queue_size=0)
+    release = threading.Event()
+    thread = _occupy(executor, release)
+    with pytest.raises(ExecutorSaturated):
+        asyncio.run(executor.run(sum, [1]))
+    release.set()
+    thread.join()
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_saturated_diff_returns_503_while_pantry_reads_work(client, monkeypatch):
+    executor = BoundedExecutor("test", workers=1, queue_size=0)
+    monkeypatch.setattr(recipes, "nlp_executor", executor)
+    release = threading.Event()
+    thread = _occupy(executor, release)
+    try:
+        res = client.post("/api/recipes/diff", json={"ingredients": ["salt"]})
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "1"
+        assert client.get("/api/pantry").status_code == 200
+        assert client.get("/api/recipes/executor").json()["rejected"] == 1
+    finally:
+        release.set()
+        thread.join()
+        executor.shutdown()
@@ -0,0 +1,65 @@
+import io
+
+from PIL import Image
+
+from backend.services.image_preprocess import prepare_image
+
+
+def _photo(size, fmt="JPEG", orientation=None, quality=95) -> bytes:
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    exif[0x010F] = "PhoneMaker"
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality, exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def test_large_photo_is_downscaled_to_long_edge():
+    prepared = prepare_image(_photo((4000, 3000)), "image/jpeg", 1600, 1 << 20)
+    assert not prepared.skipped
+    assert prepared.original_size == (4000, 3000)
+    assert prepared.size == (1600, 1200)
+    assert Image.open(io.BytesIO(prepared.data)).size == (1600, 1200)
+
+
+def test_output_fits_byte_budget():
+    noisy = Image.effect_noise((1200, 900), 64).convert("RGB")
+    buf = io.BytesIO()
+    noisy.save(buf, format="PNG")
+    prepared = prepare_image(buf.getvalue(), "image/png", 1600, 100_000)
+    assert prepared.mime_type == "image/jpeg"
+    assert len(prepared.data) <= 100_000
+
+
+def test_orientation_applied_and_exif_dropped():
+    # Orientation 6: stored landscape, displayed rotated 90 degrees
+    prepared = prepare_image(_photo((400, 300), orientation=6), "image/jpeg", 1600, 1 << 20)
+    out = Image.open(io.BytesIO(prepared.data))
+    assert out.size == (300, 400)
+    assert not out.getexif()
+
+
+def test_small_clean_image_passes_through():
+    buf = io.BytesIO()
+    Image.linear_gradient("L").save(buf, format="PNG")
+    data = buf.getvalue()
+    prepared = prepare_image(data, "image/png", 1600, 1 << 20)
+    assert prepared.skipped
+    assert prepared.data == data
+    assert prepared.mime_type == "image/png"
+
+
+def test_transparent_areas_become_white():
+    rgba = Image.new("RGBA", (2000, 1000), (0, 0, 0, 0))
+    rgba.paste((200, 0, 0, 255), (0, 0, 1000, 1000))
+    palette = rgba.convert("P", palette=Image.Palette.ADAPTIVE)
+    palette.info["transparency"] = palette.getpixel((1500, 500))
+    for img in (rgba, palette):
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        prepared = prepare_image(buf.getvalue(), "image/png", 1600, 1 << 20)
+        out = Image.open(io.BytesIO(prepared.data)).convert("RGB")
+        assert min(out.getpixel((1200, 400))) > 240
+        assert out.getpixel((400, 400))[0] > 150
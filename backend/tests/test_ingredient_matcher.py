@@ -1,4 +1,10 @@
-from backend.services.ingredient_matcher import match_ingredient, match_many
+import pytest
+
+from backend.benchmarks.data import BASE_INGREDIENTS, synthetic_pantry, typo_queries
+from backend.config import settings
+from backend.services.aliases import canonicalize
+from backend.services.candidate_index import TrigramIndex
+from backend.services.ingredient_matcher import PantryMatcher, match_ingredient, match_many
 
 
 def test_exact_match():
@@ -37,3 +43,82 @@ def test_match_many():
     assert results[0].in_pantry is True
     assert results[1].in_pantry is False
     assert results[2].in_pantry is True
+
+
+def test_pantry_matcher_patches():
+    matcher = PantryMatcher([(1, "garlic"), (2, "olive oil")])
+    assert matcher.match("Garlic").pantry_match == "garlic"
+
+    matcher.add(3, "saffron")
+    assert matcher.match("saffron threads").pantry_match == "saffron"
+
+    matcher.add(1, "shallot")  # rename
+    assert matcher.match("garlic").in_pantry is False
+    assert matcher.match("shallot").score == 100.0
+
+    matcher.remove(3)
+    assert matcher.match("saffron").in_pantry is False
+    assert len(matcher) == 2
+
+
+def test_match_many_agrees_with_match():
+    pantry = ["garlic", "olive oil", "extra virgin olive oil", "black pepper",
+              "Red Onion", "onion", "salt", "smoked paprika", "garlic"]
+    names = ["garlic cloves", "olive oil", "oil", "pepper", "red onions", "saffron",
+             "", "  ", "paprika", "GARLIC", "kosher salt", "onion"]
+    matcher = PantryMatcher.from_names(pantry)
+    expected = [matcher.match(n) for n in names]
+    assert matcher.match_many(names) == expected
+
+
+def test_aliases_match_exactly():
+    assert canonicalize("green onions") == "scallion"
+    assert canonicalize("fresh coriander leaves") == "fresh cilantro"
+    assert canonicalize("garlic") == "garlic"
+    result = match_ingredient("Spring Onions", ["scallions", "onion"])
+    assert (result.pantry_match, result.score) == ("scallions", 100.0)
+    assert match_ingredient("garbanzo beans", ["chickpeas"]).in_pantry is True
+
+
+def test_trigram_candidates_rank_by_similarity():
+    index = TrigramIndex(["garlic", "garlic powder", "olive oil", "onion", "ginger"])
+    assert index.candidates("garlc", 2).tolist() == [0, 1]
+    assert index.candidates("zzz", 2).tolist() == []
+    assert len(index.candidates("o", 10)) <= 5
+
+
+@pytest.fixture
+def prune(monkeypatch):
+    monkeypatch.setattr(settings, "matcher_candidates", 64)
+
+    def set_pruning(on: bool):
+        monkeypatch.setattr(settings, "matcher_prune_min", 1 if on else 0)
+
+    return set_pruning
+
+
+def test_pruned_matching_recall(prune):
+    pantry = synthetic_pantry(3000)
+    queries = typo_queries(pantry + BASE_INGREDIENTS, 200, seed=7)
+    matcher = PantryMatcher.from_names(pantry)
+    prune(False)
+    brute = matcher.match_many(queries)
+    prune(True)
+    pruned = matcher.match_many(queries)
+    recall = sum(a.score == b.score for a, b in zip(brute, pruned)) / len(queries)
+    assert recall >= 0.97
+    assert sum(a.pantry_id == b.pantry_id for a, b in zip(brute, pruned)) / len(queries) >= 0.95
+    assert [matcher.match(q) for q in queries[:20]] == pruned[:20]
+
+
+def test_pruned_matching_follows_patches(prune):
+    prune(True)
+    matcher = PantryMatcher(enumerate(synthetic_pantry(2000)))
+    assert matcher.match("saffron thread").in_pantry is False
+    matcher.add(5000, "saffron threads")  # after the trigram index was built
+    assert matcher.match("safron threads").pantry_match == "saffron threads"
+    matcher.add(5000, "sumac")  # rename
+    assert matcher.match("safron threads").in_pantry is False
+    assert matcher.match("sumak").pantry_id == 5000
+    matcher.remove(5000)
+    assert matcher.match("sumak").in_pantry is False
@@ -1,4 +1,4 @@
-from backend.services.ingredient_parser import parse_single, parse_many
+from backend.services.ingredient_parser import ParserPool, parse_single, parse_many
 
 
 def test_parse_single_basic():
@@ -22,3 +22,13 @@ def test_parse_many():
     assert len(results) == 3
     for r in results:
         assert r.name
+
+
+def test_parser_pool_matches_serial():
+    lines = ["1 cup milk", "2 eggs", "salt", "3 cloves garlic, minced", "1/2 tsp cumin"]
+    pool = ParserPool(workers=1, batch_size=2)
+    pool.start()
+    try:
+        assert pool.parse(lines) == parse_many(lines)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from backend.config import settings
+from backend.services import metrics
+from backend.services.executor import BoundedExecutor
+from backend.services.rate_limit import Limit, MemoryBuckets, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch, tmp_path):
+    metrics.registry.reset()
+    monkeypatch.setattr(metrics.metrics_store, "directory", tmp_path)
+    yield tmp_path
+    metrics.registry.reset()
+
+
+def _scrape(client) -> str:
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return response.text
+
+
+def test_requests_counted_by_route_template(client):
+    item = client.post("/api/pantry", json={"name": "rice"}).json()
+    client.get(f"/api/pantry/{item['id']}")
+    client.get("/api/pantry/999999")
+    text = _scrape(client)
+    assert 'pantry_http_requests_total{method="POST",route="/api/pantry",status="201"} 1' in text
+    assert 'pantry_http_requests_total{method="GET",route="/api/pantry/{item_id}",status="200"} 1' in text
+    assert 'pantry_http_requests_total{method="GET",route="/api/pantry/{item_id}",status="404"} 1' in text
+    assert 'pantry_http_request_duration_seconds_count{method="GET",route="/api/pantry/{item_id}"} 2' in text
+    assert 'pantry_http_request_duration_seconds_bucket{method="GET",route="/api/pantry/{item_id}",le="+Inf"} 2' in text
+    # Database time is attributed to the route that spent it
+    assert 'pantry_http_request_stage_seconds_count{route="/api/pantry",stage="db"} 1' in text
+    # The scrape itself is in flight while it renders
+    assert 'pantry_http_requests_in_flight{route_class="read"} 1' in text
+
+
+def test_rejected_requests_are_unrouted(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "limits", {"read": Limit.per_minute(1, 1)})
+    monkeypatch.setattr(rate_limiter, "store", MemoryBuckets(10))
+    client.get("/api/pantry")
+    assert client.get("/api/pantry").status_code == 429
+    monkeypatch.setattr(rate_limiter, "limits", {})
+    text = _scrape(client)
+    assert 'pantry_http_requests_total{method="GET",route="<unrouted>",status="429"} 1' in text
+
+
+def test_api_key_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(settings, "api_key", "s3cret")
+    assert client.get("/api/pantry").status_code == 401
+    assert client.get("/api/pantry", headers={"X-Api-Key": "wrong"}).status_code == 401
+    assert client.get("/api/pantry", headers={"X-Api-Key": "s3cret"}).status_code == 200
+    assert client.get("/api/health").status_code == 200
+    assert client.get("/pantry").status_code == 200
+
+
+def test_stage_timing_follows_work_onto_the_executor():
+    executor = BoundedExecutor("test", workers=1, queue_size=1)
+
+    def work():
+        with metrics.timed("parser"):
+            pass
+        return "done"
+
+    async def request():
+        stages, token = metrics.begin_request()
+        try:
+            assert await executor.run(work) == "done"
+        finally:
+            metrics.end_request(token)
+        return stages.totals
+
+    try:
+        assert "parser" in asyncio.run(request())
+    finally:
+        executor.shutdown()
+    # Outside a request, timing is a no-op
+    with metrics.timed("parser"):
+        pass
+
+
+def test_collect_sums_live_workers_and_drops_dead_ones(fresh_metrics):
+    registry = metrics.Registry()
+    registry.observe_request("GET", "/api/pantry", 200, 0.003, {"db": 0.001})
+    other = registry.snapshot()
+    live = fresh_metrics / f"{os.getppid()}.json"
+    dead = fresh_metrics / "999999999.json"
+    live.write_text(json.dumps(other))
+    dead.write_text(json.dumps(other))
+
+    metrics.registry.observe_request("GET", "/api/pantry", 200, 0.2, {})
+    merged = metrics.metrics_store.collect(metrics.registry.snapshot())
+    key = 'method="GET",route="/api/pantry"'
+    assert merged["counters"]["http_requests_total"][key + ',status="200"'] == 2
+    buckets, total, count = merged["histograms"]["http_request_duration_seconds"][key]
+    assert count == 2 and total == pytest.approx(0.203)
+    assert buckets[metrics.BUCKETS.index(0.005)] == 1 and buckets[metrics.BUCKETS.index(0.25)] == 1
+    assert not dead.exists()
+    assert (fresh_metrics / f"{os.getpid()}.json").exists()
+
+
+def test_render_histogram_is_cumulative():
+    registry = metrics.Registry()
+    for seconds in (0.0005, 0.02, 60):
+        registry.observe_request("POST", '/api/"x"', 200, seconds, {})
+    text = metrics.render(registry.snapshot())
+    assert "# TYPE pantry_http_request_duration_seconds histogram" in text
+    label = 'method="POST",route="/api/\\"x\\""'
+    assert f'pantry_http_request_duration_seconds_bucket{{{label},le="0.001"}} 1' in text
+    assert f'pantry_http_request_duration_seconds_bucket{{{label},le="0.025"}} 2' in text
+    assert f'pantry_http_request_duration_seconds_bucket{{{label},le="30.0"}} 2' in text
+    assert f'pantry_http_request_duration_seconds_bucket{{{label},le="+Inf"}} 3' in text
+    assert f"pantry_http_request_duration_seconds_count{{{label}}} 3" in text
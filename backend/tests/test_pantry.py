@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_create_and_list(client):
     res = client.post("/api/pantry", json={"name": "Garlic", "quantity": 5, "unit": "cloves"})
     assert res.status_code == 201
@@ -68,3 +71,158 @@ def test_not_found(client):
     assert client.get("/api/pantry/999").status_code == 404
     assert client.put("/api/pantry/999", json={"name": "x"}).status_code == 404
     assert client.delete("/api/pantry/999").status_code == 404
+
+
+def test_bulk_create_merges_with_existing(client):
+    client.post("/api/pantry", json={"name": "Salt", "quantity": 1})
+    items = [
+        {"name": "salt ", "quantity": 2, "unit": "lb"},
+        {"name": "Pepper", "quantity": 1},
+        {"name": "pepper", "quantity": 3, "category": "spices"},
+    ]
+    res = client.post("/api/pantry/bulk", json=items)
+    assert res.status_code == 201
+    data = res.json()
+    assert [i["name"] for i in data] == ["salt", "pepper"]
+    assert data[0]["quantity"] == 3
+    assert data[0]["unit"] == "lb"
+    assert data[1]["quantity"] == 4
+    assert len(client.get("/api/pantry").json()) == 2
+
+
+def test_bulk_create_converts_units_of_one_dimension(client):
+    client.post("/api/pantry", json={"name": "flour", "quantity": 500, "unit": "g"})
+    client.post("/api/pantry", json={"name": "eggs", "quantity": 6})
+    items = [
+        {"name": "Flour", "quantity": 2, "unit": "lb"},
+        {"name": "sugar", "quantity": 1, "unit": "cup"},
+        {"name": "sugar", "quantity": 2, "unit": "tbsp"},
+        {"name": "eggs", "quantity": 1, "unit": "dozen"},
+    ]
+    data = client.post("/api/pantry/bulk", json=items).json()
+    assert [(i["name"], i["unit"]) for i in data] == [("flour", "g"), ("sugar", "cup"), ("eggs", None)]
+    assert data[0]["quantity"] == pytest.approx(500 + 2 * 453.59237)
+    assert data[1]["quantity"] == pytest.approx(1.125)
+    assert data[2]["quantity"] == 18
+    assert len(client.get("/api/pantry").json()) == 3
+
+
+def test_bulk_create_is_set_based(client):
+    from sqlalchemy import event
+
+    from .conftest import engine
+
+    client.post("/api/pantry/bulk", json=[{"name": f"item {i}"} for i in range(50)])
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        items = [{"name": f"item {i}", "quantity": 1} for i in range(100)]
+        res = client.post("/api/pantry/bulk", json=items)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 201
+    assert len(res.json()) == 100
+    # lookup, update, insert, version bump, re-select
+    assert len(statements) == 5
+
+
+def test_search_uses_fts_index(client):
+    client.post("/api/pantry", json={"name": "chicken breast"})
+    client.post("/api/pantry", json={"name": "broth", "notes": "chicken stock base"})
+    item_id = client.post("/api/pantry", json={"name": "rice"}).json()["id"]
+
+    names = [i["name"] for i in client.get("/api/pantry?search=CHICK").json()]
+    assert names == ["chicken breast", "broth"]  # name hits rank above notes hits
+
+    client.put(f"/api/pantry/{item_id}", json={"name": "chicken rice"})
+    assert len(client.get("/api/pantry?search=chicken").json()) == 3
+    client.delete(f"/api/pantry/{item_id}")
+    assert len(client.get("/api/pantry?search=chicken").json()) == 2
+
+    # Too short for trigrams: falls back to LIKE on the name
+    assert len(client.get("/api/pantry?search=ch").json()) == 1
+    assert client.get('/api/pantry?search="%').json() == []
+
+
+def test_keyset_pagination(client):
+    names = ["basil", "apple", "cumin", "apple", "dill", "eggs"]
+    for name in names:
+        client.post("/api/pantry", json={"name": name})
+
+    seen = []
+    res = client.get("/api/pantry?limit=4")
+    while True:
+        assert res.status_code == 200
+        seen.extend((i["name"], i["id"]) for i in res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        res = client.get(f"/api/pantry?limit=4&cursor={cursor}")
+    assert seen == sorted(seen)
+    assert [name for name, _ in seen] == sorted(names)
+
+    assert client.get("/api/pantry?limit=2&cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/pantry?limit=0").status_code == 422
+
+
+def test_list_ndjson_stream(client):
+    import json
+
+    client.post("/api/pantry/bulk", json=[{"name": f"item {i:02d}"} for i in range(12)])
+    res = client.get("/api/pantry?format=ndjson&search=item 0")
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert len(rows) == 10
+    assert all(r["name"].startswith("item 0") for r in rows)
+
+    res = client.get("/api/pantry?format=ndjson&limit=5")
+    assert len(res.text.splitlines()) == 5
+    assert res.headers["X-Next-Cursor"]
+
+
+def test_etag_not_modified(client):
+    from sqlalchemy import event
+
+    from .conftest import engine
+
+    item_id = client.post("/api/pantry", json={"name": "rice"}).json()["id"]
+    res = client.get("/api/pantry")
+    etag = res.headers["ETag"]
+    assert res.headers["Cache-Control"] == "no-cache"
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        res = client.get("/api/pantry", headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert res.status_code == 304
+    assert len(statements) == 1
+    assert "pantry_items" not in statements[0]
+
+    assert client.get(f"/api/pantry/{item_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/api/pantry/{item_id}", json={"quantity": 2})
+    res = client.get("/api/pantry", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_deleted_item_is_not_found_despite_etag(client):
+    item_id = client.post("/api/pantry", json={"name": "rice"}).json()["id"]
+    stale = client.get(f"/api/pantry/{item_id}").headers["ETag"]
+    client.delete(f"/api/pantry/{item_id}")
+    current = client.get("/api/pantry").headers["ETag"]
+
+    for tag in (stale, current, "*"):
+        res = client.get(f"/api/pantry/{item_id}", headers={"If-None-Match": tag})
+        assert res.status_code == 404
+    assert client.get("/api/pantry/999", headers={"If-None-Match": current}).status_code == 404
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from backend.models import ParsedIngredientCache
+from backend.services import parse_cache as parse_cache_module
+from backend.services.parse_cache import ParseCache, cache_key
+
+from .conftest import TestSession, engine
+
+
+def test_cache_key_normalizes():
+    assert cache_key("  2 Cups   flour ") == cache_key("2 cups flour")
+
+
+def test_cache_key_keeps_spoon_case():
+    assert cache_key("1 T sugar") != cache_key("1 t sugar")
+    assert cache_key("1T Sugar") != cache_key("1t sugar")
+    assert cache_key("1 T Sugar") == cache_key("1  T sugar")
+    assert cache_key("1 Tbsp sugar") == cache_key("1 tbsp sugar")
+
+
+def test_memory_tier_is_bounded():
+    db = TestSession()
+    cache = ParseCache(memory_entries=2, max_entries=100)
+    cache.parse(db, ["salt", "pepper", "cumin"])
+    assert cache.stats(db)["memory_entries"] == 2
+    db.close()
+
+
+def test_persistent_tier_evicts_and_drops_stale_versions(monkeypatch):
+    monkeypatch.setattr(parse_cache_module, "_EVICT_EVERY", 1)
+    db = TestSession()
+    old = ParseCache(memory_entries=10, max_entries=100)
+    old.version = "0:old"
+    old.parse(db, ["basil"])
+
+    cache = ParseCache(memory_entries=10, max_entries=2)
+    for line in ["salt", "pepper", "cumin"]:
+        cache.parse(db, [line])
+    keys = {row.key for row in db.query(ParsedIngredientCache)}
+    assert keys == {"pepper", "cumin"}
+    db.close()
+
+
+def test_persistent_hits_refresh_recency_only_when_stale():
+    db = TestSession()
+    entry = parse_cache_module._Entry("salt", None, None, None)
+    ParseCache(memory_entries=10, max_entries=100)._persist(db, [], {"salt": entry})
+    writes = []
+
+    def listener(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            writes.append(statement)
+
+    def on_commit(conn):
+        writes.append("COMMIT")
+
+    event.listen(engine, "before_cursor_execute", listener)
+    event.listen(engine, "commit", on_commit)
+    try:
+        # A fresh persistent hit is read-only: no UPDATE, no commit
+        assert ParseCache(memory_entries=10, max_entries=100).parse(db, ["salt"])[0].name == "salt"
+        assert writes == []
+
+        old = datetime.now(timezone.utc) - 2 * parse_cache_module._TOUCH_AFTER
+        db.query(ParsedIngredientCache).update({"last_used_at": old})
+        db.commit()
+        writes.clear()
+        ParseCache(memory_entries=10, max_entries=100).parse(db, ["salt"])
+        assert any(w.lstrip().upper().startswith("UPDATE") for w in writes)
+        assert "COMMIT" in writes
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        event.remove(engine, "commit", on_commit)
+    assert db.get(ParsedIngredientCache, "salt").last_used_at.replace(tzinfo=None) > old.replace(tzinfo=None)
+    db.close()
+
+
+def test_eviction_keeps_max_entries_when_timestamps_tie(monkeypatch):
+    monkeypatch.setattr(parse_cache_module, "_EVICT_EVERY", 1)
+    db = TestSession()
+    cache = ParseCache(memory_entries=10, max_entries=2)
+    entry = parse_cache_module._Entry("salt", None, None, None)
+    cache._persist(db, [], {"salt": entry})
+    # One batch of misses is stamped with a single last_used_at, so the
+    # cutoff row ties with rows that must be kept
+    batch = {"pepper", "cumin", "paprika"}
+    cache._persist(db, [], dict.fromkeys(batch, entry))
+    keys = {row.key for row in db.query(ParsedIngredientCache)}
+    assert len(keys) == 2
+    assert keys <= batch
+    db.close()
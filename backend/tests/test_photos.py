@@ -0,0 +1,341 @@
+import asyncio
+import io
+import json
+import tempfile
+import time
+
+import httpx
+import pillow_heif
+import pytest
+from PIL import Image
+
+from backend.config import settings
+from backend.main import app
+from backend.routers import photos
+from backend.schemas import PantryItemCreate
+from backend.services import vision
+from backend.services.executor import BoundedProcessExecutor
+from backend.services.image_convert import init_worker
+from backend.services.image_preprocess import prepare_image
+from backend.services.vision_cache import VisionCache, digest
+from backend.tests import fakes
+
+
+def _heic_bytes(size=(64, 48)) -> bytes:
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    heif = pillow_heif.from_pillow(img)
+    buf = io.BytesIO()
+    heif.save(buf, quality=80)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    def make(workers, queue_size, prepare=prepare_image):
+        executor = BoundedProcessExecutor("image-test", workers, queue_size, initializer=init_worker)
+        executor.start()
+        monkeypatch.setattr(photos, "image_pool", executor)
+        monkeypatch.setattr(photos, "prepare_image", prepare)
+        created.append(executor)
+        return executor
+
+    created: list[BoundedProcessExecutor] = []
+    yield make
+    for executor in created:
+        executor.shutdown()
+
+
+def test_prepare_heic_in_worker(pool):
+    executor = pool(1, 0)
+    prepared = asyncio.run(executor.run(prepare_image, _heic_bytes(), "image/heic", 1600, 1 << 20))
+    assert prepared.mime_type == "image/jpeg"
+    assert prepared.data[:2] == b"\xff\xd8"
+    assert Image.open(io.BytesIO(prepared.data)).size == (64, 48)
+
+
+def test_upload_heic_is_converted(client, pool, monkeypatch):
+    pool(1, 0)
+    seen = {}
+
+    async def fake_analyze(image_bytes, mime_type):
+        seen["mime_type"] = mime_type
+        seen["magic"] = image_bytes[:2]
+        return None
+
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    res = client.post(
+        "/api/photos/upload",
+        files={"photo": ("shelf.heic", _heic_bytes(), "image/heic")},
+    )
+    assert res.status_code == 200
+    assert seen == {"mime_type": "image/jpeg", "magic": b"\xff\xd8"}
+
+
+def _jpeg_bytes(quality=90) -> bytes:
+    img = Image.radial_gradient("L").resize((320, 240)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def counting_vision(monkeypatch):
+    calls = []
+
+    async def fake_analyze(image_bytes, mime_type):
+        calls.append(image_bytes)
+        return [PantryItemCreate(name="oat milk", quantity=1)]
+
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    return calls
+
+
+def test_repeat_upload_is_served_from_cache(client, pool, counting_vision):
+    pool(1, 0)
+    files = {"photo": ("receipt.jpg", _jpeg_bytes(), "image/jpeg")}
+    first = client.post("/api/photos/upload", files=files)
+    second = client.post("/api/photos/upload", files=files)
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["items"] == first.json()["items"]
+    assert len(counting_vision) == 1
+    assert client.get("/api/photos/cache").json()["source_hits"] == 1
+
+
+def test_reencoded_photo_hits_near_duplicate(client, pool, counting_vision, monkeypatch):
+    pool(1, 0)
+    photos.vision_cache.dhash_distance = 4
+    monkeypatch.setattr(settings, "vision_cache_dhash_distance", 4)
+    client.post("/api/photos/upload", files={"photo": ("a.jpg", _jpeg_bytes(90), "image/jpeg")})
+    res = client.post("/api/photos/upload", files={"photo": ("b.jpg", _jpeg_bytes(60), "image/jpeg")})
+    assert res.json()["cached"] is True
+    assert len(counting_vision) == 1
+
+
+def test_upload_undecodable_heic_returns_415(client, pool):
+    pool(1, 0)
+    res = client.post(
+        "/api/photos/upload",
+        files={"photo": ("shelf.heic", b"not an image", "image/heic")},
+    )
+    assert res.status_code == 415
+
+
+async def _upload(http: httpx.AsyncClient) -> httpx.Response:
+    return await http.post(
+        "/api/photos/upload",
+        files={"photo": ("shelf.heic", b"heic", "image/heic")},
+    )
+
+
+async def _wait_for_pending(executor: BoundedProcessExecutor, count: int) -> None:
+    while executor._pending < count:
+        await asyncio.sleep(0.005)
+
+
+def test_saturated_pool_returns_503(pool):
+    executor = pool(1, 0, prepare=fakes.slow_prepare)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            first = asyncio.create_task(_upload(http))
+            await _wait_for_pending(executor, 1)
+            rejected = await _upload(http)
+            return await first, rejected
+
+    first, rejected = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "2"
+    assert executor.stats()["rejected"] == 1
+
+
+def test_reads_stay_fast_during_heic_uploads(pool):
+    executor = pool(2, 2, prepare=fakes.slow_prepare)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            uploads = [asyncio.create_task(_upload(http)) for _ in range(4)]
+            await _wait_for_pending(executor, 4)
+            latencies = []
+            for path in ["/api/health", "/api/pantry"] * 5:
+                start = time.perf_counter()
+                res = await http.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert res.status_code == 200
+            return await asyncio.gather(*uploads), latencies
+
+    responses, latencies = asyncio.run(scenario())
+    assert all(res.status_code == 200 for res in responses)
+    # Inline decoding would hold the loop for SLOW_CONVERT_SECONDS per upload
+    assert max(latencies) < fakes.SLOW_CONVERT_SECONDS / 2
+
+
+def test_batch_merges_items_and_reports_failures(client, pool, monkeypatch):
+    pool(2, 2)
+    detections = {
+        b"a": [PantryItemCreate(name="Oat Milk", quantity=1), PantryItemCreate(name="eggs", quantity=6)],
+        b"b": [PantryItemCreate(name="oat milk ", quantity=2)],
+    }
+
+    async def fake_analyze(image_bytes, mime_type):
+        return detections[image_bytes[-1:]]
+
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    files = [
+        ("photos", ("a.jpg", _jpeg_bytes() + b"a", "image/jpeg")),
+        ("photos", ("b.jpg", _jpeg_bytes() + b"b", "image/jpeg")),
+        ("photos", ("notes.txt", b"hello", "text/plain")),
+    ]
+    res = client.post("/api/photos/upload/batch", files=files)
+    assert res.status_code == 200
+    data = res.json()
+    assert {(i["name"], i["quantity"]) for i in data["items"]} == {("oat milk", 3), ("eggs", 6)}
+    assert [p["filename"] for p in data["photos"]] == ["a.jpg", "b.jpg", "notes.txt"]
+    assert [p["status_code"] for p in data["photos"]] == [200, 200, 415]
+    assert data["failed"] == 1
+
+
+def test_batch_isolates_unexpected_errors(client, pool, monkeypatch):
+    pool(2, 2)
+
+    async def fake_analyze(image_bytes, mime_type):
+        if image_bytes.endswith(b"b"):
+            raise RuntimeError("boom")
+        return [PantryItemCreate(name="eggs", quantity=6)]
+
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    files = [
+        ("photos", (f"{name}.jpg", _jpeg_bytes() + name.encode(), "image/jpeg"))
+        for name in ("a", "b", "c")
+    ]
+    res = client.post("/api/photos/upload/batch", files=files)
+    assert res.status_code == 200
+    data = res.json()
+    assert [p["status_code"] for p in data["photos"]] == [200, 500, 200]
+    assert data["photos"][1]["error"]
+    assert data["failed"] == 1
+    assert [(i["name"], i["quantity"]) for i in data["items"]] == [("eggs", 12)]
+
+
+def test_batch_fans_out_under_semaphore(client, pool, monkeypatch):
+    pool(2, 4)
+    monkeypatch.setattr(settings, "vision_batch_concurrency", 2)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    in_flight = []
+    peak = []
+
+    async def fake_analyze(image_bytes, mime_type):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.pop()
+        return []
+
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    files = [("photos", (f"{i}.jpg", _jpeg_bytes() + bytes([i]), "image/jpeg")) for i in range(5)]
+    res = client.post("/api/photos/upload/batch", files=files)
+    assert res.json()["failed"] == 0
+    assert max(peak) == 2
+
+
+def test_batch_rejects_too_many_photos(client, monkeypatch):
+    monkeypatch.setattr(settings, "vision_batch_max_photos", 1)
+    files = [("photos", (f"{i}.jpg", b"x", "image/jpeg")) for i in range(2)]
+    assert client.post("/api/photos/upload/batch", files=files).status_code == 400
+
+
+def _events(res) -> list[dict]:
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+def test_stream_upload_emits_items_then_summary(client, pool, monkeypatch):
+    pool(1, 0)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    client_stub = fakes.FakeGeminiClient(['[{"name": "oat milk"}, ', '{"name": "eggs", "quantity": 6}]'])
+    monkeypatch.setattr(vision, "_get_client", lambda: client_stub)
+    files = {"photo": ("shelf.jpg", _jpeg_bytes(), "image/jpeg")}
+
+    res = client.post("/api/photos/upload/stream", files=files)
+    assert res.headers["content-type"] == "application/x-ndjson"
+    events = _events(res)
+    assert [e["event"] for e in events] == ["item", "item", "summary"]
+    assert events[0]["item"]["name"] == "oat milk"
+    assert [i["name"] for i in events[-1]["items"]] == ["oat milk", "eggs"]
+    assert events[-1]["cached"] is False
+
+    # The streamed result was cached like a regular upload
+    again = _events(client.post("/api/photos/upload/stream", files=files))
+    assert [e["event"] for e in again] == ["item", "item", "summary"]
+    assert again[-1]["cached"] is True
+
+
+def test_stream_upload_sse_and_error_event(client, pool, monkeypatch):
+    pool(1, 0)
+    monkeypatch.setattr(photos, "vision_cache", VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0))
+    client_stub = fakes.FakeGeminiClient(['[{"name": "salt"}, {"na'])
+    monkeypatch.setattr(vision, "_get_client", lambda: client_stub)
+
+    res = client.post(
+        "/api/photos/upload/stream?format=sse",
+        files={"photo": ("shelf.jpg", _jpeg_bytes(), "image/jpeg")},
+    )
+    assert res.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in res.text.split("\n\n") if f]
+    assert [f.split("\n")[0] for f in frames] == ["event: item", "event: error"]
+    assert json.loads(frames[1].split("data: ", 1)[1])["status_code"] == 502
+
+
+def test_stream_upload_validates_before_streaming(client):
+    res = client.post(
+        "/api/photos/upload/stream",
+        files={"photo": ("notes.txt", b"hello", "text/plain")},
+    )
+    assert res.status_code == 415
+
+
+def test_large_upload_is_read_intact(client, pool, monkeypatch, tmp_path):
+    pool(1, 0)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    seen = {}
+
+    def fake_lookup(db, source_key):
+        seen["key"] = source_key
+        return [PantryItemCreate(name="rice")]
+
+    monkeypatch.setattr(photos.vision_cache, "lookup_source", fake_lookup)
+    # Past Starlette's 1 MB spool threshold, so the body is read from disk
+    body = bytes(range(256)) * (6 * 1024)
+    res = client.post("/api/photos/upload", files={"photo": ("big.png", body, "image/png")})
+    assert res.json()["cached"] is True
+    assert seen["key"] == digest(body)
+    assert client.get("/api/photos/memory").json()["in_flight_bytes"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pool_gets_a_temp_file_path(client, pool, monkeypatch, tmp_path):
+    executor = pool(1, 0)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    run, sources = executor.run, []
+
+    async def recording_run(fn, source, *args):
+        sources.append(source)
+        with open(source, "rb") as f:
+            assert f.read() == _jpeg_bytes()
+        return await run(fn, source, *args)
+
+    async def fake_analyze(image_bytes, mime_type):
+        return None
+
+    monkeypatch.setattr(executor, "run", recording_run)
+    monkeypatch.setattr(photos, "analyze_image", fake_analyze)
+    res = client.post("/api/photos/upload", files={"photo": ("shelf.jpg", _jpeg_bytes(), "image/jpeg")})
+    assert res.status_code == 200
+    # The pool opens the spooled upload itself instead of receiving its bytes
+    assert [type(s) for s in sources] == [str]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,160 @@
+import sqlite3
+import time
+
+import pytest
+
+from backend.services import rate_limit
+from backend.services.rate_limit import (
+    Limit,
+    MemoryBuckets,
+    RateLimiter,
+    SqliteBuckets,
+    classify,
+    rate_limiter,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_classify_routes():
+    assert classify("GET", "/api/pantry") == "read"
+    assert classify("POST", "/api/pantry") == "write"
+    assert classify("DELETE", "/api/pantry/3") == "write"
+    assert classify("POST", "/api/recipes/diff") == "compute"
+    assert classify("POST", "/api/recipes/parse") == "compute"
+    assert classify("GET", "/api/recipes/executor") == "read"
+    assert classify("POST", "/api/photos/upload/batch") == "upload"
+    assert classify("GET", "/api/health") is None
+    assert classify("GET", "/pantry") is None
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def buckets(request, tmp_path):
+    clock = Clock()
+    if request.param == "memory":
+        return MemoryBuckets(100, clock=clock), clock
+    return SqliteBuckets(str(tmp_path / "rl.db"), 100, 60, clock=clock), clock
+
+
+def test_bucket_allows_burst_then_refills(buckets):
+    store, clock = buckets
+    limit = Limit.per_minute(60, burst=3)  # one token per second
+    assert [store.take("ip", limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("ip", limit) == pytest.approx(1.0)
+    # A rejected request doesn't consume anything
+    clock.now += 0.5
+    assert store.take("ip", limit) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("ip", limit) == 0.0
+    # Refill is capped at the burst size
+    clock.now += 3600
+    assert [store.take("ip", limit) for _ in range(4)][-1] > 0
+    assert store.take("other", limit) == 0.0
+
+
+def test_memory_buckets_evict_least_recently_used():
+    clock = Clock()
+    store = MemoryBuckets(2, clock=clock)
+    limit = Limit.per_minute(1, burst=1)
+    store.take("a", limit)
+    store.take("b", limit)
+    store.take("a", limit)  # refreshes a; b is now the oldest
+    store.take("c", limit)
+    assert len(store) == 2 and store.evicted == 1
+    assert store.take("a", limit) > 0  # still tracked, still empty
+    assert store.take("b", limit) == 0.0  # forgotten, so a fresh bucket
+
+
+def test_sqlite_buckets_shared_between_workers(tmp_path):
+    path = str(tmp_path / "rl.db")
+    clock = Clock()
+    worker_a = SqliteBuckets(path, 100, 60, clock=clock)
+    worker_b = SqliteBuckets(path, 100, 60, clock=clock)
+    limit = Limit.per_minute(60, burst=4)
+    results = [store.take("ip", limit) for store in (worker_a, worker_b) * 3]
+    assert results[:4] == [0.0] * 4
+    assert all(r > 0 for r in results[4:])
+
+
+def test_sqlite_buckets_prune_idle_and_over_cap(tmp_path):
+    clock = Clock()
+    store = SqliteBuckets(str(tmp_path / "rl.db"), 2, idle_seconds=60, clock=clock)
+    limit = Limit.per_minute(60, burst=1)
+    store.take("idle", limit)
+    clock.now += 120
+    for key in ("x", "y", "z"):
+        store.take(key, limit)
+        clock.now += 1
+    store.prune(store._connect(), clock.now)
+    keys = {row[0] for row in store._connect().execute("SELECT key FROM rate_limit_buckets")}
+    assert keys == {"y", "z"}
+
+
+def test_sqlite_buckets_fall_back_when_unusable(tmp_path):
+    store = SqliteBuckets(str(tmp_path / "missing" / "rl.db"), 100, 60)
+    limit = Limit.per_minute(60, burst=1)
+    assert store.take("ip", limit) == 0.0
+    assert store.take("ip", limit) > 0
+    assert store.fallbacks == 2
+
+
+def test_sqlite_buckets_fall_back_without_waiting_when_busy(tmp_path):
+    path = str(tmp_path / "rl.db")
+    store = SqliteBuckets(path, 100, 60)
+    limit = Limit.per_minute(60, burst=1)
+    assert store.take("ip", limit) == 0.0
+    # Another worker holds the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        assert store.take("ip", limit) == 0.0  # this worker's own bucket is still full
+        assert time.perf_counter() - start < 0.02
+        assert (store.fallbacks, store.busy) == (1, 1)
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert store.take("ip", limit) > 0  # back on the shared bucket
+    assert store.fallbacks == 1
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    limiter = RateLimiter(
+        {"read": Limit.per_minute(600, 50), "upload": Limit.per_minute(2, 2)},
+        MemoryBuckets(100),
+    )
+    monkeypatch.setattr(rate_limiter, "limits", limiter.limits)
+    monkeypatch.setattr(rate_limiter, "store", limiter.store)
+
+
+def test_uploads_limited_separately_from_reads(client, limits):
+    for _ in range(2):
+        assert client.post("/api/photos/upload").status_code != 429
+    response = client.post("/api/photos/upload")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    # Reads have their own bucket and no limit applies to writes here
+    assert client.get("/api/pantry").status_code == 200
+    assert client.post("/api/pantry", json={"name": "rice"}).status_code == 201
+
+
+def test_health_is_not_rate_limited(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "limits", {"read": Limit.per_minute(1, 1)})
+    monkeypatch.setattr(rate_limiter, "store", MemoryBuckets(10))
+    assert all(client.get("/api/health").status_code == 200 for _ in range(5))
+    assert client.get("/api/pantry").status_code == 200
+    assert client.get("/api/pantry").status_code == 429
+
+
+def test_default_limits_from_settings(monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "rate_limit_write_per_minute", 0)
+    limits = rate_limit._limits()
+    assert "write" not in limits
+    assert limits["upload"].burst == rate_limit.settings.rate_limit_upload_burst
@@ -1,3 +1,11 @@
+import pytest
+
+from backend.config import settings
+from backend.routers import recipes
+from backend.services.ingredient_parser import ParsedIngredient
+from backend.services.parse_cache import parse_cache
+
+
 def test_recipe_diff(client):
     # Add some pantry items
     client.post("/api/pantry", json={"name": "garlic"})
@@ -32,3 +40,168 @@ def test_recipe_parse(client):
     for p in data["parsed"]:
         assert p["name"]
         assert p["raw"]
+
+
+def test_recipe_diff_tracks_pantry_writes(client):
+    body = {"ingredients": ["saffron"]}
+    client.post("/api/pantry", json={"name": "garlic"})
+    assert client.post("/api/recipes/diff", json=body).json()["in_pantry_count"] == 0
+
+    item_id = client.post("/api/pantry", json={"name": "saffron"}).json()["id"]
+    assert client.post("/api/recipes/diff", json=body).json()["in_pantry_count"] == 1
+
+    client.put(f"/api/pantry/{item_id}", json={"name": "cumin"})
+    assert client.post("/api/recipes/diff", json=body).json()["in_pantry_count"] == 0
+
+    client.put(f"/api/pantry/{item_id}", json={"name": "saffron"})
+    client.delete(f"/api/pantry/{item_id}")
+    assert client.post("/api/recipes/diff", json=body).json()["in_pantry_count"] == 0
+
+
+def test_recipe_parse_uses_cache(client):
+    parse_cache.clear_memory()
+    body = {"ingredients": ["2 cups flour", "2  Cups Flour", "1 tsp salt"]}
+    first = client.post("/api/recipes/parse", json=body).json()["parsed"]
+    assert first[1]["raw"] == "2  Cups Flour"
+    assert first[1]["name"] == first[0]["name"]
+
+    before = client.get("/api/recipes/parse/cache").json()
+    assert before["persistent_entries"] == 2
+
+    # Second worker / restart: memory tier is cold, SQLite tier is warm
+    parse_cache.clear_memory()
+    assert client.post("/api/recipes/parse", json=body).json()["parsed"] == first
+    after = client.get("/api/recipes/parse/cache").json()
+    assert after["persistent_hits"] == before["persistent_hits"] + 2
+    assert after["misses"] == before["misses"]
+
+    client.post("/api/recipes/parse", json=body)
+    assert client.get("/api/recipes/parse/cache").json()["memory_hits"] == after["memory_hits"] + 2
+
+
+def test_recipe_diff_batch(client):
+    client.post("/api/pantry", json={"name": "garlic"})
+    res = client.post("/api/recipes/diff/batch", json={"recipes": [
+        {"ingredients": ["3 cloves garlic", "1 lb chicken breast"], "recipe_title": "Mon"},
+        {"ingredients": ["3 cloves garlic", "2 lb chicken breast", "1 cup rice"], "recipe_title": "Tue"},
+    ]})
+    assert res.status_code == 200
+    data = res.json()
+    assert [r["recipe_title"] for r in data["recipes"]] == ["Mon", "Tue"]
+    assert data["recipes"][0]["in_pantry_count"] == 1
+    assert data["recipes"][1]["missing_count"] == 2
+    assert data["unique_ingredients"] == 4
+    chicken = next(m for m in data["missing"] if "chicken" in m["name"])
+    assert chicken["quantity"] == 3
+    assert chicken["recipes"] == [0, 1]
+    assert "amazon.com" in chicken["whole_foods_url"]
+    assert not any("garlic" in m["name"] for m in data["missing"])
+
+
+def _fake_parse(calls: list[list[str]]):
+    def parse(db, lines):
+        calls.append(list(lines))
+        parsed = []
+        for raw in lines:
+            qty, unit, name = raw.split(" ", 2)
+            parsed.append(ParsedIngredient(raw=raw, name=name, quantity=float(qty), unit=unit))
+        return parsed
+
+    return parse
+
+
+def test_recipe_jobs_use_their_own_session(client, monkeypatch):
+    from backend.database import get_db
+    from backend.main import app
+
+    from .conftest import engine, override_get_db
+
+    request_sessions, job_sessions = [], []
+
+    def recording_get_db():
+        for db in override_get_db():
+            request_sessions.append(db)
+            yield db
+
+    def parse(db, lines):
+        job_sessions.append(db)
+        return _fake_parse([])(db, lines)
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, recording_get_db)
+    monkeypatch.setattr(recipes.parse_cache, "parse", parse)
+    assert client.post("/api/recipes/diff", json={"ingredients": ["2 g salt"]}).status_code == 200
+
+    assert len(request_sessions) == len(job_sessions) == 1
+    assert job_sessions[0] is not request_sessions[0]
+    assert job_sessions[0].get_bind() is engine
+
+
+def test_recipe_diff_batch_parses_and_matches_once(client, monkeypatch):
+    calls, matched = [], []
+    monkeypatch.setattr(recipes.parse_cache, "parse", _fake_parse(calls))
+    real_match = recipes.pantry_index.match_many
+    monkeypatch.setattr(
+        recipes.pantry_index, "match_many", lambda db, names: matched.append(names) or real_match(db, names)
+    )
+    client.post("/api/pantry", json={"name": "flour"})
+    week = [
+        {"ingredients": ["2 cups flour", "1 Cup milk", "2 g salt"]},
+        {"ingredients": ["1 cup milk", "2 g salt", "2 g salt"]},
+        {"ingredients": ["3 cups flour"]},
+    ]
+    data = client.post("/api/recipes/diff/batch", json={"recipes": week}).json()
+
+    assert calls == [["2 cups flour", "1 Cup milk", "2 g salt", "1 cup milk", "3 cups flour"]]
+    assert matched == [["flour", "milk", "salt"]]
+    missing = {(m["name"], m["unit"]): m for m in data["missing"]}
+    assert set(missing) == {("milk", "cup"), ("salt", "g")}
+    assert missing[("milk", "cup")]["quantity"] == 2
+    assert missing[("salt", "g")]["quantity"] == 6
+    assert missing[("salt", "g")]["recipes"] == [0, 1]
+    assert [r["missing_count"] for r in data["recipes"]] == [2, 3, 0]
+
+
+def test_recipe_diff_batch_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "recipe_batch_max_recipes", 2)
+    body = {"recipes": [{"ingredients": ["salt"]}] * 3}
+    assert client.post("/api/recipes/diff/batch", json=body).status_code == 400
+
+
+def test_recipe_diff_reports_coverage(client, monkeypatch):
+    monkeypatch.setattr(recipes.parse_cache, "parse", _fake_parse([]))
+    client.post("/api/pantry/bulk", json=[
+        {"name": "flour", "quantity": 500, "unit": "g"},
+        {"name": "milk", "quantity": 1, "unit": "cup"},
+        {"name": "eggs", "quantity": 0},
+        {"name": "butter"},
+    ])
+    data = client.post("/api/recipes/diff", json={"ingredients": [
+        "200 g flour", "2 cups milk", "3 each eggs", "1 lb butter", "1 tsp salt", "1 cup flour",
+    ]}).json()
+    by_raw = {s["raw"]: s for s in data["ingredients"]}
+    assert by_raw["200 g flour"]["coverage"] == "full"
+    assert by_raw["200 g flour"]["whole_foods_url"] is None
+    assert by_raw["2 cups milk"]["coverage"] == "partial"
+    assert by_raw["2 cups milk"]["shortfall"] == pytest.approx(1)
+    assert by_raw["2 cups milk"]["whole_foods_url"]
+    assert (by_raw["3 each eggs"]["coverage"], by_raw["3 each eggs"]["shortfall"]) == ("none", 3)
+    # Unknown stock, or a volume against a mass, trusts the name match
+    assert by_raw["1 lb butter"]["coverage"] == "full"
+    assert by_raw["1 cup flour"]["coverage"] == "full"
+    assert (by_raw["1 tsp salt"]["coverage"], by_raw["1 tsp salt"]["in_pantry"]) == ("none", False)
+    assert (data["in_pantry_count"], data["missing_count"], data["partial_count"]) == (5, 1, 1)
+
+
+def test_recipe_diff_batch_sums_demand_against_stock(client, monkeypatch):
+    monkeypatch.setattr(recipes.parse_cache, "parse", _fake_parse([]))
+    client.post("/api/pantry", json={"name": "milk", "quantity": 500, "unit": "ml"})
+    week = [
+        {"ingredients": ["2 cups milk"]},
+        {"ingredients": ["16 tbsp milk", "1 cup milk"]},
+    ]
+    data = client.post("/api/recipes/diff/batch", json={"recipes": week}).json()
+    # Every line fits on its own; together they need 4 cups from 500 ml
+    assert all(s["coverage"] == "full" for r in data["recipes"] for s in r["ingredients"])
+    [milk] = data["missing"]
+    assert (milk["name"], milk["unit"], milk["recipes"]) == ("milk", "cup", [0, 1])
+    assert milk["quantity"] == pytest.approx(4 - 500 / 236.5882365)
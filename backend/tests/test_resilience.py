@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.config import settings
+from backend.routers import photos
+from backend.services import vision
+from backend.services.resilience import CircuitBreaker, CircuitOpen, ResilientCaller
+from backend.services.vision import VisionAnalysisError, VisionUnavailable, analyze_image, stream_image
+
+from .fakes import FakeGeminiServer
+
+ITEMS = [{"name": "oat milk", "quantity": 2}, {"name": "eggs", "quantity": 12}]
+
+
+class Upstream(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def _caller(**kwargs) -> ResilientCaller:
+    options = {"timeout": 1.0, "max_retries": 2, "retry_base": 0.001, "breaker": CircuitBreaker(3, 60)}
+    options.update(kwargs)
+    return ResilientCaller("test", **options)
+
+
+def _script(*outcomes):
+    """Async call factory returning or raising each outcome in turn."""
+    outcomes = list(outcomes)
+
+    async def call():
+        outcome, delay = outcomes.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call
+
+
+def test_retries_transient_errors_then_succeeds():
+    caller = _caller()
+    result = asyncio.run(caller.call(_script((Upstream(503), 0), (Upstream(429), 0), ("ok", 0))))
+    assert result == "ok"
+    stats = caller.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (1, 2, 0)
+
+
+def test_does_not_retry_client_errors():
+    caller = _caller()
+    with pytest.raises(Upstream):
+        asyncio.run(caller.call(_script((Upstream(400), 0), ("ok", 0))))
+    assert caller.stats()["retries"] == 0
+    assert caller.breaker.state == "closed"
+
+
+def test_deadline_covers_retries():
+    caller = _caller(timeout=0.1, max_retries=5)
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(caller.call(_script(*[("slow", 1.0)] * 6)))
+    assert time.perf_counter() - start < 0.5
+    assert caller.stats()["timeouts"] >= 1
+
+
+def test_hung_attempt_is_retried_within_deadline():
+    caller = _caller(timeout=1.0, attempt_timeout=0.1)
+    start = time.perf_counter()
+    assert asyncio.run(caller.call(_script(("hung", 5.0), ("ok", 0)))) == "ok"
+    assert time.perf_counter() - start < 0.5
+    stats = caller.stats()
+    assert (stats["timeouts"], stats["retries"], stats["failures"]) == (1, 1, 0)
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    caller = _caller(max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(Upstream):
+            asyncio.run(caller.call(_script((Upstream(503), 0))))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        asyncio.run(caller.call(_script(("ok", 0))))
+    assert caller.stats()["short_circuited"] == 1
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert asyncio.run(caller.call(_script(("ok", 0)))) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_failed_half_open_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.02)
+    caller = _caller(max_retries=0, breaker=breaker)
+    with pytest.raises(Upstream):
+        asyncio.run(caller.call(_script((Upstream(500), 0))))
+    time.sleep(0.03)
+    with pytest.raises(Upstream):
+        asyncio.run(caller.call(_script((Upstream(500), 0))))
+    assert breaker.state == "open"
+
+
+def test_hedged_request_wins_over_slow_first_attempt():
+    caller = _caller(hedge_after=0.02)
+    start = time.perf_counter()
+    result = asyncio.run(caller.call(_script(("slow", 0.5), ("fast", 0))))
+    assert result == "fast"
+    assert time.perf_counter() - start < 0.2
+    stats = caller.stats()
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+    assert stats["latency_ms_max"] < 200
+
+
+@pytest.fixture
+def gemini_server(monkeypatch):
+    """Point the real SDK client at a local fake Gemini server."""
+
+    def start(script, **caller_options):
+        server = FakeGeminiServer(script).__enter__()
+        servers.append(server)
+        monkeypatch.setattr(settings, "gemini_api_key", "test-key")
+        monkeypatch.setattr(settings, "gemini_base_url", server.url)
+        monkeypatch.setattr(vision, "_client", None)
+        monkeypatch.setattr(vision, "_client_initialized", False)
+        calls = _caller(**caller_options)
+        monkeypatch.setattr(vision, "gemini_calls", calls)
+        monkeypatch.setattr(photos, "gemini_calls", calls)
+        return server
+
+    servers: list[FakeGeminiServer] = []
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+
+def test_sdk_call_retries_through_fake_server(gemini_server):
+    server = gemini_server([(503, [], 0), (200, ITEMS, 0)])
+    items = asyncio.run(analyze_image(b"img", "image/jpeg"))
+    assert [i.name for i in items] == ["oat milk", "eggs"]
+    assert len(server.paths) == 2
+    assert server.paths[0].endswith(":generateContent")
+
+
+def test_sdk_call_times_out_at_deadline(gemini_server):
+    gemini_server([(200, ITEMS, 2.0)], timeout=0.3, max_retries=0)
+    start = time.perf_counter()
+    with pytest.raises(VisionAnalysisError):
+        asyncio.run(analyze_image(b"img", "image/jpeg"))
+    assert time.perf_counter() - start < 1.5
+
+
+def test_open_breaker_skips_the_server(gemini_server):
+    server = gemini_server([(500, [], 0)], max_retries=0, breaker=CircuitBreaker(1, 60))
+    with pytest.raises(VisionAnalysisError):
+        asyncio.run(analyze_image(b"img", "image/jpeg"))
+    with pytest.raises(VisionUnavailable):
+        asyncio.run(analyze_image(b"img", "image/jpeg"))
+    assert len(server.paths) == 1
+
+
+def test_stream_through_fake_server(gemini_server):
+    server = gemini_server([(503, [], 0), (200, ITEMS, 0)])
+
+    async def consume():
+        return [item.name async for item in stream_image(b"img", "image/jpeg")]
+
+    assert asyncio.run(consume()) == ["oat milk", "eggs"]
+    assert "streamGenerateContent" in server.paths[-1]
+    assert len(server.paths) == 2
+
+
+def test_open_breaker_returns_503(client, gemini_server):
+    gemini_server([(500, [], 0)], max_retries=0, breaker=CircuitBreaker(1, 60))
+    vision.gemini_calls.breaker.record_failure()
+    res = client.post(
+        "/api/photos/upload",
+        files={"photo": ("shelf.png", _png(), "image/png")},
+    )
+    assert res.status_code == 503
+    assert client.get("/api/photos/vision").json()["breaker"] == "open"
+
+
+def _png() -> bytes:
+    import io
+
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.linear_gradient("L").resize((32, 32)).save(buf, format="PNG")
+    return buf.getvalue()
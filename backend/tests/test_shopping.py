@@ -0,0 +1,166 @@
+import pytest
+from sqlalchemy import event, text
+
+from backend.services import shopping_list
+from backend.tests.conftest import TestSession, engine
+
+
+def _add(client, items, **extra):
+    res = client.post("/api/shopping/bulk", json={"items": items, **extra})
+    assert res.status_code == 201
+    return res.json()
+
+
+def test_bulk_add_merges_by_name_and_unit(client):
+    first = _add(client, [
+        {"name": "Flour", "quantity": 2, "unit": "cups"},
+        {"name": " flour ", "quantity": 1, "unit": "Cup"},
+        {"name": "flour", "quantity": 500, "unit": "g"},
+        {"name": "eggs", "quantity": 3},
+        {"name": "oil", "quantity": 1, "unit": "tbsp"},
+        {"name": "oil", "quantity": 2, "unit": "Tablespoons"},
+        {"name": "eggs", "quantity": 1, "unit": "piece"},
+    ], source_recipe="Bread")
+    # Units merge on their canonical key; plain counts carry no unit
+    assert [(i["name"], i["quantity"], i["unit"]) for i in first] == [
+        ("flour", 3, "cup"), ("flour", 500, "g"), ("eggs", 4, None), ("oil", 3, "tbsp"),
+    ]
+    assert all(i["source_recipe"] == "Bread" for i in first)
+    assert first[0]["whole_foods_url"]
+
+    # Rows already on the list absorb new quantities
+    again = _add(client, [{"name": "eggs", "quantity": 2}, {"name": "flour", "unit": "cups"}])
+    assert again[0]["id"] == first[2]["id"] and again[0]["quantity"] == 6
+    assert again[1]["id"] == first[0]["id"] and again[1]["quantity"] == 3
+    assert len(client.get("/api/shopping").json()) == 4
+
+
+def test_bulk_add_accepts_diff_entries(client):
+    # Fields from IngredientStatus that the list doesn't store are ignored
+    items = _add(client, [{
+        "raw": "2 cups flour", "name": "flour", "quantity": 2, "unit": "cup",
+        "in_pantry": False, "pantry_match": None, "match_score": 0.0,
+        "whole_foods_url": "https://www.wholefoodsmarket.com/search?text=flour",
+    }])
+    assert items[0]["name"] == "flour" and items[0]["purchased"] is False
+
+
+def test_bulk_add_is_set_based(client):
+    _add(client, [{"name": f"item {i}", "quantity": 1} for i in range(50)])
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        items = _add(client, [{"name": f"item {i}", "quantity": 1} for i in range(100)])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(items) == 100
+    assert items[0]["quantity"] == 2 and items[-1]["quantity"] == 1
+    # upsert, re-select
+    assert len(statements) == 2
+
+
+def test_list_unpurchased_newest_first_with_cursor(client):
+    for i in range(5):
+        _add(client, [{"name": f"item {i}"}])
+    res = client.get("/api/shopping", params={"limit": 2})
+    assert [i["name"] for i in res.json()] == ["item 4", "item 3"]
+    seen = [i["name"] for i in res.json()]
+    while "X-Next-Cursor" in res.headers:
+        res = client.get("/api/shopping", params={"limit": 2, "cursor": res.headers["X-Next-Cursor"]})
+        seen += [i["name"] for i in res.json()]
+    assert seen == [f"item {i}" for i in range(4, -1, -1)]
+    assert client.get("/api/shopping", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_listing_uses_composite_index():
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM shopping_list_items "
+            "WHERE purchased = 0 ORDER BY created_at DESC, id DESC LIMIT 10"
+        )))
+    assert "ix_shopping_list_purchased_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_bulk_toggle_and_clear(client):
+    items = _add(client, [{"name": n} for n in ("milk", "bread", "jam")])
+    ids = [i["id"] for i in items]
+
+    res = client.post("/api/shopping/purchased", json={"ids": ids[:2]})
+    assert res.json() == {"updated": 2}
+    assert [i["name"] for i in client.get("/api/shopping").json()] == ["jam"]
+    assert len(client.get("/api/shopping", params={"purchased": True}).json()) == 2
+
+    client.post("/api/shopping/purchased", json={"ids": [ids[1]], "purchased": False})
+    assert client.delete("/api/shopping", params={"purchased": True}).json() == {"deleted": 1}
+    assert sorted(i["name"] for i in client.get("/api/shopping").json()) == ["bread", "jam"]
+    assert client.delete("/api/shopping").json() == {"deleted": 2}
+
+
+def test_readding_purchased_item_resets_it(client):
+    item = _add(client, [{"name": "milk", "quantity": 1}])[0]
+    client.post("/api/shopping/purchased", json={"ids": [item["id"]]})
+    again = _add(client, [{"name": "milk", "quantity": 2}])[0]
+    assert again["id"] == item["id"]
+    assert again["purchased"] is False and again["quantity"] == 2
+
+
+def test_purchase_moves_to_pantry(client):
+    client.post("/api/pantry", json={"name": "rice", "quantity": 1, "unit": "kg"})
+    items = _add(client, [
+        {"name": "Rice", "quantity": 2, "unit": "kg"},
+        {"name": "beans", "quantity": 1},
+        {"name": "salt"},
+    ])
+    client.post("/api/shopping/purchased", json={"ids": [items[0]["id"], items[1]["id"]]})
+
+    res = client.post("/api/shopping/purchase", json={})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["moved"] == 2
+    assert {(p["name"], p["quantity"]) for p in body["pantry"]} == {("rice", 3), ("beans", 1)}
+    assert [i["name"] for i in client.get("/api/shopping").json()] == ["salt"]
+    assert client.get("/api/shopping", params={"purchased": True}).json() == []
+    assert len(client.get("/api/pantry").json()) == 2
+
+    # Explicit ids only move items marked purchased; nothing left is a no-op
+    assert client.post("/api/shopping/purchase", json={"ids": [items[2]["id"]]}).json() == {"moved": 0, "pantry": []}
+    assert [i["name"] for i in client.get("/api/shopping").json()] == ["salt"]
+    client.post("/api/shopping/purchased", json={"ids": [items[2]["id"]]})
+    assert client.post("/api/shopping/purchase", json={"ids": [items[2]["id"]]}).json()["moved"] == 1
+    assert client.post("/api/shopping/purchase", json={}).json() == {"moved": 0, "pantry": []}
+
+
+def test_purchase_converts_units_into_pantry_rows(client):
+    client.post("/api/pantry", json={"name": "flour", "quantity": 500, "unit": "g"})
+    _add(client, [
+        {"name": "flour", "quantity": 2, "unit": "lb"},
+        {"name": "flour", "quantity": 250, "unit": "g"},
+    ])
+
+    ids = [i["id"] for i in client.get("/api/shopping").json()]
+    client.post("/api/shopping/purchased", json={"ids": ids})
+    assert client.post("/api/shopping/purchase", json={"ids": ids}).json()["moved"] == 2
+    pantry = {(p["name"], p["unit"]): p["quantity"] for p in client.get("/api/pantry").json()}
+    # lb converts into the pantry's grams instead of making "502 g"
+    assert pantry == {("flour", "g"): pytest.approx(500 + 2 * 453.59237 + 250)}
+
+
+def test_install_dedupes_legacy_rows():
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_shopping_list_name_unit"))
+        conn.execute(text(
+            "INSERT INTO shopping_list_items (name, quantity, unit, purchased) VALUES "
+            "('Milk', 1, 'L', 0), ('milk', 2, 'liters', 0), ('eggs', NULL, NULL, 0), ('eggs', 6, '', 0)"
+        ))
+        shopping_list.install(conn)
+        shopping_list.install(conn)  # idempotent
+    with TestSession() as db:
+        rows = db.execute(text(
+            "SELECT name, quantity, unit FROM shopping_list_items ORDER BY id"
+        )).all()
+    assert [tuple(r) for r in rows] == [("milk", 3, "l"), ("eggs", 6, None)]
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+from backend import startup
+from backend.tests.conftest import engine
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_importing_app_does_not_touch_database(tmp_path):
+    db_file = tmp_path / "pantry.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_file}",
+        "METRICS_DIR": str(tmp_path / "metrics"),
+    }
+    subprocess.run([sys.executable, "-c", "import backend.main"], cwd=ROOT, env=env, check=True)
+    assert not db_file.exists()
+
+
+def test_setup_schema_is_idempotent():
+    startup.setup_schema(engine)
+    startup.setup_schema(engine)
+
+    with engine.connect() as conn:
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(shopping_list_items)"))}
+    assert {"uq_shopping_list_name_unit", "ix_shopping_list_purchased_created"} <= indexes
+    assert "pantry_items_fts" in inspect(engine).get_table_names()
+
+
+def test_prepare_runs_once_per_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(startup, "_prepared_by", None)
+    monkeypatch.setattr(startup, "timings", {})
+    monkeypatch.setattr(startup, "setup_schema", lambda bind: calls.append(bind))
+
+    startup.prepare(engine, warm=False)
+    startup.prepare(engine, warm=False)
+
+    assert calls == [engine]
+    assert "schema" in startup.timings
+    assert startup.report()["preloaded"] is False
+
+
+def test_report_marks_forked_workers_as_preloaded(monkeypatch):
+    monkeypatch.setattr(startup, "_prepared_by", os.getpid() + 1)
+    assert startup.report()["preloaded"] is True
+
+
+def test_startup_endpoint(client):
+    response = client.get("/api/startup")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["pid"] == os.getpid()
+    assert set(body) == {"pid", "preloaded", "timings_ms", "memory"}
+    if body["memory"]:
+        assert body["memory"]["rss_bytes"] > 0
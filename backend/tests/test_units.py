@@ -0,0 +1,57 @@
+import pytest
+
+from backend.services.units import COUNT, MASS, VOLUME, convert, coverage, resolve
+
+
+@pytest.mark.parametrize("raw, key, dimension", [
+    ("cups", "cup", VOLUME),
+    ("Cup", "cup", VOLUME),
+    ("T", "tbsp", VOLUME),
+    ("t", "tsp", VOLUME),
+    ("tablespoons", "tbsp", VOLUME),
+    ("fluid_ounce", "fl oz", VOLUME),
+    ("oz.", "oz", MASS),
+    ("pounds", "lb", MASS),
+    ("G", "g", MASS),
+    (None, "each", COUNT),
+    ("", "each", COUNT),
+    ("dozen", "dozen", COUNT),
+    ("cloves", "clove", "clove"),
+    ("bunches", "bunch", "bunch"),
+])
+def test_resolve(raw, key, dimension):
+    unit = resolve(raw)
+    assert (unit.key, unit.dimension) == (key, dimension)
+
+
+def test_resolve_is_cached_and_interned():
+    resolve.cache_clear()
+    first = resolve("Tablespoons")
+    assert resolve("Tablespoons") is first
+    assert resolve.cache_info().hits == 1
+    assert resolve("tbsp").key is first.key
+
+
+def test_convert():
+    assert convert(2, "lb", "g") == pytest.approx(907.18474)
+    assert convert(3, "cups", "cup") == 3
+    assert convert(1, "dozen", None) == 12
+    assert convert(1, "gallon", None) is None
+    assert convert(1, "can", "g") is None
+
+
+def test_coverage():
+    assert coverage(False, 2, "cup", None, None).status == "none"
+    assert coverage(True, 1, "lb", 500, "g").status == "full"
+    assert coverage(True, 6, None, 1, "dozen").status == "full"
+    assert coverage(True, 1, "cup", 16, "tbsp").status == "full"
+    assert coverage(True, 48, "tsp", 1, "cup").status == "full"
+    partial = coverage(True, 2, "cups", 200, "ml")
+    assert partial.status == "partial"
+    assert partial.shortfall == pytest.approx(2 - 200 / 236.5882365)
+    assert coverage(True, 3, None, 0, None) == coverage(False, 3, None, None, None)
+    # Nothing to compare: the name match decides
+    assert coverage(True, None, "cup", 1, "cup").status == "full"
+    assert coverage(True, 1, "cup", None, None).status == "full"
+    assert coverage(True, 1, "cup", 5, "g").status == "full"
+    assert coverage(True, 3, "cans", 1, "can").shortfall == 2
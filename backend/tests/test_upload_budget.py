@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from backend.routers import photos
+from backend.services.upload_budget import BudgetExceeded, ByteBudget
+
+
+def test_admits_within_limit_and_tracks_peak():
+    budget = ByteBudget(limit=100, wait_seconds=0)
+
+    async def scenario():
+        async with budget.reserve(60):
+            async with budget.reserve(40):
+                assert budget.stats()["in_flight_bytes"] == 100
+
+    asyncio.run(scenario())
+    stats = budget.stats()
+    assert stats["in_flight_bytes"] == 0
+    assert stats["peak_in_flight_bytes"] == 100
+    assert stats["admitted"] == 2
+    assert stats["peak_rss_bytes"] > 0
+
+
+def test_rejects_immediately_without_wait():
+    budget = ByteBudget(limit=100, wait_seconds=0)
+
+    async def scenario():
+        async with budget.reserve(80):
+            with pytest.raises(BudgetExceeded):
+                await budget.acquire(40)
+
+    asyncio.run(scenario())
+    assert budget.stats()["rejected"] == 1
+
+
+def test_waiters_are_admitted_in_order_on_release():
+    budget = ByteBudget(limit=100, wait_seconds=5)
+    order = []
+
+    async def upload(name, size, hold):
+        async with budget.reserve(size):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(upload("first", 80, 0.05))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, upload("second", 50, 0), upload("third", 10, 0))
+
+    asyncio.run(scenario())
+    # third would fit next to first, but must not overtake second
+    assert order == ["first", "second", "third"]
+    stats = budget.stats()
+    assert stats["queued"] == 2
+    assert stats["in_flight_bytes"] == 0
+
+
+def test_rejects_after_wait_and_cancelled_waiters_leave_queue():
+    budget = ByteBudget(limit=100, wait_seconds=0.05)
+
+    async def scenario():
+        await budget.acquire(100)
+        with pytest.raises(BudgetExceeded):
+            await budget.acquire(1)
+        waiter = asyncio.create_task(budget.acquire(1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        budget.release(100)
+
+    asyncio.run(scenario())
+    stats = budget.stats()
+    assert (stats["waiting"], stats["in_flight_bytes"], stats["rejected"]) == (0, 0, 1)
+
+
+def test_waiter_behind_timed_out_head_is_granted():
+    budget = ByteBudget(limit=100, wait_seconds=0.2)
+
+    async def scenario():
+        await budget.acquire(60)
+        head = asyncio.create_task(budget.acquire(80))
+        await asyncio.sleep(0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # fits next to the 60 in flight, but queues behind the head
+        assert await budget.acquire(30) == 30
+        waited = loop.time() - start
+        with pytest.raises(BudgetExceeded):
+            await head
+        return waited
+
+    waited = asyncio.run(scenario())
+    # granted when the head gave up (~0.1 s), not at its own timeout (0.2 s)
+    assert waited < 0.18
+    stats = budget.stats()
+    assert (stats["waiting"], stats["in_flight_bytes"], stats["rejected"]) == (0, 90, 1)
+
+
+def test_oversized_upload_is_admitted_alone():
+    budget = ByteBudget(limit=100, wait_seconds=0)
+    assert asyncio.run(budget.acquire(500)) == 100
+
+
+def test_upload_over_budget_returns_503(client, monkeypatch):
+    budget = ByteBudget(limit=10, wait_seconds=0)
+    monkeypatch.setattr(photos, "upload_budget", budget)
+
+    async def hold():
+        await budget.acquire(10)
+
+    asyncio.run(hold())
+    res = client.post(
+        "/api/photos/upload",
+        files={"photo": ("shelf.jpg", b"\xff\xd8 jpeg", "image/jpeg")},
+    )
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "2"
+    assert client.get("/api/photos/memory").json()["rejected"] == 1
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from backend.services import vision
+from backend.services.vision import JsonArrayParser, VisionAnalysisError, stream_image
+
+from .fakes import FakeGeminiClient
+
+ITEMS = [
+    {"name": "oat milk", "quantity": 2, "unit": "carton", "category": "dairy", "notes": None},
+    {"name": "tortillas {corn}", "quantity": None, "unit": None, "category": "bakery",
+     "notes": 'brand "la \\"banderita\\"" ]'},
+    {"name": "eggs", "quantity": 12, "unit": None, "category": "dairy", "notes": None},
+]
+
+
+def _split(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    def install(chunks, delay=0.0):
+        client = FakeGeminiClient(chunks, delay)
+        monkeypatch.setattr(vision, "_get_client", lambda: client)
+        return client
+
+    return install
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_parser_yields_each_object_once_complete(size):
+    parser = JsonArrayParser()
+    seen = []
+    for chunk in _split(json.dumps(ITEMS, indent=1), size):
+        seen.extend(parser.feed(chunk))
+    parser.close()
+    assert seen == ITEMS
+
+
+def test_parser_emits_before_array_closes():
+    parser = JsonArrayParser()
+    assert parser.feed('[{"name": "salt"}, {"name": "pep') == [{"name": "salt"}]
+    assert parser.feed('per"}]') == [{"name": "pepper"}]
+
+
+def test_parser_rejects_truncated_array():
+    parser = JsonArrayParser()
+    parser.feed('[{"name": "salt"}, {"na')
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_stream_image_without_client_returns_none(monkeypatch):
+    monkeypatch.setattr(vision, "_get_client", lambda: None)
+    assert stream_image(b"img", "image/jpeg") is None
+
+
+def test_first_item_arrives_before_generation_ends(gemini):
+    text = json.dumps(ITEMS)
+    gemini(_split(text, 20), delay=0.02)
+    vision._request(b"", "image/jpeg")  # keep the one-off SDK import out of the timing
+
+    async def consume():
+        start = time.perf_counter()
+        arrivals = []
+        async for item in stream_image(b"img", "image/jpeg"):
+            arrivals.append((time.perf_counter() - start, item))
+        return arrivals, time.perf_counter() - start
+
+    arrivals, total = asyncio.run(consume())
+    assert [item.name for _, item in arrivals] == [i["name"] for i in ITEMS]
+    assert arrivals[0][0] < total / 2
+
+
+def test_stream_image_wraps_parse_errors(gemini):
+    gemini(['[{"name": "salt"}, {"quantity": 1}]'])
+
+    async def consume():
+        return [item async for item in stream_image(b"img", "image/jpeg")]
+
+    with pytest.raises(VisionAnalysisError):
+        asyncio.run(consume())
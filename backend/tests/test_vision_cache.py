@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from backend.models import VisionResultCache
+from backend.schemas import PantryItemCreate
+from backend.services import vision_cache as vision_cache_module
+from backend.services.vision_cache import VisionCache
+
+from .conftest import TestSession
+
+ITEMS = [PantryItemCreate(name="oat milk", quantity=2, unit="carton")]
+
+
+def test_store_and_lookup_roundtrip():
+    db = TestSession()
+    cache = VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0)
+    assert cache.lookup(db, "a") is None
+    cache.store(db, "a", ITEMS, source_key="raw-a")
+    assert cache.lookup(db, "a") == ITEMS
+    assert cache.lookup_source(db, "raw-a") == ITEMS
+    stats = cache.stats(db)
+    assert (stats["exact_hits"], stats["source_hits"], stats["misses"]) == (1, 1, 1)
+    db.close()
+
+
+def test_other_model_or_prompt_never_hits():
+    db = TestSession()
+    VisionCache(60, 10, 0).store(db, "a", ITEMS)
+    other = VisionCache(60, 10, 0)
+    other.variant = "different"
+    assert other.lookup(db, "a") is None
+    db.close()
+
+
+def test_expired_entries_miss():
+    db = TestSession()
+    cache = VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=0)
+    cache.store(db, "a", ITEMS)
+    cache.ttl = timedelta(0)
+    assert cache.lookup(db, "a") is None
+    db.close()
+
+
+def test_near_duplicate_lookup():
+    db = TestSession()
+    cache = VisionCache(ttl_seconds=60, max_entries=10, dhash_distance=4)
+    cache.store(db, "a", ITEMS, dhash=(1 << 63) | 0b1011)
+    assert cache.lookup(db, "b", dhash=(1 << 63) | 0b0001) == ITEMS  # 2 bits apart
+    assert cache.lookup(db, "c", dhash=0b1011 ^ 0xFF00) is None
+    assert cache.stats(db)["near_hits"] == 1
+    db.close()
+
+
+def test_evicts_expired_and_least_recently_used(monkeypatch):
+    monkeypatch.setattr(vision_cache_module, "_EVICT_EVERY", 1)
+    db = TestSession()
+    stale = VisionCache(60, 10, 0)
+    stale.variant = "old"
+    stale.store(db, "old", ITEMS)
+
+    cache = VisionCache(ttl_seconds=60, max_entries=2, dhash_distance=0)
+    for key in ["a", "b", "c"]:
+        cache.store(db, key, ITEMS)
+        time.sleep(0.001)
+    keys = {row.key for row in db.query(VisionResultCache)}
+    assert keys == {"b", "c"}
+    db.close()
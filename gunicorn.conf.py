@@ -0,0 +1,45 @@
+"""Gunicorn settings for the API.
+
+The app is preloaded, and ``on_starting`` prepares it in the master: schema
+setup plus loading the CRF model, rapidfuzz, PIL, the Gemini SDK and the
+pantry index. Forked workers start with all of that in memory and share the
+pages copy-on-write. ``gc.freeze`` keeps the collector from writing to (and
+so copying) those pages. Set ``GUNICORN_PRELOAD=0`` to have each worker
+import and prepare the app itself.
+"""
+
+import gc
+import os
+import time
+
+_config_loaded = time.perf_counter()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def on_starting(server):
+    if not preload_app:
+        return
+    from backend import startup
+
+    # With preload_app the app module was imported just before this hook
+    startup.record("import", time.perf_counter() - _config_loaded)
+    startup.prepare()
+    gc.collect()
+    gc.freeze()
+    server.log.info("Master prepared the app: %s", startup.report()["timings_ms"])
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from backend.database import engine, read_engine
+
+    # Connections the master opened while preparing belong to it; workers
+    # open their own
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
@@ -1,6 +1,3 @@
 #!/bin/bash
-exec gunicorn backend.main:app \
-    --worker-class uvicorn.workers.UvicornWorker \
-    --workers 2 \
-    --bind 0.0.0.0:8000 \
-    --timeout 120
+# Settings (preload, workers, bind, timeout) live in gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py backend.main:app